@@ -0,0 +1,192 @@
+# account_cache.py
+import math
+import threading
+import time
+
+from requests.exceptions import ConnectionError, Timeout
+
+from metrics import REGISTRY
+
+# Binance spot REQUEST_WEIGHT of the REST calls the bot makes
+ENDPOINT_WEIGHTS = {
+    "get_account": 20,
+    "get_asset_balance": 20,  # served from GET /api/v3/account
+    "get_symbol_ticker": 2,
+    "get_all_tickers": 4,
+    "get_exchange_info": 20,
+    "get_symbol_info": 20,  # served from GET /api/v3/exchangeInfo
+    "get_klines": 2,
+    "get_aggregate_trades": 4,
+    "create_order": 1,
+    "create_oco_order": 1,
+}
+
+
+class CountingClient:
+    # Wraps a Client and adds up request weight per endpoint and per trading cycle.
+    # Weight per endpoint is also exported as the rest_request_weight_total counter.
+    # With a downloader.WeightRateLimiter every call also waits for its weight.
+    # Each call's latency, errors and retries go to the metrics registry; read
+    # endpoints are retried on connection errors and timeouts.
+
+    def __init__(self, client, limiter=None, retries=2, registry=REGISTRY):
+        self._client = client
+        self._limiter = limiter
+        self._retries = retries
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.cycle_weight = 0
+        self.cycle_calls = 0
+        self.total_weight = 0
+        self.endpoint_weight = {}  # method name -> weight since start
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        weight = ENDPOINT_WEIGHTS.get(name)
+        if weight is None or not callable(attr):
+            return attr
+
+        retries = self._retries if name.startswith("get_") else 0
+        registry = self._registry
+
+        def call(*args, **kwargs):
+            for attempt in range(retries + 1):
+                if self._limiter is not None:
+                    self._limiter.acquire(weight)
+                with self._lock:
+                    self.cycle_weight += weight
+                    self.cycle_calls += 1
+                    self.total_weight += weight
+                    self.endpoint_weight[name] = self.endpoint_weight.get(name, 0) + weight
+                registry.inc("rest_request_weight_total", weight, endpoint=name)
+                started = time.perf_counter()
+                try:
+                    return attr(*args, **kwargs)
+                except (ConnectionError, Timeout):
+                    registry.inc("rest_errors_total", endpoint=name)
+                    if attempt == retries:
+                        raise
+                    registry.inc("rest_retries_total", endpoint=name)
+                except Exception:
+                    registry.inc("rest_errors_total", endpoint=name)
+                    raise
+                finally:
+                    registry.observe("rest_request_seconds", time.perf_counter() - started, endpoint=name)
+
+        return call
+
+    def start_cycle(self):
+        # Returns (calls, weight) of the cycle that just ended
+        with self._lock:
+            used = (self.cycle_calls, self.cycle_weight)
+            self.cycle_calls = self.cycle_weight = 0
+        return used
+
+
+def fill_price(order):
+    # Average execution price of a market order response
+    executed = float(order.get("executedQty", 0) or 0)
+    if executed > 0:
+        return float(order["cummulativeQuoteQty"]) / executed
+    fills = order.get("fills") or []
+    if fills:
+        qty = sum(float(f["qty"]) for f in fills)
+        return sum(float(f["price"]) * float(f["qty"]) for f in fills) / qty
+    return None
+
+
+def round_step(value, step):
+    # Round down to a Binance LOT_SIZE/PRICE_FILTER step such as "0.00001000"
+    step = float(step)
+    if step <= 0:
+        return value
+    decimals = max(0, -int(math.floor(math.log10(step))))
+    return round(math.floor(value / step + 1e-9) * step, decimals)
+
+
+class AccountState:
+    # Cached balances, last prices and symbol filters, each with its own TTL.
+    # Balances and prices are refreshed in bulk (one account call, one all-tickers
+    # call); prices also come in for free from kline closes and order fills, and
+    # balances from user-data stream events via apply_user_event.
+
+    def __init__(self, client, balance_ttl=30.0, price_ttl=60.0, filters_ttl=3600.0):
+        self.client = client
+        self.ttl = {"balances": balance_ttl, "prices": price_ttl, "filters": filters_ttl}
+        self.updated = {"balances": None, "filters": None}
+        self.balances = {}
+        self.prices = {}
+        self.price_updated = {}
+        self.filters = {}
+        self.lock = threading.Lock()  # one bulk refresh at a time across worker threads
+
+    def _fresh(self, updated, field):
+        return updated is not None and time.monotonic() - updated < self.ttl[field]
+
+    def invalidate(self, field):
+        self.updated[field] = None
+
+    def refresh_balances(self):
+        account = self.client.get_account()
+        self.balances = {
+            b["asset"]: (float(b["free"]), float(b["locked"])) for b in account["balances"]
+        }
+        self.updated["balances"] = time.monotonic()
+
+    def refresh_prices(self):
+        now = time.monotonic()
+        for ticker in self.client.get_all_tickers():
+            self.prices[ticker["symbol"]] = float(ticker["price"])
+            self.price_updated[ticker["symbol"]] = now
+
+    def refresh_filters(self):
+        info = self.client.get_exchange_info()
+        self.filters = {
+            s["symbol"]: {f["filterType"]: f for f in s["filters"]} for s in info["symbols"]
+        }
+        self.updated["filters"] = time.monotonic()
+
+    def balance(self, asset):
+        with self.lock:
+            if not self._fresh(self.updated["balances"], "balances"):
+                self.refresh_balances()
+        return self.balances.get(asset, (0.0, 0.0))[0]
+
+    def price(self, symbol):
+        with self.lock:
+            if not self._fresh(self.price_updated.get(symbol), "prices"):
+                self.refresh_prices()
+        return self.prices[symbol]
+
+    def symbol_filters(self, symbol):
+        with self.lock:
+            if not self._fresh(self.updated["filters"], "filters"):
+                self.refresh_filters()
+        return self.filters.get(symbol, {})
+
+    def update_price(self, symbol, price):
+        self.prices[symbol] = float(price)
+        self.price_updated[symbol] = time.monotonic()
+
+    def apply_order(self, symbol, order):
+        # The fill price doubles as the latest price; balances changed, so drop them
+        price = fill_price(order)
+        if price is not None:
+            self.update_price(symbol, price)
+        self.invalidate("balances")
+        return price
+
+    def apply_user_event(self, event):
+        # outboundAccountPosition events from the user-data stream carry the new balances
+        if event.get("e") == "outboundAccountPosition":
+            for b in event["B"]:
+                self.balances[b["a"]] = (float(b["f"]), float(b["l"]))
+            self.updated["balances"] = time.monotonic()
+
+    def round_quantity(self, symbol, quantity):
+        lot = self.symbol_filters(symbol).get("LOT_SIZE")
+        return round_step(quantity, lot["stepSize"]) if lot else round(quantity, 6)
+
+    def round_price(self, symbol, price):
+        tick = self.symbol_filters(symbol).get("PRICE_FILTER")
+        return round_step(price, tick["tickSize"]) if tick else round(price, 2)
@@ -1,110 +1,242 @@
+import argparse
 import backtrader as bt
 import pandas as pd
-from binance.client import Client
 import datetime
 import time  # Import time module for sleep function
-from data_fetcher import get_historical_data
+from data_fetcher import get_historical_data, get_memmap_data
+from result_cache import ResultCache, cache_key, code_fingerprint, hash_data
 from strategies import AdvancedStrategy, MLStrategy
 
-client = Client()  # No API keys needed for public data
 
-if __name__ == "__main__":
-    # Convert date strings to timestamps in milliseconds
-    start_str = "2024-01-01"
-    end_str = "2024-10-01"  # Adjust the end date for a shorter timeframe
-
-    start_ts = int(datetime.datetime.strptime(start_str, "%Y-%m-%d").timestamp() * 1000)
-    end_ts = int(datetime.datetime.strptime(end_str, "%Y-%m-%d").timestamp() * 1000)
-    
-    symbols = ["ETHUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "SOLUSDT"]
-
-    # Fetch historical data and save to CSV
-    historical_data = get_historical_data(
-        symbols=symbols,
-        interval=Client.KLINE_INTERVAL_15MINUTE,
-        start_ts=start_ts,
-        end_ts=end_ts,
-    )
-    if historical_data:
-        # Save each DataFrame to a CSV (optional)
-        for symbol, df in historical_data.items():
-            df.to_csv(f"{symbol}_historical.csv")
-
-        # Create Cerebro engine
-        cerebro = bt.Cerebro()
-
-        # Set initial cash
-        cerebro.broker.setcash(10000.0)
-
-        # Set commission
-        cerebro.broker.setcommission(commission=0.001)
-
-        # Add data feeds to Cerebro
-        for symbol, df in historical_data.items():
-            data = bt.feeds.PandasData(dataname=df, name=symbol)
-            cerebro.adddata(data)
-
-        # Add strategy to Cerebro
-        cerebro.addstrategy(AdvancedStrategy)
-
-        # Add analyzers
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-
-        # Add a TradeAnalyzer for each data feed
-        for data in cerebro.datas:
-            analyzer_name = 'ta_{}'.format(data._name)
-            cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name=analyzer_name)
-
-        # Run backtest
-        print("Starting Portfolio Value: %.2f" % cerebro.broker.getvalue())
-        results = cerebro.run()
-        print("Final Portfolio Value: %.2f" % cerebro.broker.getvalue())
-
-        # Extract and print global analyzers
-        strat = results[0]
-        sharpe = strat.analyzers.sharpe.get_analysis()
-        drawdown = strat.analyzers.drawdown.get_analysis()
-        print(f"Sharpe Ratio: {sharpe.get('sharperatio', None)}")
-        print(f"Max Drawdown: {drawdown.max.drawdown:.2f}%")
-
-        # Extract and print trade statistics per symbol
-        for data in cerebro.datas:
-            symbol = data._name
-            analyzer_name = 'ta_{}'.format(symbol)
-            trade_analyzer = strat.analyzers.getbyname(analyzer_name)
-            trade_analysis = trade_analyzer.get_analysis()
-
-            # Extract trade statistics
-            total_trades = trade_analysis.total.closed if hasattr(trade_analysis.total, 'closed') else 0
-            profitable_trades = trade_analysis.won.total if hasattr(trade_analysis.won, 'total') else 0
-            losing_trades = trade_analysis.lost.total if hasattr(trade_analysis.lost, 'total') else 0
-
-            # Calculate win rate
-            win_rate = (profitable_trades / total_trades) * 100 if total_trades > 0 else 0
-
-            # Total gross profit and loss
-            gross_profit = trade_analysis.won.pnl.total if hasattr(trade_analysis.won.pnl, 'total') else 0
-            gross_loss = trade_analysis.lost.pnl.total if hasattr(trade_analysis.lost.pnl, 'total') else 0
-
-            # Average profit and loss per trade
-            avg_profit = trade_analysis.won.pnl.average if hasattr(trade_analysis.won.pnl, 'average') else 0
-            avg_loss = trade_analysis.lost.pnl.average if hasattr(trade_analysis.lost.pnl, 'average') else 0
-
-            # Profit factor
-            profit_factor = (gross_profit / abs(gross_loss)) if gross_loss != 0 else None
-
-            # Print per-symbol statistics
-            print(f"\n--- Trade Analysis for {symbol} ---")
-            print(f"Total Trades: {total_trades}")
-            print(f"Profitable Trades: {profitable_trades}")
-            print(f"Losing Trades: {losing_trades}")
-            print(f"Win Rate: {win_rate:.2f}%")
-            print(f"Average Profit per Trade: {avg_profit:.2f}")
-            print(f"Average Loss per Trade: {avg_loss:.2f}")
-            print(f"Profit Factor: {profit_factor:.2f}")
-
-        # Plot results
+class SymbolTradeAnalyzer(bt.analyzers.TradeAnalyzer):
+    # TradeAnalyzer sees the trades of every feed; keep only one symbol's trades
+    params = (("symbol", None),)
+
+    def notify_trade(self, trade):
+        if trade.data._name == self.p.symbol:
+            super(SymbolTradeAnalyzer, self).notify_trade(trade)
+
+
+class EquityCurve(bt.Analyzer):
+    # Broker value at every bar close, as a Series like the vector engine's equity
+    def start(self):
+        self.dates = []
+        self.values = []
+
+    def next(self):
+        self.dates.append(self.datas[0].datetime.datetime(0))
+        self.values.append(self.strategy.broker.getvalue())
+
+    def get_analysis(self):
+        return pd.Series(self.values, index=pd.DatetimeIndex(self.dates, name="Date"), name="Value")
+
+
+def make_feed(symbol, data):
+    # DataFrames go through PandasData; kline record arrays (e.g. memory-mapped
+    # views from get_memmap_data) are streamed by MemmapData
+    if isinstance(data, pd.DataFrame):
+        return bt.feeds.PandasData(dataname=data, name=symbol)
+    from mmap_feed import MemmapData
+    return MemmapData(records=data, name=symbol)
+
+
+def run_backtrader(historical_data, strategy=AdvancedStrategy, cash=10000.0, commission=0.001, plot=False,
+                   preload=True, exactbars=False):
+    # preload=False with exactbars=1 keeps only the bars the indicators need,
+    # which together with memory-mapped feeds bounds memory for large universes
+    # (plotting needs the full buffers)
+    cerebro = bt.Cerebro(preload=preload, exactbars=exactbars)
+
+    # Set initial cash
+    cerebro.broker.setcash(cash)
+
+    # Set commission
+    cerebro.broker.setcommission(commission=commission)
+
+    # Add data feeds to Cerebro
+    for symbol, data in historical_data.items():
+        cerebro.adddata(make_feed(symbol, data))
+
+    # Add strategy to Cerebro
+    cerebro.addstrategy(strategy)
+
+    # Add analyzers
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
+    cerebro.addanalyzer(EquityCurve, _name='equity')
+
+    # Add a TradeAnalyzer for each data feed
+    for data in cerebro.datas:
+        analyzer_name = 'ta_{}'.format(data._name)
+        cerebro.addanalyzer(SymbolTradeAnalyzer, symbol=data._name, _name=analyzer_name)
+
+    # Run backtest
+    start_value = cerebro.broker.getvalue()
+    results = cerebro.run()
+
+    # Extract global analyzers
+    strat = results[0]
+    sharpe = strat.analyzers.sharpe.get_analysis()
+    drawdown = strat.analyzers.drawdown.get_analysis()
+    summary = {
+        "engine": "backtrader",
+        "start_value": start_value,
+        "final_value": cerebro.broker.getvalue(),
+        "sharpe": sharpe.get('sharperatio', None),
+        "max_drawdown": drawdown.max.drawdown,
+        "trades": {},
+        "equity": strat.analyzers.equity.get_analysis(),
+    }
+
+    # Extract trade statistics per symbol
+    for data in cerebro.datas:
+        symbol = data._name
+        analyzer_name = 'ta_{}'.format(symbol)
+        trade_analyzer = strat.analyzers.getbyname(analyzer_name)
+        trade_analysis = trade_analyzer.get_analysis()
+
+        total_trades = trade_analysis.total.closed if hasattr(trade_analysis.total, 'closed') else 0
+        profitable_trades = trade_analysis.won.total if hasattr(trade_analysis.won, 'total') else 0
+        losing_trades = trade_analysis.lost.total if hasattr(trade_analysis.lost, 'total') else 0
+
+        # Total gross profit and loss
+        gross_profit = trade_analysis.won.pnl.total if hasattr(trade_analysis.won.pnl, 'total') else 0
+        gross_loss = trade_analysis.lost.pnl.total if hasattr(trade_analysis.lost.pnl, 'total') else 0
+
+        # Average profit and loss per trade
+        avg_profit = trade_analysis.won.pnl.average if hasattr(trade_analysis.won.pnl, 'average') else 0
+        avg_loss = trade_analysis.lost.pnl.average if hasattr(trade_analysis.lost.pnl, 'average') else 0
+
+        summary["trades"][symbol] = {
+            "total_trades": total_trades,
+            "profitable_trades": profitable_trades,
+            "losing_trades": losing_trades,
+            "gross_profit": gross_profit,
+            "gross_loss": gross_loss,
+            "avg_profit": avg_profit,
+            "avg_loss": avg_loss,
+        }
+
+    if plot and not exactbars:
         cerebro.plot()
+    return summary
+
+
+def run_vector(historical_data, strategy=AdvancedStrategy, cash=10000.0, commission=0.001, plot=False):
+    from vector_backtest import run_vector_backtest
+
+    if strategy is not AdvancedStrategy:
+        raise ValueError("The vector engine only implements AdvancedStrategy")
+    if strategy.params.sizing != "atr":
+        raise ValueError("The vector engine only implements ATR sizing")
+    params = {name: getattr(strategy.params, name) for name in strategy.params._getkeys()}
+    return run_vector_backtest(historical_data, params=params, cash=cash, commission=commission)
+
+
+ENGINES = {
+    "backtrader": run_backtrader,
+    "vector": run_vector,
+}
+
+
+def engine_code(engine):
+    # Code, besides the strategy class, that a cached result depends on
+    if engine == "vector":
+        import indicators
+        import vector_backtest
+        return [run_vector, vector_backtest, indicators]
+    return [run_backtrader, SymbolTradeAnalyzer, EquityCurve, make_feed]
+
+
+def run_cached(engine, historical_data, strategy=AdvancedStrategy, cash=10000.0, commission=0.001,
+               cache=None, **options):
+    # Returns a stored result when the bars, strategy/engine source, params, cash
+    # and commission all match a previous run
+    cache = cache if cache is not None else ResultCache()
+    params = {name: getattr(strategy.params, name) for name in strategy.params._getkeys()}
+    key = cache_key(
+        hash_data(historical_data),
+        code_fingerprint(strategy, *engine_code(engine)),
+        params,
+        engine=engine, strategy=strategy.__name__, cash=cash, commission=commission, **options
+    )
+    return cache.cached(key, lambda: ENGINES[engine](
+        historical_data, strategy=strategy, cash=cash, commission=commission, **options
+    ))
+
+
+def print_summary(summary):
+    print("Starting Portfolio Value: %.2f" % summary["start_value"])
+    print("Final Portfolio Value: %.2f" % summary["final_value"])
+    print(f"Sharpe Ratio: {summary['sharpe']}")
+    print(f"Max Drawdown: {summary['max_drawdown']:.2f}%")
+
+    for symbol, stats in summary["trades"].items():
+        total_trades = stats["total_trades"]
+
+        # Calculate win rate
+        win_rate = (stats["profitable_trades"] / total_trades) * 100 if total_trades > 0 else 0
+
+        # Profit factor
+        gross_loss = stats["gross_loss"]
+        profit_factor = (stats["gross_profit"] / abs(gross_loss)) if gross_loss != 0 else None
+
+        # Print per-symbol statistics
+        print(f"\n--- Trade Analysis for {symbol} ---")
+        print(f"Total Trades: {total_trades}")
+        print(f"Profitable Trades: {stats['profitable_trades']}")
+        print(f"Losing Trades: {stats['losing_trades']}")
+        print(f"Win Rate: {win_rate:.2f}%")
+        print(f"Average Profit per Trade: {stats['avg_profit']:.2f}")
+        print(f"Average Loss per Trade: {stats['avg_loss']:.2f}")
+        print(f"Profit Factor: {profit_factor:.2f}" if profit_factor is not None else "Profit Factor: N/A")
+
+
+def run_from_args(args):
+    # Entry point for `cli.py backtest` (see cli.add_backtest_arguments)
+    start_ts = int(datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int(datetime.datetime.strptime(args.end, "%Y-%m-%d").timestamp() * 1000)
+    symbols = args.symbols.split(",")
+
+    if args.feed == "memmap" and args.engine != "backtrader":
+        raise SystemExit("--feed memmap is only supported by the backtrader engine")
+
+    if args.feed == "memmap":
+        # Bars stay on disk; backtrader streams them with bounded buffers
+        historical_data = get_memmap_data(symbols, args.interval, start_ts, end_ts)
+        if historical_data:
+            if args.no_cache:
+                summary = run_backtrader(historical_data, preload=False, exactbars=1)
+            else:
+                summary = run_cached("backtrader", historical_data, preload=False, exactbars=1)
+            print_summary(summary)
+        else:
+            print("Historical data could not be fetched.")
     else:
-        print("Historical data could not be fetched.")
+        # Fetch historical data and save to CSV
+        historical_data = get_historical_data(
+            symbols=symbols,
+            interval=args.interval,
+            start_ts=start_ts,
+            end_ts=end_ts,
+        )
+        if historical_data:
+            # Save each DataFrame to a CSV (optional)
+            for symbol, df in historical_data.items():
+                df.to_csv(f"{symbol}_historical.csv")
+
+            if args.no_cache or args.plot:
+                summary = ENGINES[args.engine](historical_data, plot=args.plot)
+            else:
+                summary = run_cached(args.engine, historical_data)
+            print_summary(summary)
+        else:
+            print("Historical data could not be fetched.")
+
+
+if __name__ == "__main__":
+    from cli import add_backtest_arguments
+
+    parser = argparse.ArgumentParser(description="Backtest AdvancedStrategy on Binance klines")
+    add_backtest_arguments(parser)
+    run_from_args(parser.parse_args())
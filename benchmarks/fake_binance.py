@@ -0,0 +1,163 @@
+# benchmarks/fake_binance.py
+# Local stand-in for the Binance REST endpoints the bot uses, serving synthetic
+# klines. Point a Client at it with fake.client() or client.API_URL = fake.api_url.
+import bisect
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from binance.client import Client
+
+
+class FakeBinance:
+    def __init__(self, klines_by_symbol, latency=0.0, host="127.0.0.1", port=0, balances=None, trades_by_symbol=None):
+        # trades_by_symbol: optional {symbol: TRADE_DTYPE records} served by aggTrades
+        self.klines = klines_by_symbol
+        self.trades = trades_by_symbol or {}
+        self.open_times = {symbol: [k[0] for k in rows] for symbol, rows in klines_by_symbol.items()}
+        self.latency = latency
+        self.balances = balances or {"USDT": 10000.0}
+        self.order_ids = itertools.count(1)
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def api_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def client(self, **kwargs):
+        client = Client("fake-key", "fake-secret", ping=False, **kwargs)
+        client.API_URL = self.api_url
+        return client
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def last_price(self, symbol):
+        return float(self.klines[symbol][-1][4])
+
+    # Endpoint handlers: (query params) -> JSON-serialisable response
+
+    def get_klines(self, params):
+        symbol = params["symbol"]
+        limit = int(params.get("limit", 500))
+        start = int(params.get("startTime", 0))
+        end = int(params.get("endTime", 2 ** 62))
+        times = self.open_times.get(symbol, [])
+        lo = bisect.bisect_left(times, start)
+        hi = min(bisect.bisect_right(times, end), lo + limit)
+        return self.klines[symbol][lo:hi]
+
+    def get_agg_trades(self, params):
+        trades = self.trades.get(params["symbol"])
+        if trades is None:
+            return []
+        limit = int(params.get("limit", 500))
+        if "fromId" in params:
+            lo = bisect.bisect_left(trades["agg_id"], int(params["fromId"]))
+            hi = lo + limit
+        else:
+            times = trades["time"]
+            lo = bisect.bisect_left(times, int(params.get("startTime", 0)))
+            hi = min(bisect.bisect_right(times, int(params.get("endTime", 2 ** 62))), lo + limit)
+        return [
+            {"a": int(t["agg_id"]), "p": f"{t['price']:.8f}", "q": f"{t['qty']:.8f}", "f": int(t["agg_id"]),
+             "l": int(t["agg_id"]), "T": int(t["time"]), "m": bool(t["buyer_maker"]), "M": True}
+            for t in trades[lo:hi]
+        ]
+
+    def get_ticker(self, params):
+        if "symbol" in params:
+            return {"symbol": params["symbol"], "price": f"{self.last_price(params['symbol']):.8f}"}
+        return [{"symbol": s, "price": f"{self.last_price(s):.8f}"} for s in self.klines]
+
+    def get_account(self, params):
+        return {"balances": [
+            {"asset": asset, "free": f"{free:.8f}", "locked": "0.00000000"}
+            for asset, free in self.balances.items()
+        ]}
+
+    def get_exchange_info(self, params):
+        return {"symbols": [
+            {"symbol": s, "filters": [
+                {"filterType": "PRICE_FILTER", "tickSize": "0.01000000"},
+                {"filterType": "LOT_SIZE", "stepSize": "0.00001000"},
+            ]}
+            for s in self.klines
+        ]}
+
+    def post_order(self, params):
+        qty = float(params["quantity"])
+        price = self.last_price(params["symbol"])
+        return {
+            "symbol": params["symbol"], "orderId": next(self.order_ids), "status": "FILLED",
+            "side": params["side"], "type": params["type"],
+            "executedQty": f"{qty:.8f}", "cummulativeQuoteQty": f"{qty * price:.8f}",
+            "fills": [{"price": f"{price:.8f}", "qty": f"{qty:.8f}", "commission": "0", "commissionAsset": "BNB"}],
+        }
+
+    def post_oco(self, params):
+        return {"orderListId": next(self.order_ids), "symbol": params["symbol"], "listStatusType": "EXEC_STARTED"}
+
+    ROUTES = {
+        ("GET", "/api/v3/ping"): lambda self, params: {},
+        ("GET", "/api/v3/time"): lambda self, params: {"serverTime": int(time.time() * 1000)},
+        ("GET", "/api/v3/klines"): get_klines,
+        ("GET", "/api/v3/aggTrades"): get_agg_trades,
+        ("GET", "/api/v3/ticker/price"): get_ticker,
+        ("GET", "/api/v3/account"): get_account,
+        ("GET", "/api/v3/exchangeInfo"): get_exchange_info,
+        ("POST", "/api/v3/order"): post_order,
+        ("POST", "/api/v3/order/oco"): post_oco,
+        ("POST", "/api/v3/orderList/oco"): post_oco,
+    }
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def _dispatch(self, method):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if method == "POST":
+                    body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                    params.update({k: v[0] for k, v in parse_qs(body).items()})
+                route = fake.ROUTES.get((method, url.path))
+                fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if route is None:
+                    status, payload = 404, {"code": -1, "msg": f"Unknown endpoint {url.path}"}
+                else:
+                    status, payload = 200, route(fake, params)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,341 @@
+# benchmarks/run.py
+# python -m benchmarks.run [--only download,parse] [--bars N] [--symbols N]
+# Runs the hot-path benchmarks on synthetic data and appends the results to a
+# JSON history so changes between commits show up as deltas.
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.fake_binance import FakeBinance
+from benchmarks.synthetic import generate_agg_trades, generate_frames, generate_klines
+
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), "history.json")
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def symbol_names(count):
+    return [f"SYM{i}USDT" for i in range(count)]
+
+
+@benchmark("download")
+def bench_download(symbols, bars, interval):
+    from downloader import KlineDownloader
+
+    klines = {symbol: generate_klines(symbol, bars, interval) for symbol in symbols}
+    with FakeBinance(klines) as fake:
+        downloader = KlineDownloader(fake.client())
+        ranges = {symbol: (symbol, interval, rows[0][0], rows[-1][0]) for symbol, rows in klines.items()}
+        started = time.perf_counter()
+        fetched = downloader.download(ranges)
+        elapsed = time.perf_counter() - started
+    rows = sum(len(r) for r in fetched.values())
+    return {
+        "pages_per_sec": (downloader.pages_per_sec, "pages/s"),
+        "rows_per_sec": (rows / elapsed, "rows/s"),
+    }
+
+
+def measure(func):
+    # (seconds, peak traced allocation in bytes); timed without tracing, which
+    # slows allocation-heavy code down considerably
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def legacy_parse(rows):
+    # The original path: 12-column object frame, then astype(float)
+    df = pd.DataFrame(rows, columns=[
+        "Date", "Open", "High", "Low", "Close", "Volume", "Close_time", "Quote_asset_volume",
+        "Number_of_trades", "Taker_buy_base_asset_volume", "Taker_buy_quote_asset_volume", "Ignore",
+    ])
+    df["Date"] = pd.to_datetime(df["Date"], unit="ms")
+    df.set_index("Date", inplace=True)
+    return df[["Open", "High", "Low", "Close", "Volume"]].astype(float)
+
+
+@benchmark("parse")
+def bench_parse(symbols, bars, interval):
+    from kline_store import kline_dtype, records_to_frame, rows_to_records
+
+    rows = generate_klines(symbols[0], bars, interval)
+    variants = {
+        "legacy": lambda: legacy_parse(rows),
+        "f8": lambda: records_to_frame(rows_to_records(rows, kline_dtype("f8"))),
+        "f4": lambda: records_to_frame(rows_to_records(rows, kline_dtype("f4"))),
+        "f4_extras": lambda: records_to_frame(rows_to_records(rows, kline_dtype("f4", extras=True))),
+    }
+    results = {}
+    for name, func in variants.items():
+        elapsed, peak = measure(func)
+        results[f"{name}_rows_per_sec"] = (bars / elapsed, "rows/s")
+        results[f"{name}_peak_mib"] = (peak / 2 ** 20, "MiB")
+    return results
+
+
+@benchmark("indicators")
+def bench_indicators(symbols, bars, interval):
+    from streaming_indicators import LiveSignalEngine
+    from vector_backtest import DEFAULT_PARAMS, compute_indicators
+
+    df = generate_frames(symbols[:1], bars, interval)[symbols[0]]
+    closes = df["Close"].tolist()
+
+    engine = LiveSignalEngine(5, 20)
+    started = time.perf_counter()
+    for close in closes:
+        engine.update(close)
+    results = {"streaming_us_per_bar": ((time.perf_counter() - started) / bars * 1e6, "us")}
+
+    started = time.perf_counter()
+    compute_indicators(df, DEFAULT_PARAMS)
+    results["vector_us_per_bar"] = ((time.perf_counter() - started) / bars * 1e6, "us")
+
+    import main
+
+    window = df.iloc[-500:].copy()
+    try:
+        started = time.perf_counter()
+        main.apply_technicals(window, 5, 20)
+        main.generate_signals(window)
+        results["apply_technicals_ms_per_call"] = ((time.perf_counter() - started) * 1e3, "ms")
+    except ImportError as e:  # pandas_ta is optional outside the live bot
+        results["apply_technicals_ms_per_call"] = (None, f"skipped: {e}")
+    return results
+
+
+@benchmark("backtest")
+def bench_backtest(symbols, bars, interval):
+    from backtest import run_backtrader
+    from vector_backtest import run_vector_backtest
+
+    data = generate_frames(symbols, bars, interval)
+    total_bars = bars * len(symbols)
+    started = time.perf_counter()
+    run_vector_backtest(data)
+    results = {"vector_bars_per_sec": (total_bars / (time.perf_counter() - started), "bars/s")}
+
+    # backtrader is far slower; a slice keeps the run short
+    small = {symbol: df.iloc[:min(bars, 2000)] for symbol, df in data.items()}
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_backtrader(small)
+    small_bars = sum(len(df) for df in small.values())
+    results["backtrader_bars_per_sec"] = (small_bars / (time.perf_counter() - started), "bars/s")
+    return results
+
+
+@benchmark("ml")
+def bench_ml(symbols, bars, interval):
+    import backtrader as bt
+    from strategies import MLStrategy
+
+    df = generate_frames(symbols[:1], min(bars, 1500), interval)[symbols[0]]
+    cerebro = bt.Cerebro()
+    cerebro.adddata(bt.feeds.PandasData(dataname=df, name=symbols[0]))
+    cerebro.addstrategy(MLStrategy, n_estimators=20)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cerebro.run()
+    return {"ms_per_bar": ((time.perf_counter() - started) / len(df) * 1e3, "ms")}
+
+
+@benchmark("timeframes")
+def bench_timeframes(symbols, bars, interval, batch=5):
+    import tempfile
+
+    from kline_store import KlineStore, rows_to_records
+    from timeframes import DERIVED_INTERVALS, TimeframeStore
+
+    # bars is taken in 1m candles; the last ones arrive in small live-sized batches
+    records = rows_to_records(generate_klines(symbols[0], bars, "1m"))
+    history, batches = records[:-10 * batch], records[-10 * batch:]
+    with tempfile.TemporaryDirectory() as root:
+        timeframes = TimeframeStore(KlineStore(root))
+        started = time.perf_counter()
+        timeframes.extend(symbols[0], history, [[int(history["open_time"][0]), int(history["open_time"][-1])]])
+        results = {"derive_all_seconds": (time.perf_counter() - started, "s")}
+        started = time.perf_counter()
+        for i in range(0, len(batches), batch):
+            new = batches[i:i + batch]
+            timeframes.extend(symbols[0], new, [[int(new["open_time"][0]), int(new["open_time"][-1]) + 59_999]])
+        results["extend_batch_ms"] = ((time.perf_counter() - started) * 1000 / 10, "ms")
+    return results
+
+
+@benchmark("paper")
+def bench_paper(symbols, bars, interval, trades=500):
+    # The bot's order path (market order + OCO via main.execute_trade) against a
+    # PaperExchange with no modelled latency, i.e. the client-side overhead
+    import main
+    from account_cache import AccountState, CountingClient
+    from kline_store import rows_to_records
+    from paper_exchange import PaperExchange
+
+    records = {symbol: rows_to_records(generate_klines(symbol, bars, "1m")) for symbol in symbols}
+    paper = PaperExchange(records, "1m", balances={"USDT": 1e12})
+    main.client = CountingClient(paper)
+    main.state = AccountState(main.client)
+    started = time.perf_counter()
+    for i in range(trades):
+        main.execute_trade(symbols[i % len(symbols)], 1.0, "BUY")
+    elapsed = time.perf_counter() - started
+    main.client = main.state = None
+    return {"order_path_ms": (elapsed * 1000 / trades, "ms")}
+
+
+@benchmark("ticks")
+def bench_ticks(symbols, bars, interval):
+    import tempfile
+
+    from tick_replay import resample_store, run_tick_backtest
+    from tick_store import TickStore
+
+    # Roughly 100 trades per bar of the requested history
+    trades = generate_agg_trades(symbols[0], bars * 100)
+    with tempfile.TemporaryDirectory() as root:
+        store = TickStore(root)
+        store.append(symbols[0], trades)
+        started = time.perf_counter()
+        resample_store(store, symbols[0], interval)
+        results = {"resample_trades_per_sec": (len(trades) / (time.perf_counter() - started), "trades/s")}
+        started = time.perf_counter()
+        run_tick_backtest(store, symbols[0], interval)
+        results["replay_trades_per_sec"] = (len(trades) / (time.perf_counter() - started), "trades/s")
+    return results
+
+
+@benchmark("robustness")
+def bench_robustness(symbols, bars, interval, resamples=2000):
+    # All four experiments on a vector backtest, in this process (per-core throughput)
+    from robustness import analyze
+    from vector_backtest import run_vector_backtest
+
+    summary = run_vector_backtest(generate_frames(symbols, bars, interval))
+    started = time.perf_counter()
+    analyze(summary, resamples=resamples, processes=1)
+    return {"resamples_per_sec": (resamples / (time.perf_counter() - started), "resamples/s")}
+
+
+STARTUP_COMMANDS = {
+    "cli_help": ["cli.py", "--help"],
+    "import_data_fetcher": ["-c", "import data_fetcher"],
+    "import_backtest": ["-c", "import backtest"],
+    "import_main": ["-c", "import main"],
+}
+
+
+@benchmark("startup")
+def bench_startup(symbols, bars, interval, repeats=3):
+    # Cold start of a fresh interpreter, best of a few runs
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for name, argv in STARTUP_COMMANDS.items():
+        best = None
+        for _ in range(repeats):
+            started = time.perf_counter()
+            subprocess.run([sys.executable] + argv, cwd=root, check=True, capture_output=True)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[f"{name}_ms"] = (best * 1e3, "ms")
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def previous_results(history, params):
+    # Latest earlier result of each benchmark run with the same params; runs at
+    # other sizes are not comparable, and --only runs hold a subset
+    previous = {}
+    for entry in reversed(history):
+        if entry.get("params") != params:
+            continue
+        for name, metrics in entry["results"].items():
+            previous.setdefault(name, metrics)
+    return previous
+
+
+def print_results(results, previous):
+    for name, metrics in results.items():
+        print(f"--- {name} ---")
+        for metric, (value, unit) in metrics.items():
+            if value is None:
+                print(f"  {metric}: {unit}")
+                continue
+            line = f"  {metric}: {value:,.2f} {unit}"
+            old = previous.get(name, {}).get(metric, [None])[0]
+            if old:
+                line += f" ({(value / old - 1) * 100:+.1f}% vs previous)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run TradingBot benchmarks")
+    parser.add_argument("--only", help="Comma-separated subset of: " + ",".join(BENCHMARKS))
+    parser.add_argument("--bars", type=int, default=20000)
+    parser.add_argument("--symbols", type=int, default=5)
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    symbols = symbol_names(args.symbols)
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name](symbols, args.bars, args.interval)
+
+    params = {"bars": args.bars, "symbols": args.symbols, "interval": args.interval}
+    history = load_history(args.history)
+    print_results(results, previous_results(history, params))
+
+    if not args.no_save:
+        history.append({
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": current_commit(),
+            "params": params,
+            "results": results,
+        })
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
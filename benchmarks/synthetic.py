@@ -0,0 +1,49 @@
+# benchmarks/synthetic.py
+# Seeded synthetic OHLCV in Binance's raw kline row format and as DataFrames.
+import numpy as np
+
+from kline_store import interval_to_ms, records_to_frame, rows_to_records
+
+DEFAULT_START_TS = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+def generate_klines(symbol, bars, interval="15m", start_ts=DEFAULT_START_TS, seed=0, volatility=0.004):
+    # Geometric random walk; each symbol gets its own stream derived from the seed
+    rng = np.random.default_rng([seed, sum(map(ord, symbol))])
+    interval_ms = interval_to_ms(interval)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, volatility, bars)))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    high = np.maximum(open_, close) * (1.0 + np.abs(rng.normal(0.0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * (1.0 - np.abs(rng.normal(0.0, volatility / 2, bars)))
+    volume = rng.uniform(10.0, 1000.0, bars)
+    trades = rng.integers(10, 5000, bars)
+    open_times = start_ts + np.arange(bars, dtype=np.int64) * interval_ms
+    return [
+        [
+            int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}",
+            int(t + interval_ms - 1), f"{v * c:.8f}", int(n), f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0",
+        ]
+        for t, o, h, l, c, v, n in zip(open_times, open_, high, low, close, volume, trades)
+    ]
+
+
+def generate_frames(symbols, bars, interval="15m", start_ts=DEFAULT_START_TS, seed=0):
+    # {symbol: OHLCV DataFrame}, the same shape get_historical_data returns
+    return {
+        symbol: records_to_frame(rows_to_records(generate_klines(symbol, bars, interval, start_ts, seed)))
+        for symbol in symbols
+    }
+
+
+def generate_agg_trades(symbol, trades, start_ts=DEFAULT_START_TS, seed=0, mean_gap_ms=200, volatility=0.0003):
+    # TRADE_DTYPE records: a random-walk price with exponential gaps between trades
+    from tick_store import TRADE_DTYPE
+
+    rng = np.random.default_rng([seed, sum(map(ord, symbol)), 1])
+    records = np.empty(trades, dtype=TRADE_DTYPE)
+    records["agg_id"] = np.arange(trades, dtype=np.int64)
+    records["time"] = start_ts + np.cumsum(rng.exponential(mean_gap_ms, trades)).astype(np.int64)
+    records["price"] = np.round(100.0 * np.exp(np.cumsum(rng.normal(0.0, volatility, trades))), 4)
+    records["qty"] = np.round(rng.exponential(0.5, trades), 5)
+    records["buyer_maker"] = rng.random(trades) < 0.5
+    return records
@@ -0,0 +1,142 @@
+# cli.py
+# python cli.py [--timeout S] [--pool-size N] {live,backtest,fetch,paper,robustness} ...
+# Single entry point. Only argparse is imported up front; each subcommand imports
+# its own modules, so `fetch` never loads backtrader or scikit-learn and `backtest`
+# never loads the binance client unless klines have to be downloaded.
+import argparse
+import datetime
+
+DEFAULT_SYMBOLS = "ETHUSDT,XRPUSDT,ADAUSDT,DOGEUSDT,SOLUSDT"
+
+
+def _date_range_arguments(parser, interval="15m"):
+    parser.add_argument("--symbols", default=DEFAULT_SYMBOLS, help="Comma-separated symbols")
+    parser.add_argument("--interval", default=interval)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2024-10-01")
+
+
+def add_live_arguments(parser):
+    parser.add_argument("--poll", action="store_true", help="Use the 60s polling loop instead of the kline stream")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: main.symbols)")
+    parser.add_argument("--interval", help="Kline interval (default: main.interval)")
+    parser.add_argument("--testnet", action="store_true", help="Trade against the Binance spot testnet")
+
+
+def add_backtest_arguments(parser):
+    parser.add_argument("--engine", choices=["backtrader", "vector"], default="backtrader")
+    parser.add_argument("--feed", choices=["pandas", "memmap"], default="pandas",
+                        help="memmap streams bars from the kline cache (backtrader engine only)")
+    parser.add_argument("--plot", action="store_true", help="Plot the backtrader run (always re-runs)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the result cache")
+    _date_range_arguments(parser)
+
+
+def add_fetch_arguments(parser):
+    _date_range_arguments(parser)
+    parser.add_argument("--price-dtype", choices=["f8", "f4"], default="f8")
+    parser.add_argument("--extras", action="store_true", help="Also keep quote volume, trades and taker volumes")
+    parser.add_argument("--cache-dir", default="kline_cache")
+    parser.add_argument("--direct", action="store_true",
+                        help="Download the interval itself instead of deriving it from cached 1m candles")
+
+
+def add_paper_arguments(parser):
+    _date_range_arguments(parser, interval="1m")
+    parser.set_defaults(start="2024-09-01", end="2024-09-08")
+    parser.add_argument("--poll", action="store_true", help="Use the polling loop instead of the kline stream")
+    parser.add_argument("--speed", type=float, default=600.0, help="Simulated seconds per real second")
+    parser.add_argument("--cash", type=float, default=10000.0, help="Starting USDT balance")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Base latency of every request")
+    parser.add_argument("--order-latency-ms", type=float, help="Base latency of order requests (default: --latency-ms)")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Mean exponential jitter added to each request")
+    parser.add_argument("--maker-fee", type=float, default=0.001)
+    parser.add_argument("--taker-fee", type=float, default=0.001)
+    parser.add_argument("--spread-bps", type=float, default=0.0, help="Bid/ask spread paid by market orders")
+
+
+def add_robustness_arguments(parser):
+    parser.add_argument("--engine", choices=["backtrader", "vector"], default="vector")
+    _date_range_arguments(parser)
+    parser.add_argument("--resamples", type=int, default=10_000)
+    parser.add_argument("--timeframe", choices=["days", "weeks", "months", "years", "bars"], default="days",
+                        help="Return period the equity is resampled at")
+    parser.add_argument("--block-size", type=int, help="Periods per bootstrap block (default: cube root of the count)")
+    parser.add_argument("--max-slippage", type=float, default=0.001, help="Upper bound of the per-fill slippage fraction")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per CPU, 1 runs in-process)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def run_live(args):
+    import main
+    main.run_from_args(args)
+
+
+def run_backtest(args):
+    import backtest
+    backtest.run_from_args(args)
+
+
+def run_fetch(args):
+    from data_fetcher import get_historical_data
+    from timeframes import BASE_INTERVAL
+
+    start_ts = int(datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int(datetime.datetime.strptime(args.end, "%Y-%m-%d").timestamp() * 1000)
+    get_historical_data(args.symbols.split(","), args.interval, start_ts, end_ts, cache_dir=args.cache_dir,
+                        price_dtype=args.price_dtype, extras=args.extras,
+                        base_interval=None if args.direct else BASE_INTERVAL)
+
+
+def run_paper(args):
+    from data_fetcher import get_memmap_data
+    from paper_exchange import FeeModel, LatencyModel, print_report, run_paper
+
+    start_ts = int(datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int(datetime.datetime.strptime(args.end, "%Y-%m-%d").timestamp() * 1000)
+    klines = get_memmap_data(args.symbols.split(","), args.interval, start_ts, end_ts)
+    order_latency = None if args.order_latency_ms is None else args.order_latency_ms / 1000
+    paper = run_paper(
+        klines, args.interval, speed=args.speed, cash=args.cash, poll=args.poll,
+        latency=LatencyModel(args.latency_ms / 1000, args.jitter_ms / 1000, order_latency),
+        fees=FeeModel(args.maker_fee, args.taker_fee), spread=args.spread_bps / 10_000,
+    )
+    print_report(paper)
+
+
+def run_robustness(args):
+    import robustness
+    robustness.run_from_args(args)
+
+
+COMMANDS = {
+    "live": (add_live_arguments, run_live, "Run the live trading bot"),
+    "backtest": (add_backtest_arguments, run_backtest, "Backtest AdvancedStrategy"),
+    "fetch": (add_fetch_arguments, run_fetch, "Download klines into the local cache"),
+    "paper": (add_paper_arguments, run_paper, "Run the live loop against a local paper exchange"),
+    "robustness": (add_robustness_arguments, run_robustness, "Bootstrap and Monte Carlo intervals of a backtest"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="TradingBot")
+    parser.add_argument("--timeout", type=float, default=10, help="REST request timeout in seconds")
+    parser.add_argument("--pool-size", type=int, default=32, help="Keep-alive HTTP connections in the pool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (add_arguments, _, help_text) in COMMANDS.items():
+        add_arguments(subparsers.add_parser(name, help=help_text))
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    import exchange
+
+    exchange.configure(timeout=args.timeout, pool_size=args.pool_size)
+    COMMANDS[args.command][1](args)
+
+
+if __name__ == "__main__":
+    main()
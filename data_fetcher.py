@@ -1,55 +1,120 @@
 # data_fetcher.py
-import pandas as pd
+import numpy as np
 import time
-from binance.client import Client
+import exchange
+from downloader import KlineDownloader
+from kline_store import KlineStore, interval_to_ms, kline_dtype, records_to_frame
+from timeframes import BASE_INTERVAL, TimeframeStore, can_derive
 
-client = Client()
+client = None  # Overrides the shared exchange client when set
+DEFAULT_CACHE_DIR = "kline_cache"
+
+
+def get_client():
+    # Built on first use so cached ranges can be read without network access
+    return client if client is not None else exchange.get_client()
+
+
+def download_missing(store, symbols, interval, start_ts, end_ts, dtype, max_workers=8):
+    # Download every range the store does not cover (the full range without a
+    # store) in one batch -> {(symbol, gap_start, gap_end): records}
+    ranges = {}
+    for symbol in symbols:
+        gaps = store.missing(symbol, interval, start_ts, end_ts) if store else [[start_ts, end_ts]]
+        for gap_start, gap_end in gaps:
+            ranges[(symbol, gap_start, gap_end)] = (symbol, interval, gap_start, gap_end)
+    if not ranges:
+        return {}
+    downloader = KlineDownloader(get_client(), max_workers=max_workers, dtype=dtype)
+    fetched = downloader.download(ranges)
+    print(
+        f"Downloaded {downloader.pages} pages in {downloader.seconds:.2f}s "
+        f"({downloader.pages_per_sec:.1f} pages/s), parsed {downloader.rows} rows "
+        f"({downloader.parse_rows_per_sec:,.0f} rows/s)"
+    )
+    return fetched
+
+
+def store_closed(store, symbol, interval, fetched):
+    # Write the symbol's closed candles to the store and return the ones still
+    # open at fetch time, which are never marked as covered
+    closed_until = int(time.time() * 1000) - interval_to_ms(interval)
+    tail = [np.empty(0, dtype=store.dtype)]
+    for (key_symbol, gap_start, gap_end), gap_records in fetched.items():
+        if key_symbol != symbol:
+            continue
+        is_closed = gap_records["open_time"] <= closed_until
+        tail.append(gap_records[~is_closed])
+        covered_end = min(gap_end, closed_until)
+        if covered_end >= gap_start:
+            store.write(symbol, interval, gap_records[is_closed], [[gap_start, covered_end]])
+    return np.concatenate(tail)
+
+
+def get_historical_data(symbols, interval, start_ts, end_ts, cache_dir=DEFAULT_CACHE_DIR, max_workers=8,
+                        price_dtype="f8", extras=False, base_interval=BASE_INTERVAL):
+    # cache_dir=None disables the on-disk store and always downloads the full range.
+    # price_dtype="f4" halves memory; extras=True also keeps quote volume, trade
+    # count and taker volumes. Intervals that can be built from base_interval
+    # candles (see timeframes.py) are derived from the cached base series, so
+    # once it covers the range every such interval is served without network
+    # I/O; base_interval=None downloads the interval itself.
+    dtype = kline_dtype(price_dtype, extras)
+    store = KlineStore(cache_dir, dtype) if cache_dir else None
+    timeframes = None
+    if store is not None and base_interval and can_derive(interval, base_interval):
+        timeframes = TimeframeStore(store, base_interval)
+        base_start, base_end = timeframes.base_range(interval, start_ts, end_ts)
+        fetched = download_missing(store, symbols, base_interval, base_start, base_end, dtype, max_workers)
+    else:
+        fetched = download_missing(store, symbols, interval, start_ts, end_ts, dtype, max_workers)
 
-def get_historical_data(symbols, interval, start_ts, end_ts):
     data_dict = {}
     for symbol in symbols:
-        data = []
-        limit = 1000  # Maximum records per request
-        current_start_ts = start_ts
-        while True:
-            klines = client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit,
-                startTime=current_start_ts,
-                endTime=end_ts,
-            )
-            if not klines:
-                break
-            data.extend(klines)
-            current_start_ts = klines[-1][6] + 1  # klines[-1][6] is the close time
-            if current_start_ts >= end_ts:
-                break
-            time.sleep(0.1)  # Sleep to avoid rate limits
-
-        if data:
-            df = pd.DataFrame(
-                data,
-                columns=[
-                    "Date",
-                    "Open",
-                    "High",
-                    "Low",
-                    "Close",
-                    "Volume",
-                    "Close_time",
-                    "Quote_asset_volume",
-                    "Number_of_trades",
-                    "Taker_buy_base_asset_volume",
-                    "Taker_buy_quote_asset_volume",
-                    "Ignore",
-                ],
-            )
-            df["Date"] = pd.to_datetime(df["Date"], unit="ms")
-            df.set_index("Date", inplace=True)
-            df = df[["Open", "High", "Low", "Close", "Volume"]]
-            df = df.astype(float)
-            data_dict[symbol] = df
+        if store is None:
+            records = fetched[(symbol, start_ts, end_ts)]
+        elif timeframes is not None:
+            tail = store_closed(store, symbol, base_interval, fetched)
+            records = timeframes.read(symbol, interval, start_ts, end_ts, tail)
+        else:
+            tail = store_closed(store, symbol, interval, fetched)
+            records = store.read(symbol, interval, start_ts, end_ts)
+            if len(tail):
+                records = np.concatenate([records[records["open_time"] < tail["open_time"][0]], tail])
+
+        if len(records):
+            data_dict[symbol] = records_to_frame(records)
+        else:
+            print(f"No data fetched for {symbol}.")
+    if data_dict:
+        nbytes = sum(df.memory_usage(index=True).sum() for df in data_dict.values())
+        print(f"Loaded {sum(len(df) for df in data_dict.values())} candles ({nbytes / 2**20:.1f} MiB)")
+    return data_dict
+
+
+def get_memmap_data(symbols, interval, start_ts, end_ts, cache_dir=DEFAULT_CACHE_DIR, max_workers=8,
+                    price_dtype="f8", base_interval=BASE_INTERVAL):
+    # Like get_historical_data, but returns read-only memory-mapped record views
+    # of the on-disk store instead of DataFrames; nothing is read into memory
+    # until a bar is touched. Only closed candles (complete derived bars) are returned.
+    dtype = kline_dtype(price_dtype)
+    store = KlineStore(cache_dir, dtype)
+    timeframes = None
+    fetch_interval, fetch_start, fetch_end = interval, start_ts, end_ts
+    if base_interval and can_derive(interval, base_interval):
+        timeframes = TimeframeStore(store, base_interval)
+        fetch_interval = base_interval
+        fetch_start, fetch_end = timeframes.base_range(interval, start_ts, end_ts)
+    fetched = download_missing(store, symbols, fetch_interval, fetch_start, fetch_end, dtype, max_workers)
+    data_dict = {}
+    for symbol in symbols:
+        store_closed(store, symbol, fetch_interval, fetched)
+        if timeframes is not None:
+            records = timeframes.view(symbol, interval, start_ts, end_ts)
+        else:
+            records = store.view(symbol, interval, start_ts, end_ts)
+        if len(records):
+            data_dict[symbol] = records
         else:
             print(f"No data fetched for {symbol}.")
     return data_dict
@@ -0,0 +1,143 @@
+# downloader.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from kline_store import interval_to_ms, rows_to_records
+
+KLINES_WEIGHT = 2  # Request weight of GET /api/v3/klines
+MAX_WEIGHT_PER_MINUTE = 6000  # Binance spot REQUEST_WEIGHT limit per IP
+
+
+class WeightRateLimiter:
+    # Token bucket over request weight: holds up to `capacity` weight and refills
+    # continuously at capacity / 60 per second.
+
+    def __init__(self, max_weight_per_minute=MAX_WEIGHT_PER_MINUTE, safety=0.8):
+        self.capacity = max_weight_per_minute * safety
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    self.used += weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class KlineDownloader:
+    # Splits every requested range into page-sized chunks and fetches all chunks
+    # (across symbols) on a thread pool, then stitches each range back in order.
+    # With a record dtype (see kline_store.kline_dtype) every page is parsed into
+    # typed records as it arrives, so raw string rows never pile up in memory.
+
+    def __init__(self, client, max_workers=8, limiter=None, page_limit=1000, dtype=None):
+        self.client = client
+        self.max_workers = max_workers
+        self.limiter = limiter or WeightRateLimiter()
+        self.page_limit = page_limit
+        self.dtype = dtype
+        self.pages = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.parse_seconds = 0.0
+        self._pages_lock = threading.Lock()
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def parse_rows_per_sec(self):
+        return self.rows / self.parse_seconds if self.parse_seconds else 0.0
+
+    def split(self, interval, start_ts, end_ts):
+        span = self.page_limit * interval_to_ms(interval)
+        return [
+            (chunk_start, min(chunk_start + span - 1, end_ts))
+            for chunk_start in range(start_ts, end_ts + 1, span)
+        ]
+
+    def fetch_chunk(self, symbol, interval, start_ts, end_ts):
+        data = []
+        current_start_ts = start_ts
+        while current_start_ts <= end_ts:
+            self.limiter.acquire(KLINES_WEIGHT)
+            klines = self.client.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=self.page_limit,
+                startTime=current_start_ts,
+                endTime=end_ts,
+            )
+            with self._pages_lock:
+                self.pages += 1
+            if not klines:
+                break
+            current_start_ts = klines[-1][6] + 1  # klines[-1][6] is the close time
+            if self.dtype is None:
+                data.extend(klines)
+                continue
+            started = time.perf_counter()
+            data.append(rows_to_records(klines, self.dtype))
+            with self._pages_lock:
+                self.rows += len(klines)
+                self.parse_seconds += time.perf_counter() - started
+        if self.dtype is not None:
+            return np.concatenate(data) if data else np.empty(0, dtype=self.dtype)
+        return data
+
+    def download(self, ranges):
+        # ranges: {key: (symbol, interval, start_ts, end_ts)} -> {key: kline rows},
+        # or {key: records} when the downloader has a dtype
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                key: [
+                    pool.submit(self.fetch_chunk, symbol, interval, chunk_start, chunk_end)
+                    for chunk_start, chunk_end in self.split(interval, start_ts, end_ts)
+                ]
+                for key, (symbol, interval, start_ts, end_ts) in ranges.items()
+            }
+            results = {}
+            for key, chunk_futures in futures.items():
+                if self.dtype is not None:
+                    results[key] = self._stitch_records([f.result() for f in chunk_futures])
+                    continue
+                rows = []
+                last_open = None
+                for future in chunk_futures:
+                    for kline in future.result():
+                        if last_open is None or kline[0] > last_open:
+                            rows.append(kline)
+                            last_open = kline[0]
+                results[key] = rows
+        self.seconds += time.perf_counter() - started
+        return results
+
+    def _stitch_records(self, chunks):
+        # Drop any candle not strictly after the previous chunk's last open time
+        kept = []
+        last_open = None
+        for records in chunks:
+            if last_open is not None:
+                records = records[records["open_time"] > last_open]
+            if len(records):
+                kept.append(records)
+                last_open = records["open_time"][-1]
+        return np.concatenate(kept) if kept else np.empty(0, dtype=self.dtype)
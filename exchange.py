@@ -0,0 +1,50 @@
+# exchange.py
+# binance is imported on first use: the package pulls in its sync and async
+# clients and takes about a second to import.
+import threading
+
+DEFAULT_SETTINGS = {"api_key": None, "api_secret": None, "pool_size": 32, "timeout": 10}
+
+_settings = dict(DEFAULT_SETTINGS)
+_client = None
+_lock = threading.Lock()
+
+
+def make_client(api_key=None, api_secret=None, pool_size=32, timeout=10, ping=False, **kwargs):
+    # One Client per process: its requests.Session keeps connections alive and the
+    # adapter pool is sized so worker threads don't open and drop sockets.
+    # ping=False keeps construction offline; the first real request connects.
+    from binance.client import Client
+    from requests.adapters import HTTPAdapter
+
+    client = Client(api_key, api_secret, requests_params={"timeout": timeout}, ping=ping, **kwargs)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    client.session.mount("https://", adapter)
+    client.session.mount("http://", adapter)
+    return client
+
+
+def configure(**settings):
+    # Settings for the shared client (make_client arguments); call before first use
+    global _client
+    with _lock:
+        if _client is not None:
+            raise RuntimeError("The shared client has already been built")
+        _settings.update(settings)
+
+
+def get_client():
+    # The process-wide client, built on first use
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = make_client(**_settings)
+    return _client
+
+
+def set_client(client):
+    # Replace the shared client, e.g. with one pointed at a local fake exchange
+    global _client
+    with _lock:
+        _client = client
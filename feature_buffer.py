@@ -0,0 +1,60 @@
+# feature_buffer.py
+import numpy as np
+
+BASE_FEATURES = [
+    'close', 'open', 'high', 'low', 'volume',
+    'ema_short', 'ema_long', 'macd', 'macd_signal', 'rsi', 'adx',
+    'stochastic_k', 'stochastic_d',
+    'bollinger_mid', 'bollinger_upper', 'bollinger_lower',
+]
+LAGGED_FEATURES = ['close', 'rsi']
+
+
+def feature_names(lookback):
+    names = list(BASE_FEATURES)
+    for i in range(1, lookback + 1):
+        names += [f'{name}_lag_{i}' for name in LAGGED_FEATURES]
+    return names
+
+
+class FeatureBuffer:
+    # Fixed-size ring buffer of feature rows. Every row is written twice, at slot
+    # and slot + capacity, so the latest `capacity` rows are always one contiguous
+    # view. Lag columns are carried forward from the previous row on append
+    # instead of being rebuilt with shift().
+
+    def __init__(self, lookback, capacity):
+        self.lookback = lookback
+        self.capacity = capacity
+        self.n_base = len(BASE_FEATURES)
+        self.n_features = len(feature_names(lookback))
+        self.lagged = [BASE_FEATURES.index(name) for name in LAGGED_FEATURES]
+        self.rows = np.zeros((2 * capacity, self.n_features))
+        self.count = 0  # rows appended so far
+        self.slot = -1  # slot of the latest row
+
+    def append(self, values):
+        row = np.empty(self.n_features)
+        row[:self.n_base] = values
+        if self.count:
+            previous = self.rows[self.slot]
+            width = len(self.lagged)
+            row[self.n_base + width:] = previous[self.n_base:-width]
+            row[self.n_base:self.n_base + width] = previous[self.lagged]
+        else:
+            row[self.n_base:] = np.nan
+        self.slot = (self.slot + 1) % self.capacity
+        self.rows[self.slot] = row
+        self.rows[self.slot + self.capacity] = row
+        self.count += 1
+
+    @property
+    def complete(self):
+        # Rows whose lag columns are all filled
+        return max(0, self.count - self.lookback)
+
+    def latest(self, n):
+        # The last n rows, oldest first, as a view
+        n = min(n, self.count, self.capacity)
+        end = self.slot + self.capacity + 1
+        return self.rows[end - n:end]
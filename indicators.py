@@ -0,0 +1,108 @@
+# indicators.py
+# Whole-array versions of the backtrader indicators used in strategies.py.
+# Each function follows backtrader's definition (including SMA-seeded EMA/SMMA
+# and the warm-up length) and returns float64 arrays with NaN during warm-up.
+import numpy as np
+import pandas as pd
+
+
+def _first_valid(values):
+    valid = np.flatnonzero(~np.isnan(values))
+    return valid[0] if len(valid) else len(values)
+
+
+def exp_smoothing(values, period, alpha):
+    # Seeded with the simple average of the first `period` valid values
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    seed = _first_valid(values) + period - 1
+    if seed >= len(values):
+        return out
+    tail = values[seed:].copy()
+    tail[0] = values[seed - period + 1:seed + 1].mean()
+    out[seed:] = pd.Series(tail).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def sma(values, period):
+    return pd.Series(values, dtype=float).rolling(period).mean().to_numpy()
+
+
+def ema(values, period):
+    return exp_smoothing(values, period, 2.0 / (1.0 + period))
+
+
+def smma(values, period):
+    return exp_smoothing(values, period, 1.0 / period)
+
+
+def highest(values, period):
+    return pd.Series(values, dtype=float).rolling(period).max().to_numpy()
+
+
+def lowest(values, period):
+    return pd.Series(values, dtype=float).rolling(period).min().to_numpy()
+
+
+def delay(values, periods):
+    out = np.full(len(values), np.nan)
+    out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def macd(close, period_me1=12, period_me2=26, period_signal=9):
+    line = ema(close, period_me1) - ema(close, period_me2)
+    return line, ema(line, period_signal)
+
+
+def rsi(close, period=14):
+    change = close - delay(close, 1)
+    up = np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
+    down = np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = smma(up, period) / smma(down, period)
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def true_range(high, low, close):
+    prev_close = delay(close, 1)
+    return np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+
+def atr(high, low, close, period=14):
+    return smma(true_range(high, low, close), period)
+
+
+def adx(high, low, close, period=14):
+    upmove = high - delay(high, 1)
+    downmove = delay(low, 1) - low
+    missing = np.isnan(upmove)
+    plus_dm = np.where(missing, np.nan, np.where((upmove > downmove) & (upmove > 0.0), upmove, 0.0))
+    minus_dm = np.where(missing, np.nan, np.where((downmove > upmove) & (downmove > 0.0), downmove, 0.0))
+    average_tr = atr(high, low, close, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100.0 * smma(plus_dm, period) / average_tr
+        minus_di = 100.0 * smma(minus_dm, period) / average_tr
+        dx = np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return 100.0 * smma(dx, period)
+
+
+def bollinger(close, period=20, devfactor=2.0):
+    mid = sma(close, period)
+    std = pd.Series(close, dtype=float).rolling(period).std(ddof=0).to_numpy()
+    return mid, mid + devfactor * std, mid - devfactor * std
+
+
+def stochastic(high, low, close, period=14, period_dfast=3, period_dslow=3):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100.0 * (close - lowest(low, period)) / (highest(high, period) - lowest(low, period))
+    perc_k = sma(k, period_dfast)
+    return perc_k, sma(perc_k, period_dslow)
+
+
+def ichimoku(high, low, tenkan=9, kijun=26, senkou=52, senkou_lead=26):
+    tenkan_sen = (highest(high, tenkan) + lowest(low, tenkan)) / 2.0
+    kijun_sen = (highest(high, kijun) + lowest(low, kijun)) / 2.0
+    span_a = delay((tenkan_sen + kijun_sen) / 2.0, senkou_lead)
+    span_b = delay((highest(high, senkou) + lowest(low, senkou)) / 2.0, senkou_lead)
+    return span_a, span_b
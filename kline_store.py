@@ -0,0 +1,243 @@
+# kline_store.py
+import bisect
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+    "3d": 3 * 24 * 60 * 60_000,
+    "1w": 7 * 24 * 60 * 60_000,
+}
+
+# Column of each field in a raw Binance kline row
+RAW_FIELDS = {
+    "open_time": 0,
+    "open": 1,
+    "high": 2,
+    "low": 3,
+    "close": 4,
+    "volume": 5,
+    "quote_volume": 7,
+    "trades": 8,
+    "taker_base_volume": 9,
+    "taker_quote_volume": 10,
+}
+
+FRAME_COLUMNS = {
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "volume": "Volume",
+    "quote_volume": "Quote_asset_volume",
+    "trades": "Number_of_trades",
+    "taker_base_volume": "Taker_buy_base_asset_volume",
+    "taker_quote_volume": "Taker_buy_quote_asset_volume",
+}
+
+
+def kline_dtype(price_dtype="f8", extras=False):
+    # One record per candle, keyed by the open time in milliseconds. float32
+    # prices halve the footprint; extras keeps quote volume, trade count and
+    # taker volumes (trade count as uint32).
+    price_dtype = np.dtype(price_dtype).newbyteorder("<")
+    fields = [("open_time", "<i8")]
+    fields += [(name, price_dtype) for name in ("open", "high", "low", "close", "volume")]
+    if extras:
+        fields += [
+            ("quote_volume", price_dtype),
+            ("trades", "<u4"),
+            ("taker_base_volume", price_dtype),
+            ("taker_quote_volume", price_dtype),
+        ]
+    return np.dtype(fields)
+
+
+KLINE_DTYPE = kline_dtype()
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def interval_to_ms(interval):
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported kline interval: {interval}")
+
+
+def rows_to_records(klines, dtype=KLINE_DTYPE):
+    # Raw Binance kline rows -> typed records, one column at a time, so no
+    # intermediate object frame is ever built
+    records = np.empty(len(klines), dtype=dtype)
+    if len(klines):
+        for field in dtype.names:
+            i = RAW_FIELDS[field]
+            records[field] = [k[i] for k in klines]
+    return records
+
+
+def records_to_frame(records):
+    # Keeps the record dtypes, so float32 records give a float32 frame
+    df = pd.DataFrame(
+        {FRAME_COLUMNS[field]: records[field] for field in records.dtype.names[1:]},
+        index=pd.to_datetime(records["open_time"], unit="ms"),
+    )
+    df.index.name = "Date"
+    return df
+
+
+def dtype_suffix(dtype):
+    # Cache file suffix for non-default record layouts, e.g. "_f4x"
+    if dtype == KLINE_DTYPE:
+        return ""
+    return "_" + dtype["open"].str[1:] + ("x" if "trades" in dtype.names else "")
+
+
+def merge_ranges(ranges):
+    # Merge inclusive [start, end] ranges that overlap or touch
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class KlineStore:
+    # On-disk kline cache: one .npy array and one coverage file per symbol/interval.
+    # Coverage is a list of inclusive [start, end] open-time ranges (ms) that were
+    # fully fetched, so only the gaps between them ever hit the network. Each
+    # record layout (see kline_dtype) is cached in its own files.
+
+    def __init__(self, root="kline_cache", dtype=KLINE_DTYPE):
+        self.root = root
+        self.dtype = np.dtype(dtype)
+        self.suffix = dtype_suffix(self.dtype)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol, interval, ext):
+        return os.path.join(self.root, f"{symbol}_{interval}{self.suffix}.{ext}")
+
+    def coverage(self, symbol, interval):
+        path = self._path(symbol, interval, "json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)["covered"]
+
+    def load(self, symbol, interval, mmap_mode="r"):
+        path = self._path(symbol, interval, "npy")
+        if not os.path.exists(path):
+            return np.empty(0, dtype=self.dtype)
+        return np.load(path, mmap_mode=mmap_mode)
+
+    def missing(self, symbol, interval, start_ts, end_ts):
+        # Uncovered sub-ranges of [start_ts, end_ts] that contain at least one candle open
+        interval_ms = interval_to_ms(interval)
+        gaps = []
+        cursor = start_ts
+        for start, end in self.coverage(symbol, interval):
+            if end < cursor:
+                continue
+            if start > end_ts:
+                break
+            if start > cursor:
+                gaps.append([cursor, min(start - 1, end_ts)])
+            cursor = max(cursor, end + 1)
+            if cursor > end_ts:
+                break
+        if cursor <= end_ts:
+            gaps.append([cursor, end_ts])
+        return [
+            [start, end] for start, end in gaps
+            if -(-start // interval_ms) * interval_ms <= end
+        ]
+
+    def _append(self, symbol, interval, records):
+        # Fast path for records that all open after the stored ones: they are
+        # written at the end of the .npy and the row count in its header is bumped
+        # in place (np.save leaves room for the shape to grow), so appending a few
+        # candles costs the same whatever the size of the file. Data goes in
+        # before the header, and rows past the header's count are ignored on load,
+        # so an interrupted append leaves the previous array intact.
+        path = self._path(symbol, interval, "npy")
+        open_times = records["open_time"]
+        if not len(records) or not os.path.exists(path) or np.any(np.diff(open_times) <= 0):
+            return False
+        with open(path, "r+b") as f:
+            version = np.lib.format.read_magic(f)
+            if version != (1, 0):
+                return False
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            data_offset = f.tell()
+            if dtype != records.dtype or fortran_order or len(shape) != 1:
+                return False
+            if shape[0]:
+                f.seek(data_offset + (shape[0] - 1) * dtype.itemsize)
+                last_open = np.frombuffer(f.read(dtype.itemsize), dtype=dtype)["open_time"][0]
+                if open_times[0] <= last_open:
+                    return False
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (shape[0] + len(records),),
+            })
+            if header.tell() != data_offset:
+                return False
+            f.seek(data_offset + shape[0] * dtype.itemsize)
+            f.truncate()
+            f.write(np.ascontiguousarray(records).tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+        return True
+
+    def write(self, symbol, interval, records, covered):
+        # Merge new records (newer rows win on duplicate open times) and extend coverage
+        if not self._append(symbol, interval, records):
+            existing = np.array(self.load(symbol, interval, mmap_mode=None))
+            combined = np.concatenate([records, existing])
+            _, first = np.unique(combined["open_time"], return_index=True)
+            combined = combined[first]
+
+            path = self._path(symbol, interval, "npy")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, combined)
+            os.replace(tmp_path, path)
+
+        ranges = merge_ranges(self.coverage(symbol, interval) + [list(r) for r in covered])
+        path = self._path(symbol, interval, "json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"covered": ranges}, f)
+        os.replace(tmp_path, path)
+
+    def view(self, symbol, interval, start_ts, end_ts):
+        # Memory-mapped slice of [start_ts, end_ts]. bisect only touches a few
+        # pages of the file; np.searchsorted would copy the strided column first.
+        records = self.load(symbol, interval)
+        open_times = records["open_time"]
+        lo = bisect.bisect_left(open_times, start_ts)
+        hi = bisect.bisect_right(open_times, end_ts, lo)
+        return records[lo:hi]
+
+    def read(self, symbol, interval, start_ts, end_ts):
+        return np.array(self.view(symbol, interval, start_ts, end_ts))
@@ -0,0 +1,260 @@
+# live_async.py
+# Event-driven live runtime: candles are consumed from a kline stream as they
+# close, signal evaluation and order placement run as tasks off the feed, and
+# dropped connections are retried with exponential backoff. Any candles missed
+# while disconnected are replayed over REST, through the same signal path, before
+# live events resume.
+import asyncio
+import functools
+import json
+import logging
+import time
+
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import WebSocketException
+
+from kline_store import interval_to_ms
+from metrics import REGISTRY
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+
+
+def binance_kline_url(symbols, interval, base_url=BINANCE_STREAM_URL):
+    streams = "/".join(f"{symbol.lower()}@kline_{interval}" for symbol in symbols)
+    return f"{base_url}/stream?streams={streams}"
+
+
+def parse_kline_message(message):
+    # Raw or combined-stream kline payload -> event dict
+    payload = json.loads(message)
+    payload = payload.get("data", payload)
+    k = payload["k"]
+    return {
+        "symbol": k["s"],
+        "open_time": k["t"],
+        "close_time": k["T"],
+        "close": float(k["c"]),
+        "closed": k["x"],
+    }
+
+
+def kline_message(symbol, interval, kline, closed=True):
+    # Binance REST kline row -> websocket kline payload (used by the replay server)
+    return json.dumps({
+        "e": "kline",
+        "E": kline[6],
+        "s": symbol,
+        "k": {
+            "t": kline[0], "T": kline[6], "s": symbol, "i": interval,
+            "o": kline[1], "h": kline[2], "l": kline[3], "c": kline[4], "v": kline[5],
+            "x": closed,
+        },
+    })
+
+
+class WebsocketKlineSource:
+    # Kline events from any websocket speaking Binance's kline payload: the real
+    # stream (see binance_kline_url) or a local ReplayServer
+
+    def __init__(self, url, open_timeout=10):
+        self.url = url
+        self.open_timeout = open_timeout
+
+    async def events(self):
+        async with connect(self.url, open_timeout=self.open_timeout) as websocket:
+            async for message in websocket:
+                yield parse_kline_message(message)
+
+
+class ReplayServer:
+    # Local websocket that replays stored klines as closed-kline events,
+    # `delay` seconds apart. A new connection resumes where the last one
+    # stopped. With drop_after, the first connection is dropped after that many
+    # messages, and the next `missed` klines close while the client is away;
+    # only closed_klines (the REST view) returns them.
+
+    def __init__(self, klines_by_symbol, interval, delay=0.0, host="127.0.0.1", port=0,
+                 drop_after=None, missed=0):
+        self.klines_by_symbol = klines_by_symbol
+        self.interval = interval
+        self.delay = delay
+        self.host = host
+        self.port = port
+        self.drop_after = drop_after
+        self.missed = missed
+        self.server = None
+        self.rows = sorted(
+            (kline[6], symbol, kline)
+            for symbol, klines in klines_by_symbol.items()
+            for kline in klines
+        )
+        self.position = 0  # klines sent or missed so far
+        self.connections = 0
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def closed_klines(self, symbol, start_ts):
+        # What a REST kline request would return now
+        return [kline for _, s, kline in self.rows[:self.position] if s == symbol and kline[0] >= start_ts]
+
+    async def _handler(self, websocket):
+        self.connections += 1
+        drop_after = self.drop_after if self.connections == 1 else None
+        sent = 0
+        while self.position < len(self.rows):
+            if sent == drop_after:
+                self.position = min(self.position + self.missed, len(self.rows))
+                await websocket.close(code=1011, reason="replay drop")
+                return
+            _, symbol, kline = self.rows[self.position]
+            await websocket.send(kline_message(symbol, self.interval, kline))
+            self.position += 1
+            sent += 1
+            await asyncio.sleep(self.delay)
+
+    async def __aenter__(self):
+        self.server = await serve(self._handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class AsyncTrader:
+    # Drives one LiveSignalEngine per symbol from a kline source.
+    # on_signal(symbol, signal, position_change) is a blocking callable (REST
+    # orders) and runs in a worker thread; it returns the order or None.
+    # fetch_closed_klines(symbol, start_ts) returns closed REST kline rows.
+    # clock.time() is compared with candle close times for the candle-to-order
+    # latency (main passes its clock, so paper runs measure simulated time).
+    # on_cycle, if given, is a blocking callable run once per batch of closed
+    # candles (every symbol's candle opening at the same time), after all of the
+    # batch's evaluations are done.
+
+    def __init__(self, source, engines, interval, on_signal, fetch_closed_klines,
+                 max_backoff=60.0, on_cycle=None, clock=time):
+        self.source = source
+        self.engines = engines
+        self.interval_ms = interval_to_ms(interval)
+        self.on_signal = on_signal
+        self.fetch_closed_klines = fetch_closed_klines
+        self.max_backoff = max_backoff
+        self.locks = {symbol: asyncio.Lock() for symbol in engines}
+        self.on_cycle = on_cycle
+        self.clock = clock
+        self.tasks = set()
+        self.batches = {}  # candle open time -> evaluations still running
+        self.latest_open_time = None
+        self.latencies = []  # seconds from candle close to order response
+
+    async def replay_gaps(self):
+        for symbol, engine in self.engines.items():
+            await self.replay_gap(symbol, engine)
+
+    async def replay_gap(self, symbol, engine, before=None):
+        if engine.last_open_time is None:
+            return
+        # Missed candles go through the same signal path as streamed ones, so a
+        # crossover that closed while the stream was down is still acted on
+        start_ts = engine.last_open_time + self.interval_ms
+        klines = await asyncio.to_thread(self.fetch_closed_klines, symbol, start_ts)
+        replayed = 0
+        for kline in klines:
+            if before is not None and kline[0] >= before:
+                break
+            self.apply(symbol, engine, float(kline[4]), kline[0], kline[6])
+            replayed += 1
+        if replayed:
+            logging.info(f"Replayed {replayed} missed klines for {symbol} over REST")
+
+    async def handle(self, event):
+        symbol = event["symbol"]
+        engine = self.engines.get(symbol)
+        if engine is None or not event["closed"]:
+            return
+        last = engine.last_open_time
+        if last is not None and event["open_time"] <= last:
+            return  # already applied (replayed over REST or duplicated)
+        if last is not None and event["open_time"] > last + self.interval_ms:
+            await self.replay_gap(symbol, engine, before=event["open_time"])
+        self.apply(symbol, engine, event["close"], event["open_time"], event["close_time"])
+
+    def apply(self, symbol, engine, close, open_time, close_time):
+        # Update the indicators with one closed candle and evaluate it in a task
+        with REGISTRY.stage("indicators"):
+            signal, position_change = engine.update(close, open_time)
+        if self.latest_open_time is None or open_time > self.latest_open_time:
+            self.latest_open_time = open_time
+        task = self.spawn(self.evaluate(symbol, signal, position_change, close_time))
+        self.batches.setdefault(open_time, set()).add(task)
+        task.add_done_callback(functools.partial(self.evaluated, open_time))
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def evaluated(self, open_time, task):
+        self.batches[open_time].discard(task)
+        self.end_cycles()
+
+    def end_cycles(self, flush=False):
+        # Batches end in candle order, once their evaluations are done and every
+        # symbol has moved past them (a symbol's candle may never arrive, so any
+        # later candle also closes the batch)
+        while self.batches:
+            open_time = min(self.batches)
+            complete = flush or open_time < self.latest_open_time or all(
+                engine.last_open_time is not None and engine.last_open_time >= open_time
+                for engine in self.engines.values()
+            )
+            if self.batches[open_time] or not complete:
+                return
+            del self.batches[open_time]
+            if self.on_cycle is not None:
+                self.spawn(asyncio.to_thread(self.on_cycle))
+
+    async def evaluate(self, symbol, signal, position_change, close_time):
+        # One evaluation at a time per symbol so position state stays consistent
+        async with self.locks[symbol]:
+            order = await asyncio.to_thread(self.on_signal, symbol, signal, position_change)
+        if order is not None:
+            latency = self.clock.time() - (close_time + 1) / 1000
+            self.latencies.append(latency)
+            REGISTRY.observe("candle_to_order_seconds", latency, symbol=symbol)
+            logging.info(f"{symbol} candle-close to order latency: {latency * 1000:.1f} ms")
+
+    async def run(self, reconnect=True):
+        backoff = 1.0
+        reconnecting = False
+        while True:
+            try:
+                if reconnecting:
+                    # A failed REST replay is retried on the next attempt; the
+                    # gap still starts at each engine's last candle
+                    await self.replay_gaps()
+                async for event in self.source.events():
+                    backoff = 1.0
+                    await self.handle(event)
+            except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+                logging.error(f"Kline stream disconnected: {e}")
+            except Exception as e:
+                # REST gap replay errors (e.g. BinanceAPIException) must not stop the trader
+                logging.error(f"Error in kline loop: {e}")
+            if not reconnect:
+                break
+            logging.info(f"Reconnecting kline stream in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            reconnecting = True
+        while self.tasks or self.batches:
+            if self.tasks:
+                await asyncio.gather(*self.tasks)
+            else:
+                self.end_cycles(flush=True)
@@ -1,25 +1,48 @@
 # main.py
 
-import pandas as pd
-import numpy as np
-from binance.client import Client
 from binance.enums import *
 from binance.exceptions import BinanceAPIException
 import time
-import pandas_ta as ta
+import argparse
+import asyncio
+import itertools
 import logging
+import threading
 import traceback
-from data_fetcher import get_historical_data
-import config
+from kline_store import interval_to_ms
+from streaming_indicators import LiveSignalEngine
+from live_async import AsyncTrader, WebsocketKlineSource, binance_kline_url
+from account_cache import AccountState, CountingClient
+from downloader import WeightRateLimiter
+import exchange
+from concurrent.futures import ThreadPoolExecutor
+from metrics import REGISTRY, format_cycle
 
-client = Client(config.API_KEY, config.API_SECRET)
-#Below line is testing URL
-# client.API_URL = 'https://testnet.binance.vision/api' 
+# Built by setup(), so importing this module needs neither config.py nor the network
+client = None
+state = None
+clock = time  # time()/sleep() source; paper_exchange swaps in its simulated clock
+cycle_lock = threading.Lock()  # one end-of-cycle summary and metrics write at a time
+poll_seconds = 60  # polling loop period, on clock
+
+
+def setup(testnet=False):
+    # One pooled client shared by every symbol, throttled to the REST weight budget.
+    # testnet=True points it at the Binance spot testnet.
+    global client, state
+    import config
+
+    logging.basicConfig(filename='trading_bot.log', level=logging.INFO,
+                        format='%(asctime)s:%(levelname)s:%(message)s')
+
+    exchange.configure(api_key=config.API_KEY, api_secret=config.API_SECRET, testnet=testnet)
+    client = CountingClient(exchange.get_client(), limiter=WeightRateLimiter())
+    state = AccountState(client)
 
-logging.basicConfig(filename='trading_bot.log', level=logging.INFO,
-                    format='%(asctime)s:%(levelname)s:%(message)s')
 
 def apply_technicals(df, short_window, long_window):
+    import pandas_ta as ta
+
     df['EMA_Short'] = ta.ema(df['Close'], length=short_window)
     df['EMA_Long'] = ta.ema(df['Close'], length=long_window)
     df['RSI'] = ta.rsi(df['Close'], length=14)
@@ -43,106 +66,204 @@ def generate_signals(df):
 def execute_trade(symbol, quantity, side):
     try:
         # Place market order
-        order = client.create_order(
-            symbol=symbol,
-            side=side,
-            type=ORDER_TYPE_MARKET,
-            quantity=quantity
-        )
+        with REGISTRY.stage("create_order"):
+            order = client.create_order(
+                symbol=symbol,
+                side=side,
+                type=ORDER_TYPE_MARKET,
+                quantity=quantity
+            )
         logging.info(f"Executed {side} order for {quantity} {symbol}")
 
-        # Calculate stop-loss and take-profit prices
-        last_price = float(client.get_symbol_ticker(symbol=symbol)['price'])
+        # Calculate stop-loss and take-profit prices from the fill, not a new ticker call
+        last_price = state.apply_order(symbol, order) or state.price(symbol)
         stop_loss = last_price * 0.98 if side == SIDE_BUY else last_price * 1.02
         take_profit = last_price * 1.02 if side == SIDE_BUY else last_price * 0.98
 
         # Place OCO order
-        oco_order = client.create_oco_order(
-            symbol=symbol,
-            side=SIDE_SELL if side == SIDE_BUY else SIDE_BUY,
-            quantity=quantity,
-            price=str(round(take_profit, 2)),
-            stopPrice=str(round(stop_loss, 2)),
-            stopLimitPrice=str(round(stop_loss * 0.99, 2)),
-            stopLimitTimeInForce=TIME_IN_FORCE_GTC
-        )
+        with REGISTRY.stage("create_oco_order"):
+            oco_order = client.create_oco_order(
+                symbol=symbol,
+                side=SIDE_SELL if side == SIDE_BUY else SIDE_BUY,
+                quantity=quantity,
+                price=str(state.round_price(symbol, take_profit)),
+                stopPrice=str(state.round_price(symbol, stop_loss)),
+                stopLimitPrice=str(state.round_price(symbol, stop_loss * 0.99)),
+                stopLimitTimeInForce=TIME_IN_FORCE_GTC
+            )
         logging.info("OCO order placed for stop-loss and take-profit.")
         return order
     except BinanceAPIException as e:
         logging.error(f"Binance API Exception: {e}")
+        REGISTRY.inc("order_errors_total", symbol=symbol)
         return None
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")
+        REGISTRY.inc("order_errors_total", symbol=symbol)
         return None
 
 
     
-symbol = 'BTCUSDT'
+symbols = ['BTCUSDT']
 short_window = 5
 long_window = 20
 interval = '1m'
-lookback = '30'
+lookback = 500  # Closed klines used to seed the indicators
+metrics_path = 'metrics.prom'  # Prometheus text file rewritten every cycle (None to disable)
 
 def get_trade_quantity(symbol, percentage=0.01):
     try:
-        balance = client.get_asset_balance(asset='USDT')
-        usdt_balance = float(balance['free'])
-        last_price = float(client.get_symbol_ticker(symbol=symbol)['price'])
+        usdt_balance = state.balance('USDT')
+        last_price = state.price(symbol)
         quantity = (usdt_balance * percentage) / last_price
-        quantity = round(quantity, 6)  # Binance allows up to 6 decimal places
+        quantity = state.round_quantity(symbol, quantity)  # Respect the symbol's LOT_SIZE step
         return quantity
     except Exception as e:
         logging.error(f"Error calculating trade quantity: {e}")
         return None
 
 
+def get_closed_klines(symbol, interval, start_ts):
+    # Klines opened at or after start_ts, without the candle that is still forming
+    klines = client.get_klines(symbol=symbol, interval=interval, startTime=start_ts, limit=1000)
+    now = int(clock.time() * 1000)
+    return [k for k in klines if k[6] < now]
+
+
+def next_start_ts(engine):
+    # Open time of the first kline the engine has not seen. If seeding returned
+    # nothing, the lookback window is fetched instead.
+    if engine.last_open_time is None:
+        return int(clock.time() * 1000) - lookback * interval_to_ms(interval)
+    return engine.last_open_time + interval_to_ms(interval)
+
+
+def seed_signal_engine(symbol):
+    # Seed EMA/RSI state once from history; afterwards it is updated per closed kline
+    engine = LiveSignalEngine(short_window, long_window)
+    klines = get_closed_klines(symbol, interval, next_start_ts(engine))
+    engine.seed([float(k[4]) for k in klines], [k[0] for k in klines])
+    return engine
+
+
+def seed_signal_engines(symbols):
+    # Seed every symbol concurrently over the shared, pooled client
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        return dict(zip(symbols, pool.map(seed_signal_engine, symbols)))
+
+
 def check_balances():
     try:
-        account_info = client.get_account()
-        balances = account_info['balances']
-        for balance in balances:
-            asset = balance['asset']
-            free = float(balance['free'])
-            locked = float(balance['locked'])
+        state.refresh_balances()
+        for asset, (free, locked) in state.balances.items():
             if free > 0 or locked > 0:
                 print(f"{asset}: Free = {free}, Locked = {locked}")
     except Exception as e:
         print(f"An error occurred while fetching balances: {e}")
 
-def main():
+def main(cycles=None):
+    # Polling fallback: one closed-kline request per symbol every poll_seconds.
+    # cycles bounds the number of polls (None runs forever).
+    if client is None:
+        setup()
     check_balances()
-    position = 0
-    while True:
+    engines = seed_signal_engines(symbols)
+    on_signal = make_signal_handler(engines)
+    for _ in itertools.repeat(None) if cycles is None else range(cycles):
         try:
-            # Fetch the latest data
-            df = get_historical_data(client, symbol, interval, lookback)
-            apply_technicals(df, short_window, long_window)
-            generate_signals(df)
-            latest_signal = df['Signal'].iloc[-1]
-            latest_position = df['Position'].iloc[-1]
-            print(f"Latest Signal: {latest_signal}, Latest Position Change: {latest_position}")
+            for symbol, engine in engines.items():
+                # Fetch only the klines that closed since the last update
+                with REGISTRY.stage("kline_fetch"):
+                    new_klines = get_closed_klines(symbol, interval, next_start_ts(engine))
+                if not new_klines:
+                    continue
+                with REGISTRY.stage("indicators"):
+                    for kline in new_klines:
+                        engine.update(float(kline[4]), kline[0])
+                on_signal(symbol, engine.signal, engine.position)
 
-            quantity = get_trade_quantity(symbol, percentage=0.01)
-            if quantity is None or quantity <= 0:
-                print("Insufficient balance to place order.")
-                time.sleep(60)
-                continue
-
-            if latest_position == 1 and position == 0:
-                # Buy signal
-                execute_trade(symbol, quantity, SIDE_BUY)
-                position = 1  # Update position to holding
-            elif latest_position == -1 and position == 1:
-                # Sell signal
-                execute_trade(symbol, quantity, SIDE_SELL)
-                position = 0  # Update position to no holding
-            else:
-                print("No trade executed.")
-
-            time.sleep(60)  # Wait for the next interval
+            finish_cycle()
+            clock.sleep(poll_seconds)  # Wait for the next interval
         except Exception as e:
             logging.error(f"Error in main loop: {e}")
-            time.sleep(60)  # Wait before retrying
+            clock.sleep(poll_seconds)  # Wait before retrying
+
+
+def finish_cycle():
+    # Per-cycle summary of stage timings and REST usage, plus the metrics export
+    with cycle_lock:
+        calls, weight = client.start_cycle()
+        stages = REGISTRY.end_cycle()
+        logging.info(f"Cycle used {calls} REST calls, request weight {weight}; {format_cycle(stages)}")
+        if metrics_path:
+            REGISTRY.write(metrics_path)
+
+
+def make_signal_handler(engines):
+    positions = {}
+
+    def on_signal(symbol, latest_signal, latest_position):
+        state.update_price(symbol, engines[symbol].last_close)
+        position = positions.get(symbol, 0)
+        print(f"{symbol} Latest Signal: {latest_signal}, Latest Position Change: {latest_position}")
+        if latest_position == 1 and position == 0:
+            side = SIDE_BUY
+        elif latest_position == -1 and position == 1:
+            side = SIDE_SELL
+        else:
+            print("No trade executed.")
+            return None
+
+        with REGISTRY.stage("balance_lookup"):
+            quantity = get_trade_quantity(symbol, percentage=0.01)
+        if quantity is None or quantity <= 0:
+            print("Insufficient balance to place order.")
+            return None
+        order = execute_trade(symbol, quantity, side)
+        positions[symbol] = 1 if side == SIDE_BUY else 0
+        return order
+
+    return on_signal
+
+
+async def async_main(source=None, reconnect=True):
+    # Event-driven variant of main(): acts as soon as each candle closes.
+    # reconnect=False returns once the source is exhausted (e.g. a replay).
+    if client is None:
+        setup()
+    check_balances()
+    engines = seed_signal_engines(symbols)
+    trader = AsyncTrader(
+        source or WebsocketKlineSource(binance_kline_url(symbols, interval)),
+        engines,
+        interval,
+        make_signal_handler(engines),
+        lambda s, start_ts: get_closed_klines(s, interval, start_ts),
+        on_cycle=finish_cycle,
+        clock=clock,
+    )
+    await trader.run(reconnect=reconnect)
+
+
+def run_from_args(args):
+    # Entry point for `cli.py live` (see cli.add_live_arguments)
+    global symbols, interval
+    if args.symbols:
+        symbols = args.symbols.split(",")
+    if args.interval:
+        interval = args.interval
+    setup(testnet=args.testnet)
+    if args.metrics_port:
+        REGISTRY.serve(args.metrics_port)
+    if args.poll:
+        main()
+    else:
+        asyncio.run(async_main())
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from cli import add_live_arguments
+
+    parser = argparse.ArgumentParser(description="Live trading bot")
+    add_live_arguments(parser)
+    run_from_args(parser.parse_args())
@@ -0,0 +1,216 @@
+# ml_pipeline.py
+# Offline training for MLStrategy. Builds the same feature rows as FeatureBuffer
+# (the backtrader indicators via indicators.py, plus close/RSI lags) with array
+# operations over the whole history, trains per-symbol forests in parallel, or
+# one shared forest over per-symbol standardised rows, and saves them as a
+# versioned joblib artifact that MLStrategy(model_dir=...) loads at startup.
+import argparse
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+import sklearn
+from joblib import Parallel, delayed, dump, load
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import indicators
+from feature_buffer import BASE_FEATURES, LAGGED_FEATURES, feature_names
+
+DEFAULT_MODEL_DIR = "models"
+LATEST_FILE = "LATEST"
+
+
+def build_features(df, lookback):
+    # (bars, features) in feature_names(lookback) order; rows with any NaN
+    # (indicator warm-up or missing lags) are not usable
+    open_ = df["Open"].to_numpy(dtype=float)
+    high = df["High"].to_numpy(dtype=float)
+    low = df["Low"].to_numpy(dtype=float)
+    close = df["Close"].to_numpy(dtype=float)
+    volume = df["Volume"].to_numpy(dtype=float)
+    macd_line, macd_signal = indicators.macd(close)
+    stochastic_k, stochastic_d = indicators.stochastic(high, low, close)
+    bollinger_mid, bollinger_upper, bollinger_lower = indicators.bollinger(close)
+    base = {
+        "close": close,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "volume": volume,
+        "ema_short": indicators.ema(close, 12),
+        "ema_long": indicators.ema(close, 26),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "rsi": indicators.rsi(close),
+        "adx": indicators.adx(high, low, close),
+        "stochastic_k": stochastic_k,
+        "stochastic_d": stochastic_d,
+        "bollinger_mid": bollinger_mid,
+        "bollinger_upper": bollinger_upper,
+        "bollinger_lower": bollinger_lower,
+    }
+    columns = [base[name] for name in BASE_FEATURES]
+    for i in range(1, lookback + 1):
+        columns += [indicators.delay(base[name], i) for name in LAGGED_FEATURES]
+    return np.column_stack(columns)
+
+
+def training_rows(df, lookback):
+    # Usable feature rows and their target (next close higher than this close)
+    features = build_features(df, lookback)
+    close = features[:, 0]
+    target = np.zeros(len(close), dtype=int)
+    target[:-1] = close[1:] > close[:-1]
+    usable = ~np.isnan(features).any(axis=1)
+    usable[-1] = False  # the latest row has no target yet
+    return features[usable], target[usable]
+
+
+def split(X, y, test_fraction):
+    cut = int(len(X) * (1.0 - test_fraction))
+    return X[:cut], y[:cut], X[cut:], y[cut:]
+
+
+def _accuracy(model, X, y):
+    return float((model.predict(X) == y).mean()) if len(y) else None
+
+
+def train_symbol(X, y, n_estimators, test_fraction, random_state):
+    X_train, y_train, X_test, y_test = split(X, y, test_fraction)
+    scaler = StandardScaler().fit(X_train)
+    model = RandomForestClassifier(n_estimators=n_estimators, n_jobs=1, random_state=random_state)
+    model.fit(scaler.transform(X_train), y_train)
+    return scaler, model, _accuracy(model, scaler.transform(X_test), y_test)
+
+
+def data_fingerprint(historical_data):
+    h = hashlib.blake2b(digest_size=8)
+    for symbol in sorted(historical_data):
+        df = historical_data[symbol]
+        h.update(symbol.encode())
+        h.update(np.ascontiguousarray(df.index.asi8).tobytes())
+        h.update(np.ascontiguousarray(df["Close"].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def train_models(historical_data, lookback=14, n_estimators=100, shared=False, test_fraction=0.2,
+                 n_jobs=-1, random_state=0):
+    # Returns (artifact, manifest)
+    rows = dict(zip(historical_data, Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(training_rows)(df, lookback) for df in historical_data.values()
+    )))
+    rows = {symbol: (X, y) for symbol, (X, y) in rows.items() if len(y) > 1}
+    if not rows:
+        raise ValueError("Not enough history to build a single training row")
+
+    if shared:
+        # Per-symbol scalers make price levels comparable; one forest serves every
+        # symbol, so inference is a single predict per bar for the whole universe
+        scalers, train_parts, test_parts = {}, [], []
+        for symbol, (X, y) in rows.items():
+            X_train, y_train, X_test, y_test = split(X, y, test_fraction)
+            scalers[symbol] = StandardScaler().fit(X_train)
+            train_parts.append((scalers[symbol].transform(X_train), y_train))
+            test_parts.append((symbol, scalers[symbol].transform(X_test), y_test))
+        model = RandomForestClassifier(n_estimators=n_estimators, n_jobs=n_jobs, random_state=random_state)
+        model.fit(np.vstack([X for X, _ in train_parts]), np.concatenate([y for _, y in train_parts]))
+        artifact = {"scalers": scalers, "shared": model}
+        accuracy = {symbol: _accuracy(model, X, y) for symbol, X, y in test_parts}
+    else:
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(train_symbol)(X, y, n_estimators, test_fraction, random_state) for X, y in rows.values()
+        )
+        artifact = {
+            "scalers": {symbol: scaler for symbol, (scaler, _, _) in zip(rows, results)},
+            "models": {symbol: model for symbol, (_, model, _) in zip(rows, results)},
+        }
+        accuracy = {symbol: acc for symbol, (_, _, acc) in zip(rows, results)}
+
+    manifest = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "lookback": lookback,
+        "features": feature_names(lookback),
+        "symbols": list(rows),
+        "shared": shared,
+        "n_estimators": n_estimators,
+        "test_fraction": test_fraction,
+        "train_rows": {symbol: len(y) for symbol, (_, y) in rows.items()},
+        "holdout_accuracy": accuracy,
+        "data": {
+            "fingerprint": data_fingerprint(historical_data),
+            "start": str(min(df.index[0] for df in historical_data.values())),
+            "end": str(max(df.index[-1] for df in historical_data.values())),
+        },
+        "sklearn_version": sklearn.__version__,
+    }
+    return artifact, manifest
+
+
+def save_models(artifact, manifest, root=DEFAULT_MODEL_DIR):
+    # Writes root/<version>/{models.joblib,manifest.json} and points LATEST at it
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S")
+    version = f"{stamp}-{manifest['data']['fingerprint']}"
+    suffix = 1
+    while os.path.exists(os.path.join(root, version)):
+        suffix += 1
+        version = f"{stamp}-{manifest['data']['fingerprint']}-{suffix}"
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    manifest = dict(manifest, version=version)
+    dump(artifact, os.path.join(path, "models.joblib"))
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path = os.path.join(root, LATEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, LATEST_FILE))
+    return version
+
+
+def load_models(root=DEFAULT_MODEL_DIR, version=None):
+    # Returns (artifact, manifest) for a version, or the latest saved one
+    if version is None:
+        with open(os.path.join(root, LATEST_FILE)) as f:
+            version = f.read().strip()
+    path = os.path.join(root, version)
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["sklearn_version"] != sklearn.__version__:
+        print(f"Warning: models in {path} were trained with scikit-learn {manifest['sklearn_version']}")
+    artifact = load(os.path.join(path, "models.joblib"))
+    # Per-bar inference is a handful of rows; thread fan-out would cost more than it saves
+    for model in [artifact.get("shared")] + list(artifact.get("models", {}).values()):
+        if model is not None:
+            model.n_jobs = 1
+    return artifact, manifest
+
+
+if __name__ == "__main__":
+    from data_fetcher import get_historical_data
+
+    parser = argparse.ArgumentParser(description="Train and save MLStrategy models offline")
+    parser.add_argument("--symbols", default="ETHUSDT,XRPUSDT,ADAUSDT,DOGEUSDT,SOLUSDT")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2024-10-01")
+    parser.add_argument("--lookback", type=int, default=14)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--shared", action="store_true", help="Train one forest for all symbols")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--out", default=DEFAULT_MODEL_DIR)
+    args = parser.parse_args()
+
+    start_ts = int(datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int(datetime.datetime.strptime(args.end, "%Y-%m-%d").timestamp() * 1000)
+    historical_data = get_historical_data(args.symbols.split(","), args.interval, start_ts, end_ts)
+    artifact, manifest = train_models(
+        historical_data, lookback=args.lookback, n_estimators=args.n_estimators,
+        shared=args.shared, n_jobs=args.n_jobs,
+    )
+    version = save_models(artifact, manifest, args.out)
+    for symbol, accuracy in manifest["holdout_accuracy"].items():
+        print(f"{symbol}: {manifest['train_rows'][symbol]} rows, holdout accuracy {accuracy:.3f}")
+    print(f"Saved models version {version} to {args.out}")
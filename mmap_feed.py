@@ -0,0 +1,58 @@
+# mmap_feed.py
+# Backtrader feed over kline records (see kline_store.kline_dtype), typically a
+# memory-mapped KlineStore.view. Bars are copied out of the mapping a block at a
+# time as backtrader asks for them, so with cerebro.run(preload=False, exactbars=1)
+# memory stays bounded by the block size and indicator windows, not the history.
+import backtrader as bt
+import numpy as np
+
+EPOCH_ORDINAL = 719163.0  # bt.date2num(1970-01-01)
+MS_PER_DAY = 86_400_000.0
+
+
+class MemmapData(bt.feed.DataBase):
+    params = (
+        ("records", None),
+        ("block_size", 4096),
+    )
+
+    def start(self):
+        super(MemmapData, self).start()
+        self._next_row = 0
+        self._block = None
+        self._block_pos = 0
+        self._block_len = 0
+
+    def _read_block(self):
+        records = self.p.records
+        end = min(self._next_row + self.p.block_size, len(records))
+        if end <= self._next_row:
+            return False
+        block = records[self._next_row:end]
+        self._block = (
+            (block["open_time"] / MS_PER_DAY + EPOCH_ORDINAL).tolist(),
+            np.asarray(block["open"], dtype=float).tolist(),
+            np.asarray(block["high"], dtype=float).tolist(),
+            np.asarray(block["low"], dtype=float).tolist(),
+            np.asarray(block["close"], dtype=float).tolist(),
+            np.asarray(block["volume"], dtype=float).tolist(),
+        )
+        self._block_pos = 0
+        self._block_len = end - self._next_row
+        self._next_row = end
+        return True
+
+    def _load(self):
+        if self._block_pos >= self._block_len and not self._read_block():
+            return False
+        i = self._block_pos
+        self._block_pos += 1
+        dt, open_, high, low, close, volume = self._block
+        self.lines.datetime[0] = dt[i]
+        self.lines.open[0] = open_[i]
+        self.lines.high[0] = high[i]
+        self.lines.low[0] = low[i]
+        self.lines.close[0] = close[i]
+        self.lines.volume[0] = volume[i]
+        self.lines.openinterest[0] = 0.0
+        return True
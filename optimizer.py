@@ -0,0 +1,196 @@
+# optimizer.py
+# Parameter sweeps and walk-forward optimisation for AdvancedStrategy. The OHLCV
+# arrays are copied into one shared-memory block, every worker process attaches
+# to it once, and each job only ships its parameter dict and window bounds.
+import argparse
+import datetime
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from result_cache import ResultCache, cache_key, code_fingerprint, hash_data
+from vector_backtest import DEFAULT_PARAMS, run_vector_backtest
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+_worker_data = None
+_worker_shm = None
+
+
+def share_data(historical_data):
+    # Align all symbols on common timestamps and pack them into a
+    # (symbols, bars, OHLCV) float64 block in shared memory
+    symbols = list(historical_data)
+    index = historical_data[symbols[0]].index
+    for symbol in symbols[1:]:
+        index = index.intersection(historical_data[symbol].index)
+    shape = (len(symbols), len(index), len(COLUMNS))
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    for i, symbol in enumerate(symbols):
+        block[i] = historical_data[symbol].loc[index, COLUMNS].to_numpy(dtype=np.float64)
+    descriptor = {
+        "name": shm.name,
+        "shape": shape,
+        "symbols": symbols,
+        "index": index.to_numpy(),
+    }
+    return shm, descriptor
+
+
+def _attach(descriptor):
+    global _worker_data, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=descriptor["name"])
+    block = np.ndarray(descriptor["shape"], dtype=np.float64, buffer=_worker_shm.buf)
+    index = pd.DatetimeIndex(descriptor["index"])
+    _worker_data = {
+        symbol: pd.DataFrame(block[i], index=index, columns=COLUMNS, copy=False)
+        for i, symbol in enumerate(descriptor["symbols"])
+    }
+
+
+def _run_job(job):
+    params, window, options = job
+    data = _worker_data
+    if window is not None:
+        start, end = pd.Timestamp(window[0]), pd.Timestamp(window[1])
+        data = {symbol: df.loc[start:end] for symbol, df in data.items()}
+    result = run_vector_backtest(data, params=params, **options)
+    trades = result["trades"].values()
+    total_trades = sum(stats["total_trades"] for stats in trades)
+    profitable_trades = sum(stats["profitable_trades"] for stats in trades)
+    row = dict(params)
+    if window is not None:
+        row["window_start"], row["window_end"] = window
+    row.update({
+        "final_value": result["final_value"],
+        "return_pct": (result["final_value"] / result["start_value"] - 1.0) * 100.0,
+        "sharpe": result["sharpe"],
+        "max_drawdown": result["max_drawdown"],
+        "total_trades": total_trades,
+        "win_rate": profitable_trades / total_trades * 100.0 if total_trades else 0.0,
+    })
+    return row
+
+
+def expand_grid(grid):
+    names = list(grid)
+    return [dict(DEFAULT_PARAMS, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+
+
+def walk_forward_windows(index, train, test):
+    # Rolling (train, test) windows stepping forward by the test length
+    windows = []
+    start = index[0]
+    while start + train + test <= index[-1]:
+        train_end = start + train
+        windows.append(((start, train_end - pd.Timedelta(1, "ns")),
+                        (train_end, train_end + test - pd.Timedelta(1, "ns"))))
+        start += test
+    return windows
+
+
+def rank(results):
+    # Best Sharpe first, ties broken by the smaller drawdown
+    return results.sort_values(["sharpe", "max_drawdown"], ascending=[False, True], na_position="last")
+
+
+def _run_all(pool, jobs, cache=None, fingerprint=None):
+    # With a cache, only jobs whose (data, code, params, window, options) key is
+    # new are sent to the workers
+    keys = [None] * len(jobs)
+    rows = [None] * len(jobs)
+    if cache is not None:
+        for i, (params, window, options) in enumerate(jobs):
+            keys[i] = cache_key(*fingerprint, params, window=window, kind="optimizer_row", **options)
+            rows[i] = cache.get(keys[i])
+    todo = [i for i, row in enumerate(rows) if row is None]
+    chunksize = max(1, len(todo) // (4 * (os.cpu_count() or 1)))
+    for i, row in zip(todo, pool.map(_run_job, [jobs[i] for i in todo], chunksize=chunksize)):
+        rows[i] = row
+        if cache is not None:
+            cache.put(keys[i], row)
+    return rows
+
+
+def optimize(historical_data, grid, walk_forward=None, processes=None, cache=None, **options):
+    # walk_forward: optional (train, test) pair of pd.Timedelta
+    # cache: optional ResultCache, so re-running a sweep only runs new configurations
+    options.setdefault("sharpe_timeframe", "days")
+    options.setdefault("annualize", True)
+    combos = expand_grid(grid)
+    fingerprint = None
+    if cache is not None:
+        import indicators
+        import vector_backtest
+        fingerprint = (hash_data(historical_data), code_fingerprint(_run_job, vector_backtest, indicators))
+    shm, descriptor = share_data(historical_data)
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_attach, initargs=(descriptor,)) as pool:
+            def run_all(jobs):
+                return _run_all(pool, jobs, cache, fingerprint)
+
+            if walk_forward is None:
+                return rank(pd.DataFrame(run_all([(combo, None, options) for combo in combos])))
+
+            index = pd.DatetimeIndex(descriptor["index"])
+            windows = walk_forward_windows(index, *walk_forward)
+            train_rows = pd.DataFrame(run_all([
+                (combo, train, options) for train, _ in windows for combo in combos
+            ]))
+            best = []
+            for train, test in windows:
+                in_window = train_rows[train_rows["window_start"] == train[0]]
+                top = rank(in_window).iloc[0]
+                best.append({name: type(default)(top[name]) for name, default in DEFAULT_PARAMS.items()})
+            test_rows = run_all([(params, test, options) for params, (_, test) in zip(best, windows)])
+            return pd.DataFrame(test_rows)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def parse_grid(specs):
+    # ["short_window=5,10,20", ...] -> {"short_window": [5, 10, 20], ...}
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown AdvancedStrategy parameter: {name}")
+        cast = type(DEFAULT_PARAMS[name])
+        grid[name] = [cast(value) for value in values.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    from data_fetcher import get_historical_data
+
+    parser = argparse.ArgumentParser(description="Parameter sweep / walk-forward optimiser for AdvancedStrategy")
+    parser.add_argument("--param", action="append", default=[], help="name=v1,v2,... (repeatable)")
+    parser.add_argument("--symbols", default="ETHUSDT,XRPUSDT,ADAUSDT,DOGEUSDT,SOLUSDT")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2024-10-01")
+    parser.add_argument("--train-days", type=int, help="Enable walk-forward with this training length")
+    parser.add_argument("--test-days", type=int, default=30)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", default="optimizer_results.csv")
+    parser.add_argument("--no-cache", action="store_true", help="Re-run every configuration")
+    args = parser.parse_args()
+
+    start_ts = int(datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int(datetime.datetime.strptime(args.end, "%Y-%m-%d").timestamp() * 1000)
+    historical_data = get_historical_data(args.symbols.split(","), args.interval, start_ts, end_ts)
+
+    walk_forward = None
+    if args.train_days:
+        walk_forward = (pd.Timedelta(days=args.train_days), pd.Timedelta(days=args.test_days))
+    results = optimize(historical_data, parse_grid(args.param), walk_forward=walk_forward, processes=args.processes,
+                       cache=None if args.no_cache else ResultCache())
+    results.to_csv(args.out, index=False)
+    print(results.head(20).to_string(index=False))
+    print(f"Wrote {len(results)} rows to {args.out}")
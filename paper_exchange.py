@@ -0,0 +1,622 @@
+# paper_exchange.py
+# In-process paper-trading exchange for exercising the live order path offline.
+# PaperExchange implements the Client methods the bot calls (create_order,
+# create_oco_order, get_symbol_ticker, get_asset_balance, get_account,
+# get_klines, ...) over stored klines replayed on a simulated clock, with
+# resting orders, OCO linkage and pluggable latency and fee models. run_paper
+# drives main's live loop against it, usually at many times real speed.
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+from kline_store import interval_to_ms
+from timeframes import can_derive, resample_records
+
+QUOTE_ASSETS = ("USDT", "FDUSD", "USDC", "TUSD", "BUSD", "BTC", "ETH", "BNB")
+
+
+def split_symbol(symbol):
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise ValueError(f"Cannot tell the quote asset of {symbol}")
+
+
+def price_path(records, interval_ms):
+    # Four trades per candle: the open, the nearer extreme, the other extreme and
+    # the close. Up candles are assumed to dip first, down candles to rally first.
+    open_ = records["open"].astype(float)
+    close = records["close"].astype(float)
+    up = close >= open_
+    first = np.where(up, records["low"], records["high"])
+    second = np.where(up, records["high"], records["low"])
+    prices = np.column_stack([open_, first, second, close]).ravel()
+    offsets = np.array([0, interval_ms // 3, 2 * interval_ms // 3, interval_ms - 1])
+    times = (records["open_time"][:, None] + offsets).ravel()
+    return times, prices
+
+
+class SimClock:
+    # Simulated wall clock starting at start_ms and running `speed` times faster
+    # than real time. time() and sleep() mirror the time module, so it can stand
+    # in for it (see main.clock).
+
+    def __init__(self, start_ms, speed=1.0):
+        self.start_ms = start_ms
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def now_ms(self):
+        return int(self.start_ms + (time.monotonic() - self.started) * self.speed * 1000)
+
+    def time(self):
+        return self.now_ms() / 1000.0
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def real_seconds_until(self, ts_ms):
+        return max(0.0, (ts_ms - self.now_ms()) / 1000.0 / self.speed)
+
+
+class LatencyModel:
+    # Seconds each request takes: a fixed base plus exponential jitter. Order
+    # endpoints can get their own base (matching-engine round trips are slower
+    # than reads). Delays run on the exchange clock, so an accelerated run keeps
+    # prices consistent with the latency; profile latency at speed=1.
+
+    def __init__(self, base=0.02, jitter=0.005, order_base=None, seed=0):
+        self.base = base
+        self.jitter = jitter
+        self.order_base = base if order_base is None else order_base
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self, method):
+        base = self.order_base if method.startswith("create_") else self.base
+        if not self.jitter:
+            return base
+        with self.lock:
+            return base + self.rng.expovariate(1.0 / self.jitter)
+
+
+class FeeModel:
+    # Commission as a fraction of the notional, charged in the quote asset.
+    # Resting limit fills pay the maker rate, everything else the taker rate.
+
+    def __init__(self, maker=0.001, taker=0.001):
+        self.maker = maker
+        self.taker = taker
+
+    def fee(self, notional, maker=False):
+        return notional * (self.maker if maker else self.taker)
+
+
+def _error(code, msg, status=400):
+    from binance.exceptions import BinanceAPIException
+
+    return BinanceAPIException(None, status, json.dumps({"code": code, "msg": msg}))
+
+
+def _fmt(value):
+    return f"{value:.8f}"
+
+
+class PaperExchange:
+    # klines_by_symbol: {symbol: kline records} in the kline_store layout (e.g.
+    # from KlineStore.view or data_fetcher.get_memmap_data), all in `interval`.
+    # Only candles that have opened on the clock are visible; resting orders are
+    # matched against each candle's price path (see price_path) as time passes.
+
+    def __init__(self, klines_by_symbol, interval="1m", balances=None, clock=None, speed=1.0,
+                 latency=None, fees=None, spread=0.0, tick_size="0.01000000", step_size="0.00001000"):
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.records = {symbol: np.asarray(records) for symbol, records in klines_by_symbol.items()}
+        self.paths = {symbol: price_path(records, self.interval_ms) for symbol, records in self.records.items()}
+        self.assets = {symbol: split_symbol(symbol) for symbol in self.records}
+        self.cursor = {symbol: 0 for symbol in self.records}  # path points already matched
+        start_ms = min(int(records["open_time"][0]) for records in self.records.values())
+        self.clock = clock or SimClock(start_ms, speed)
+        self.latency = latency  # LatencyModel, or None for no delay
+        self.fees = fees or FeeModel()
+        self.spread = spread  # market orders fill half the spread away from the last trade
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.balances = {asset: [float(free), 0.0] for asset, free in (balances or {"USDT": 10000.0}).items()}
+        self.orders = {}  # orderId -> order
+        self.open_orders = {symbol: [] for symbol in self.records}
+        self.order_lists = {}  # orderListId -> OCO list
+        self.trades = []  # one dict per fill
+        self.calls = {}  # method -> request count
+        self.order_ids = itertools.count(1)
+        self.list_ids = itertools.count(1)
+        self.trade_ids = itertools.count(1)
+        self.lock = threading.RLock()
+
+    # Clock, prices and matching
+
+    def _request(self, method):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency is not None:
+            self.clock.sleep(self.latency.sample(method))
+
+    def _symbol(self, symbol):
+        if symbol not in self.records:
+            raise _error(-1121, "Invalid symbol.")
+        return symbol
+
+    def _price(self, symbol, now):
+        times, prices = self.paths[symbol]
+        i = int(np.searchsorted(times, now, side="right")) - 1
+        return prices[max(i, 0)]
+
+    def last_price(self, symbol):
+        with self.lock:
+            return self._price(symbol, self.clock.now_ms())
+
+    def _advance(self):
+        # Match resting orders against every path point up to the clock
+        now = self.clock.now_ms()
+        for symbol, (times, prices) in self.paths.items():
+            end = int(np.searchsorted(times, now, side="right"))
+            for i in range(self.cursor[symbol], end):
+                if not self.open_orders[symbol]:
+                    break
+                self._match(symbol, int(times[i]), prices[i])
+            self.cursor[symbol] = max(self.cursor[symbol], end)
+        return now
+
+    def _lock_funds(self, holder, asset, amount):
+        free = self.balances.setdefault(asset, [0.0, 0.0])
+        if free[0] < amount - 1e-12:
+            raise _error(-2010, "Account has insufficient balance for requested action.")
+        free[0] -= amount
+        free[1] += amount
+        holder["lock"] = (asset, amount)
+
+    def _release(self, holder):
+        if holder.get("lock") is None:
+            return
+        asset, amount = holder["lock"]
+        self.balances[asset][0] += amount
+        self.balances[asset][1] -= amount
+        holder["lock"] = None
+
+    def _settle(self, symbol, side, qty, price, time_ms, maker, order_id, reason):
+        base, quote = self.assets[symbol]
+        price = float(price)
+        notional = qty * price
+        fee = self.fees.fee(notional, maker)
+        base_balance = self.balances.setdefault(base, [0.0, 0.0])
+        quote_balance = self.balances.setdefault(quote, [0.0, 0.0])
+        if side == "BUY":
+            quote_balance[0] -= notional + fee
+            base_balance[0] += qty
+        else:
+            base_balance[0] -= qty
+            quote_balance[0] += notional - fee
+        fill = {
+            "tradeId": next(self.trade_ids), "orderId": order_id, "symbol": symbol, "side": side,
+            "price": price, "qty": qty, "commission": fee, "commissionAsset": quote,
+            "time": time_ms, "maker": maker, "reason": reason,
+        }
+        self.trades.append(fill)
+        return fill
+
+    def _new_order(self, symbol, side, type_, qty, price=None, stop_price=None, now=None, order_list=None):
+        order = {
+            "symbol": symbol, "orderId": next(self.order_ids), "orderListId": -1 if order_list is None else order_list["orderListId"],
+            "clientOrderId": f"paper{len(self.orders) + 1}", "side": side, "type": type_,
+            "price": price, "stopPrice": stop_price, "origQty": qty, "executedQty": 0.0,
+            "cummulativeQuoteQty": 0.0, "status": "NEW", "timeInForce": "GTC",
+            "time": now, "updateTime": now, "triggered": False, "fills": [], "list": order_list, "lock": None,
+        }
+        self.orders[order["orderId"]] = order
+        return order
+
+    def _finish(self, order, status, time_ms):
+        order["status"] = status
+        order["updateTime"] = time_ms
+        if order in self.open_orders[order["symbol"]]:
+            self.open_orders[order["symbol"]].remove(order)
+        self._release(order)
+
+    def _fill_order(self, order, price, time_ms, maker, reason):
+        order_list = order["list"]
+        if order_list is not None:
+            # OCO: one leg executing cancels the other and frees the shared lock
+            self._release(order_list)
+            for leg in order_list["orders"]:
+                if leg is not order and leg["status"] == "NEW":
+                    self._finish(leg, "EXPIRED", time_ms)
+            order_list["listOrderStatus"] = "ALL_DONE"
+            order_list["listStatusType"] = "ALL_DONE"
+        self._finish(order, "FILLED", time_ms)
+        qty = order["origQty"]
+        order["fills"].append(self._settle(order["symbol"], order["side"], qty, price, time_ms, maker,
+                                           order["orderId"], reason))
+        order["executedQty"] = qty
+        order["cummulativeQuoteQty"] = qty * price
+
+    def _match(self, symbol, time_ms, price):
+        for order in list(self.open_orders[symbol]):
+            if order["status"] != "NEW":
+                continue
+            buy = order["side"] == "BUY"
+            if order["type"] == "STOP_LOSS_LIMIT" and not order["triggered"]:
+                if (price >= order["stopPrice"]) if buy else (price <= order["stopPrice"]):
+                    order["triggered"] = True
+                    limit = order["price"]
+                    if limit is None or ((price <= limit) if buy else (price >= limit)):
+                        self._fill_order(order, price, time_ms, False, "stop_loss")
+                continue
+            # Resting limits (LIMIT_MAKER legs and triggered stop-limits) fill at their price
+            limit = order["price"]
+            if (price <= limit) if buy else (price >= limit):
+                reason = "stop_loss" if order["type"] == "STOP_LOSS_LIMIT" else "take_profit"
+                self._fill_order(order, limit, time_ms, True, reason)
+
+    def _report(self, order, full=False):
+        report = {
+            "symbol": order["symbol"], "orderId": order["orderId"], "orderListId": order["orderListId"],
+            "clientOrderId": order["clientOrderId"], "transactTime": order["updateTime"],
+            "price": _fmt(order["price"] or 0.0), "origQty": _fmt(order["origQty"]),
+            "executedQty": _fmt(order["executedQty"]), "cummulativeQuoteQty": _fmt(order["cummulativeQuoteQty"]),
+            "status": order["status"], "timeInForce": order["timeInForce"], "type": order["type"],
+            "side": order["side"],
+        }
+        if order["stopPrice"] is not None:
+            report["stopPrice"] = _fmt(order["stopPrice"])
+        if full:
+            report["fills"] = [
+                {"price": _fmt(f["price"]), "qty": _fmt(f["qty"]), "commission": _fmt(f["commission"]),
+                 "commissionAsset": f["commissionAsset"], "tradeId": f["tradeId"]}
+                for f in order["fills"]
+            ]
+        return report
+
+    # Client methods
+
+    def create_order(self, symbol, side, type, quantity, price=None, timeInForce=None, **params):
+        self._request("create_order")
+        with self.lock:
+            now = self._advance()
+            symbol = self._symbol(symbol)
+            qty = float(quantity)
+            if qty <= 0:
+                raise _error(-1013, "Filter failure: LOT_SIZE")
+            base, quote = self.assets[symbol]
+            last = self._price(symbol, now)
+            buy = side == "BUY"
+            if type == "MARKET":
+                fill_price = last * (1.0 + self.spread / 2) if buy else last * (1.0 - self.spread / 2)
+                needed = qty * fill_price + self.fees.fee(qty * fill_price) if buy else qty
+                if self.balances.get(quote if buy else base, [0.0, 0.0])[0] < needed - 1e-12:
+                    raise _error(-2010, "Account has insufficient balance for requested action.")
+                order = self._new_order(symbol, side, type, qty, now=now)
+                self._fill_order(order, fill_price, now, False, "market")
+                return self._report(order, full=True)
+            if type not in ("LIMIT", "LIMIT_MAKER"):
+                raise _error(-1116, "Invalid orderType.")
+            limit = float(price)
+            marketable = last <= limit if buy else last >= limit
+            if marketable and type == "LIMIT_MAKER":
+                raise _error(-2010, "Order would immediately match and take.")
+            order = self._new_order(symbol, side, type, qty, price=limit, now=now)
+            self._lock_funds(order, quote if buy else base,
+                             qty * limit * (1.0 + self.fees.taker) if buy else qty)
+            if marketable:
+                self._fill_order(order, last, now, False, "limit")
+            else:
+                self.open_orders[symbol].append(order)
+            return self._report(order, full=True)
+
+    def create_oco_order(self, symbol, side, quantity, price, stopPrice, stopLimitPrice=None,
+                         stopLimitTimeInForce=None, **params):
+        self._request("create_oco_order")
+        with self.lock:
+            now = self._advance()
+            symbol = self._symbol(symbol)
+            qty = float(quantity)
+            limit, stop = float(price), float(stopPrice)
+            stop_limit = float(stopLimitPrice) if stopLimitPrice is not None else None
+            base, quote = self.assets[symbol]
+            last = self._price(symbol, now)
+            buy = side == "BUY"
+            if not ((limit < last < stop) if buy else (limit > last > stop)):
+                raise _error(-2010, "The relationship of the prices for the orders is not correct.")
+            order_list = {
+                "orderListId": next(self.list_ids), "contingencyType": "OCO", "listStatusType": "EXEC_STARTED",
+                "listOrderStatus": "EXECUTING", "symbol": symbol, "transactionTime": now, "lock": None,
+            }
+            worst = max(limit, stop_limit or stop)
+            self._lock_funds(order_list, quote if buy else base, qty * worst * (1.0 + self.fees.taker) if buy else qty)
+            legs = [
+                self._new_order(symbol, side, "STOP_LOSS_LIMIT", qty, price=stop_limit, stop_price=stop,
+                                now=now, order_list=order_list),
+                self._new_order(symbol, side, "LIMIT_MAKER", qty, price=limit, now=now, order_list=order_list),
+            ]
+            order_list["orders"] = legs
+            self.order_lists[order_list["orderListId"]] = order_list
+            self.open_orders[symbol].extend(legs)
+            return {
+                "orderListId": order_list["orderListId"], "contingencyType": "OCO",
+                "listStatusType": order_list["listStatusType"], "listOrderStatus": order_list["listOrderStatus"],
+                "listClientOrderId": f"paperlist{order_list['orderListId']}", "transactionTime": now,
+                "symbol": symbol,
+                "orders": [{"symbol": symbol, "orderId": o["orderId"], "clientOrderId": o["clientOrderId"]} for o in legs],
+                "orderReports": [self._report(o) for o in legs],
+            }
+
+    def cancel_order(self, symbol, orderId, **params):
+        # Cancelling either leg of an OCO cancels the whole list, as on Binance
+        self._request("cancel_order")
+        with self.lock:
+            now = self._advance()
+            order = self.orders.get(int(orderId))
+            if order is None or order["symbol"] != symbol or order["status"] != "NEW":
+                raise _error(-2011, "Unknown order sent.")
+            order_list = order["list"]
+            if order_list is not None:
+                self._release(order_list)
+                for leg in order_list["orders"]:
+                    if leg["status"] == "NEW":
+                        self._finish(leg, "CANCELED", now)
+                order_list["listOrderStatus"] = order_list["listStatusType"] = "ALL_DONE"
+            else:
+                self._finish(order, "CANCELED", now)
+            return self._report(order)
+
+    def get_order(self, symbol, orderId, **params):
+        self._request("get_order")
+        with self.lock:
+            self._advance()
+            order = self.orders.get(int(orderId))
+            if order is None or order["symbol"] != symbol:
+                raise _error(-2013, "Order does not exist.")
+            return self._report(order)
+
+    def get_open_orders(self, symbol=None, **params):
+        self._request("get_open_orders")
+        with self.lock:
+            self._advance()
+            symbols = [self._symbol(symbol)] if symbol else list(self.open_orders)
+            return [self._report(o) for s in symbols for o in self.open_orders[s]]
+
+    def get_symbol_ticker(self, symbol=None, **params):
+        self._request("get_symbol_ticker")
+        with self.lock:
+            now = self._advance()
+            if symbol is not None:
+                return {"symbol": self._symbol(symbol), "price": _fmt(self._price(symbol, now))}
+            return [{"symbol": s, "price": _fmt(self._price(s, now))} for s in self.records]
+
+    def get_all_tickers(self, **params):
+        self._request("get_all_tickers")
+        with self.lock:
+            now = self._advance()
+            return [{"symbol": s, "price": _fmt(self._price(s, now))} for s in self.records]
+
+    def get_asset_balance(self, asset, **params):
+        self._request("get_asset_balance")
+        with self.lock:
+            self._advance()
+            if asset not in self.balances:
+                return None
+            free, locked = self.balances[asset]
+            return {"asset": asset, "free": _fmt(free), "locked": _fmt(locked)}
+
+    def get_account(self, **params):
+        self._request("get_account")
+        with self.lock:
+            now = self._advance()
+            return {
+                "makerCommission": int(self.fees.maker * 10000), "takerCommission": int(self.fees.taker * 10000),
+                "canTrade": True, "canWithdraw": False, "canDeposit": False, "updateTime": now,
+                "accountType": "SPOT", "permissions": ["SPOT"],
+                "balances": [
+                    {"asset": asset, "free": _fmt(free), "locked": _fmt(locked)}
+                    for asset, (free, locked) in self.balances.items()
+                ],
+            }
+
+    def get_exchange_info(self, **params):
+        self._request("get_exchange_info")
+        return {
+            "timezone": "UTC", "serverTime": self.clock.now_ms(),
+            "symbols": [self._symbol_info(symbol) for symbol in self.records],
+        }
+
+    def get_symbol_info(self, symbol):
+        self._request("get_symbol_info")
+        return self._symbol_info(symbol) if symbol in self.records else None
+
+    def _symbol_info(self, symbol):
+        base, quote = self.assets[symbol]
+        return {
+            "symbol": symbol, "status": "TRADING", "baseAsset": base, "quoteAsset": quote,
+            "ocoAllowed": True, "orderTypes": ["LIMIT", "LIMIT_MAKER", "MARKET", "STOP_LOSS_LIMIT"],
+            "filters": [
+                {"filterType": "PRICE_FILTER", "tickSize": self.tick_size},
+                {"filterType": "LOT_SIZE", "stepSize": self.step_size},
+            ],
+        }
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=500, **params):
+        # Candles opened by now; the last one is still forming and only reflects
+        # the part of its price path that has happened. Longer intervals that can
+        # be derived from the replayed one are resampled from it.
+        self._request("get_klines")
+        with self.lock:
+            now = self._advance()
+            symbol = self._symbol(symbol)
+            limit = min(int(limit), 1000)
+            if interval == self.interval:
+                ratio = 1
+            elif can_derive(interval, self.interval):
+                ratio = interval_to_ms(interval) // self.interval_ms
+            else:
+                raise _error(-1120, "Invalid interval.")
+            records = self.records[symbol]
+            open_times = records["open_time"]
+            hi = int(np.searchsorted(open_times, now, side="right"))
+            if startTime is not None:
+                bucket_ms = self.interval_ms * ratio
+                lo = int(np.searchsorted(open_times, int(startTime) // bucket_ms * bucket_ms))
+                hi = min(hi, lo + (limit + 1) * ratio)
+            else:
+                lo = max(0, hi - (limit + 1) * ratio)
+            visible = np.array(records[lo:hi])
+            if len(visible) and now < visible["open_time"][-1] + self.interval_ms - 1:
+                self._forming(symbol, visible, now)
+            bars = visible if ratio == 1 else resample_records(visible, interval)
+            bar_ms = self.interval_ms * ratio
+            if startTime is not None:
+                bars = bars[bars["open_time"] >= int(startTime)][:limit]
+            if endTime is not None:
+                bars = bars[bars["open_time"] <= int(endTime)]
+            if startTime is None:
+                bars = bars[-limit:]
+            return [self._kline_row(bar, bar_ms) for bar in bars]
+
+    def _forming(self, symbol, records, now):
+        # Cut the last record back to the part of its price path seen by now
+        times, prices = self.paths[symbol]
+        open_time = records["open_time"][-1]
+        start = int(np.searchsorted(times, open_time))
+        seen = prices[start:max(int(np.searchsorted(times, now, side="right")), start + 1)]
+        records["high"][-1] = seen.max()
+        records["low"][-1] = seen.min()
+        records["close"][-1] = seen[-1]
+        records["volume"][-1] *= min(1.0, (now - open_time + 1) / self.interval_ms)
+
+    def _kline_row(self, bar, bar_ms):
+        names = bar.dtype.names
+        volume = float(bar["volume"])
+        quote_volume = float(bar["quote_volume"]) if "quote_volume" in names else volume * float(bar["close"])
+        return [
+            int(bar["open_time"]), _fmt(bar["open"]), _fmt(bar["high"]), _fmt(bar["low"]), _fmt(bar["close"]),
+            _fmt(volume), int(bar["open_time"]) + bar_ms - 1, _fmt(quote_volume),
+            int(bar["trades"]) if "trades" in names else 0,
+            _fmt(bar["taker_base_volume"]) if "taker_base_volume" in names else _fmt(volume / 2),
+            _fmt(bar["taker_quote_volume"]) if "taker_quote_volume" in names else _fmt(quote_volume / 2),
+            "0",
+        ]
+
+    def equity(self, quote="USDT"):
+        # Quote value of every balance at the current prices
+        with self.lock:
+            now = self.clock.now_ms()
+            total = sum(self.balances.get(quote, [0.0, 0.0]))
+            for symbol, (base, symbol_quote) in self.assets.items():
+                if symbol_quote == quote and base in self.balances:
+                    total += sum(self.balances[base]) * self._price(symbol, now)
+            return total
+
+
+class PaperKlineSource:
+    # Closed-kline events, in the shape live_async.parse_kline_message produces,
+    # emitted as each candle closes on the exchange clock
+
+    def __init__(self, exchange, symbols=None):
+        self.exchange = exchange
+        self.symbols = list(symbols or exchange.records)
+
+    async def events(self):
+        clock = self.exchange.clock
+        now = clock.now_ms()
+        close_times, owners, rows = [], [], []
+        for i, symbol in enumerate(self.symbols):
+            records = self.exchange.records[symbol]
+            closes = records["open_time"] + self.exchange.interval_ms - 1
+            keep = np.flatnonzero(closes >= now)
+            close_times.append(closes[keep])
+            owners.append(np.full(len(keep), i))
+            rows.append(keep)
+        close_times, owners, rows = np.concatenate(close_times), np.concatenate(owners), np.concatenate(rows)
+        for k in np.argsort(close_times, kind="stable"):
+            symbol = self.symbols[owners[k]]
+            record = self.exchange.records[symbol][rows[k]]
+            await asyncio.sleep(clock.real_seconds_until(int(close_times[k]) + 1))
+            yield {
+                "symbol": symbol,
+                "open_time": int(record["open_time"]),
+                "close_time": int(close_times[k]),
+                "close": float(record["close"]),
+                "closed": True,
+            }
+
+
+def run_paper(klines_by_symbol, interval="1m", speed=600.0, cash=10000.0, latency=None, fees=None,
+              spread=0.0, poll=False):
+    # Runs main's live loop (the kline stream by default, the polling loop with
+    # poll=True) against a PaperExchange until the stored klines run out. The
+    # clock starts main.lookback candles in, so seeding finds its history.
+    import main
+    from account_cache import AccountState, CountingClient
+
+    symbols = list(klines_by_symbol)
+    interval_ms = interval_to_ms(interval)
+    start_ms = max(
+        int(records["open_time"][min(main.lookback, len(records) - 1)]) for records in klines_by_symbol.values()
+    )
+    end_ms = max(int(records["open_time"][-1]) for records in klines_by_symbol.values()) + interval_ms
+    paper = PaperExchange(klines_by_symbol, interval, balances={"USDT": cash}, clock=SimClock(start_ms, speed),
+                          latency=latency, fees=fees, spread=spread)
+
+    main.client = CountingClient(paper)
+    main.state = AccountState(main.client)
+    main.clock = paper.clock
+    main.symbols = symbols
+    main.interval = interval
+    main.metrics_path = None
+    if poll:
+        # One poll per main.poll_seconds of simulated time, enough to reach the last candle
+        poll_ms = int(main.poll_seconds * 1000)
+        main.main(cycles=max(1, -(-(end_ms - start_ms) // poll_ms)))
+    else:
+        asyncio.run(main.async_main(PaperKlineSource(paper, symbols), reconnect=False))
+    return paper
+
+
+def print_report(paper, registry=None):
+    from metrics import REGISTRY
+
+    registry = registry or REGISTRY
+    fills = paper.trades
+    print(f"Orders: {len(paper.orders)}, fills: {len(fills)}, "
+          f"fees: {sum(f['commission'] for f in fills):.4f}")
+    reasons = {}
+    for fill in fills:
+        reasons[fill["reason"]] = reasons.get(fill["reason"], 0) + 1
+    if reasons:
+        print("Fills by reason: " + ", ".join(f"{reason}={count}" for reason, count in sorted(reasons.items())))
+    print(f"Equity: {paper.equity():.2f} USDT")
+    print("Requests: " + ", ".join(f"{method}={count}" for method, count in sorted(paper.calls.items())))
+    errors = sum(value for (name, _), value in registry.counters.items() if name == "order_errors_total")
+    print(f"Order errors: {errors:g}")
+
+    print("\nLatency (ms)           count    mean     p50     p95     p99")
+    rows = []
+    for (name, labels), histogram in sorted(registry.histograms.items()):
+        label = dict(labels)
+        if name == "trading_stage_seconds":
+            rows.append((f"stage {label['stage']}", histogram))
+        elif name == "rest_request_seconds":
+            rows.append((f"rest {label['endpoint']}", histogram))
+        elif name == "candle_to_order_seconds":
+            rows.append((f"candle->order {label['symbol']}", histogram))
+    for title, histogram in rows:
+        if not histogram.count:
+            continue
+        quantiles = [histogram.quantile(q) * 1000 for q in (0.5, 0.95, 0.99)]
+        print(f"{title:<22} {histogram.count:>6} {histogram.sum / histogram.count * 1000:>7.2f} "
+              + " ".join(f"{q:>7.2f}" for q in quantiles))
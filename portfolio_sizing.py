@@ -0,0 +1,157 @@
+# portfolio_sizing.py
+# Cross-asset position sizing for a whole universe at once. Bar returns go into a
+# (window, symbols) ring buffer while running sums of the returns and squared
+# returns (and, for "erc", their outer products) are kept up to date, so
+# volatilities, risk-parity weights and Kelly fractions are a few array
+# operations per bar rather than a loop over symbols.
+import numpy as np
+
+from utils import inverse_volatility_weights, kelly_fractions
+
+
+class PortfolioSizer:
+    def __init__(self, symbols, window=96, method="inverse_vol", kelly_multiplier=0.5,
+                 min_trades=20, default_fraction=0.5, max_weight=1.0, refresh_every=None):
+        # method: "inverse_vol" (utils.calculate_risk_parity_weights on arrays) or
+        # "erc" (equal risk contribution from the full covariance matrix).
+        # Kelly fractions need min_trades closed trades per symbol; before that
+        # default_fraction is used.
+        if method not in ("inverse_vol", "erc"):
+            raise ValueError(f"Unknown risk-parity method: {method}")
+        self.symbols = list(symbols)
+        self.slots = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = window
+        self.method = method
+        self.kelly_multiplier = kelly_multiplier
+        self.min_trades = min_trades
+        self.default_fraction = default_fraction
+        self.max_weight = max_weight
+        # Running sums drift by float rounding; rebuild them from the buffer now and then
+        self.refresh_every = refresh_every or 10 * window
+
+        n = len(self.symbols)
+        self.returns = np.zeros((window, n))
+        self.sum = np.zeros(n)
+        self.sum_sq = np.zeros(n)
+        # The O(n^2) cross products are only kept when the weights need them
+        self.cross = np.zeros((n, n)) if method == "erc" else None
+        self.last_prices = None
+        self.count = 0  # returns pushed so far
+        self.wins = np.zeros(n)
+        self.losses = np.zeros(n)
+        self.win_total = np.zeros(n)
+        self.loss_total = np.zeros(n)
+
+    def update(self, prices):
+        # prices: one price per symbol, in self.symbols order; NaN counts as no move
+        prices = np.asarray(prices, dtype=float)
+        if self.last_prices is None:
+            self.last_prices = prices.copy()
+            return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.log(prices / self.last_prices)
+        r[~np.isfinite(r)] = 0.0
+        self.last_prices = np.where(np.isfinite(prices), prices, self.last_prices)
+
+        slot = self.count % self.window
+        old = self.returns[slot]
+        self.sum += r - old
+        self.sum_sq += r * r - old * old
+        if self.cross is not None:
+            self.cross += np.outer(r, r) - np.outer(old, old)
+        self.returns[slot] = r
+        self.count += 1
+        if self.count % self.refresh_every == 0:
+            self.sum = self.returns.sum(axis=0)
+            self.sum_sq = (self.returns * self.returns).sum(axis=0)
+            if self.cross is not None:
+                self.cross = self.returns.T @ self.returns
+
+    def record_trade(self, symbol, pnl):
+        i = self.slots[symbol]
+        if pnl > 0:
+            self.wins[i] += 1
+            self.win_total[i] += pnl
+        elif pnl < 0:
+            self.losses[i] += 1
+            self.loss_total[i] -= pnl
+
+    @property
+    def ready(self):
+        return self.count >= 2
+
+    def covariance(self):
+        n = min(self.count, self.window)
+        size = len(self.symbols)
+        if n < 2:
+            return np.full((size, size), np.nan)
+        mean = self.sum / n
+        if self.cross is None:
+            returns = self.returns[:n] - mean
+            return returns.T @ returns / (n - 1)
+        return (self.cross - n * np.outer(mean, mean)) / (n - 1)
+
+    def volatilities(self):
+        n = min(self.count, self.window)
+        if n < 2:
+            return np.full(len(self.symbols), np.nan)
+        variance = (self.sum_sq - self.sum * self.sum / n) / (n - 1)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    def risk_parity_weights(self):
+        vol = self.volatilities()
+        weights = inverse_volatility_weights(vol)
+        if self.method == "erc" and weights.any():
+            weights = self._equal_risk_contribution(self.covariance(), weights)
+        return np.minimum(weights, self.max_weight)
+
+    @staticmethod
+    def _equal_risk_contribution(cov, weights, iterations=50, tol=1e-10):
+        # Multiplicative updates towards equal w_i * (cov @ w)_i, started from
+        # inverse-volatility weights (the exact answer when correlations are equal)
+        active = weights > 0
+        cov = cov[np.ix_(active, active)]
+        w = weights[active]
+        for _ in range(iterations):
+            contrib = w * (cov @ w)
+            if (contrib <= 0).any():
+                break
+            step = np.sqrt(contrib.mean() / contrib)
+            w = w * step
+            w /= w.sum()
+            if np.abs(step - 1.0).max() < tol:
+                break
+        out = np.zeros_like(weights)
+        out[active] = w
+        return out
+
+    def kelly(self):
+        trades = self.wins + self.losses
+        with np.errstate(divide="ignore", invalid="ignore"):
+            win_prob = self.wins / trades
+            # No losses yet: an unbounded ratio, so the Kelly fraction is win_prob.
+            # No wins: the ratio is NaN and kelly_fractions gives 0.
+            win_loss_ratio = np.where(
+                self.losses > 0, (self.win_total / self.wins) / (self.loss_total / self.losses), np.inf
+            )
+        kelly = kelly_fractions(win_prob, win_loss_ratio) * self.kelly_multiplier
+        return np.where(trades >= self.min_trades, kelly, self.default_fraction)
+
+    def target_values(self, equity):
+        # Capital to hold in each symbol
+        if not self.ready:
+            return np.zeros(len(self.symbols))
+        return equity * self.risk_parity_weights() * self.kelly()
+
+    def target_sizes(self, equity, prices=None):
+        # Units to hold in each symbol, at the given prices or the last update's
+        prices = self.last_prices if prices is None else np.asarray(prices, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sizes = self.target_values(equity) / prices
+        return np.nan_to_num(sizes, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def target_size(self, symbol, equity, price=None):
+        i = self.slots[symbol]
+        price = self.last_prices[i] if price is None else price
+        value = self.target_values(equity)[i]
+        return value / price if price > 0 else 0.0
@@ -0,0 +1,116 @@
+# result_cache.py
+# Content-addressed cache of backtest results. The key hashes the input bars,
+# the source of the strategy class and engine code, the params and the run
+# options, so editing one strategy only invalidates that strategy's entries.
+# Entries are pickles on disk, evicted least-recently-used past max_bytes.
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "backtest_cache"
+
+
+def _digest():
+    return hashlib.blake2b(digest_size=20)
+
+
+def hash_data(historical_data):
+    # {symbol: DataFrame or kline record array} -> hex digest of the bars themselves
+    h = _digest()
+    for symbol in sorted(historical_data):
+        data = historical_data[symbol]
+        h.update(symbol.encode())
+        if isinstance(data, pd.DataFrame):
+            h.update(np.ascontiguousarray(data.index.asi8).tobytes())
+            for column in data.columns:
+                h.update(str(column).encode())
+                h.update(np.ascontiguousarray(data[column].to_numpy()).tobytes())
+        else:
+            h.update(str(data.dtype).encode())
+            h.update(np.ascontiguousarray(data).data)
+    return h.hexdigest()
+
+
+def code_fingerprint(*objects):
+    # Source of the given classes, functions and modules; for classes also every
+    # base class defined outside backtrader
+    h = _digest()
+    for obj in objects:
+        parts = obj.__mro__ if inspect.isclass(obj) else (obj,)
+        for part in parts:
+            module = getattr(part, "__module__", None) or ""
+            if part is object or module.split(".")[0] in ("backtrader", "builtins"):
+                continue
+            h.update(inspect.getsource(part).encode())
+    return h.hexdigest()
+
+
+def cache_key(data_hash, code_hash, params, **options):
+    payload = json.dumps([data_hash, code_hash, params, options], sort_keys=True, default=str)
+    h = _digest()
+    h.update(payload.encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=256 * 2 ** 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        os.utime(path)  # mtime doubles as the last-used time for LRU eviction
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def cached(self, key, compute):
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
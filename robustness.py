@@ -0,0 +1,290 @@
+# robustness.py
+# Resampling analysis of a single backtest result (any engine's summary dict).
+# Four experiments, each run thousands of times to turn one historical path into
+# confidence intervals:
+#   bootstrap  circular block bootstrap of the per-period equity returns
+#   trades     trades resampled with replacement
+#   shuffle    the same trades in random order (path-dependent metrics only)
+#   costs      every trade re-priced with random slippage and commission
+# Equity is taken at period ends (days by default), as vector_backtest's Sharpe
+# is, so the Sharpe observed here matches the backtest's for the same timeframe.
+# Each experiment is evaluated a chunk of resamples at a time as 2-D arrays, and
+# chunks are spread over a process pool that receives the inputs once.
+import argparse
+import datetime
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from vector_backtest import PERIOD_CODES, TIMEFRAME_FACTORS
+
+CHUNK_ELEMENTS = 4_000_000  # resamples x path length evaluated per chunk (~32 MB per float64 array)
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+_worker_inputs = None
+
+
+def sharpe_rows(returns, periods_per_year, riskfreerate=0.01):
+    # Annualised Sharpe of every row, computed like vector_backtest.sharpe_ratio
+    rate = pow(1.0 + riskfreerate, 1.0 / periods_per_year) - 1.0
+    excess = returns - rate
+    std = excess.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, excess.mean(axis=1) / std * math.sqrt(periods_per_year), np.nan)
+
+
+def drawdown_rows(equity, start_value):
+    # Max drawdown in percent of every row, with start_value as the first peak.
+    # Resampled trade sequences keep their recorded sizes and can lose more than
+    # the account holds; that counts as a 100% drawdown.
+    peaks = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peaks, start_value, out=peaks)
+    return np.minimum((peaks - equity) / peaks, 1.0).max(axis=1) * 100.0
+
+
+def profit_factor_rows(pnls):
+    gains = np.where(pnls > 0, pnls, 0.0).sum(axis=1)
+    losses = -np.where(pnls < 0, pnls, 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(losses > 0, gains / losses, np.where(gains > 0, np.inf, np.nan))
+
+
+def period_equity(equity, timeframe):
+    # (equity at each period end, period of every bar, periods per year).
+    # timeframe="bars" keeps every bar.
+    if timeframe == "bars":
+        spacing = pd.Series(equity.index).diff().median().total_seconds()
+        return equity.to_numpy(dtype=float), np.arange(len(equity)), SECONDS_PER_YEAR / spacing
+    periods, _ = pd.factorize(equity.index.to_period(PERIOD_CODES[timeframe]))
+    ends = np.append(np.flatnonzero(np.diff(periods)), len(periods) - 1)
+    return equity.to_numpy(dtype=float)[ends], periods, TIMEFRAME_FACTORS[timeframe]
+
+
+def trade_inputs(result, bar_periods):
+    # Closed trades as arrays, plus the period each one exits in
+    trades = result.get("trade_list")
+    if trades is None:
+        return None
+    trades = trades[trades["PnL"].notna()]
+    if len(trades) < 2:
+        return None
+    exit_bar = np.searchsorted(result["equity"].index.to_numpy(), pd.DatetimeIndex(trades["Exit_time"]).to_numpy())
+    return {
+        "pnl": trades["PnL"].to_numpy(dtype=float),
+        "entry": trades["Entry_price"].to_numpy(dtype=float),
+        "exit": trades["Exit_price"].to_numpy(dtype=float),
+        "size": trades["Size"].to_numpy(dtype=float),
+        "exit_period": bar_periods[np.minimum(exit_bar, len(bar_periods) - 1)],
+    }
+
+
+def _attach(inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _bootstrap(rng, count, inputs):
+    returns = inputs["returns"]
+    n = len(returns)
+    block = inputs["block_size"]
+    blocks = -(-n // block)
+    starts = rng.integers(0, n, size=(count, blocks, 1))
+    index = ((starts + np.arange(block)) % n).reshape(count, -1)[:, :n]
+    sampled = returns[index]
+    equity = inputs["start_value"] * np.cumprod(1.0 + sampled, axis=1)
+    return {
+        "sharpe": sharpe_rows(sampled, inputs["periods_per_year"]),
+        "max_drawdown": drawdown_rows(equity, inputs["start_value"]),
+        "return_pct": (equity[:, -1] / inputs["start_value"] - 1.0) * 100.0,
+    }
+
+
+def _trade_metrics(pnls, start_value):
+    equity = start_value + np.cumsum(pnls, axis=1)
+    return {
+        "profit_factor": profit_factor_rows(pnls),
+        "win_rate": (pnls > 0).mean(axis=1) * 100.0,
+        "max_drawdown": drawdown_rows(equity, start_value),
+        "return_pct": pnls.sum(axis=1) / start_value * 100.0,
+    }
+
+
+def _trades(rng, count, inputs):
+    pnl = inputs["trades"]["pnl"]
+    return _trade_metrics(pnl[rng.integers(0, len(pnl), size=(count, len(pnl)))], inputs["start_value"])
+
+
+def _shuffle(rng, count, inputs):
+    pnls = rng.permuted(np.tile(inputs["trades"]["pnl"], (count, 1)), axis=1)
+    equity = inputs["start_value"] + np.cumsum(pnls, axis=1)
+    return {"max_drawdown": drawdown_rows(equity, inputs["start_value"])}
+
+
+def _costs(rng, count, inputs):
+    # Fills move against the trade by the slippage fraction on both legs and
+    # both legs pay the drawn commission rate; the difference to the recorded
+    # PnL is booked in the exit period of the equity curve
+    trades = inputs["trades"]
+    slip_low, slip_high = inputs["slippage"]
+    comm_low, comm_high = inputs["commission_range"]
+    slippage = rng.uniform(slip_low, slip_high, size=(count, 1))
+    commission = rng.uniform(comm_low, comm_high, size=(count, 1))
+    entry = trades["entry"] * (1.0 + slippage)
+    exit_ = trades["exit"] * (1.0 - slippage)
+    size = trades["size"]
+    pnls = size * (exit_ - entry) - commission * size * (entry + exit_)
+
+    metrics = _trade_metrics(pnls, inputs["start_value"])
+    # Running total of the PnL changes as of each period end
+    order = np.argsort(trades["exit_period"], kind="stable")
+    changes = np.cumsum((pnls - trades["pnl"])[:, order], axis=1)
+    changes = np.concatenate([np.zeros((count, 1)), changes], axis=1)
+    exits = np.searchsorted(trades["exit_period"][order], np.arange(len(inputs["equity"])), side="right")
+    equity = inputs["equity"] + changes[:, exits]
+    # The trades keep their recorded sizes, so each period's re-priced PnL is
+    # measured against the capital the run held then. Relative to the re-priced
+    # equity, a path close to zero would show huge returns and a better Sharpe
+    # for higher costs.
+    capital = np.concatenate([[inputs["start_value"]], inputs["equity"][:-1]])
+    pnl = np.diff(equity, axis=1, prepend=inputs["start_value"])
+    sharpe = sharpe_rows(pnl / capital, inputs["periods_per_year"])
+    # Ruined rows (equity reaching zero) have no meaningful Sharpe, like the
+    # 100% cap of drawdown_rows; they are counted as undefined
+    sharpe[(equity <= 0).any(axis=1)] = np.nan
+    metrics["sharpe"] = sharpe
+    metrics["max_drawdown"] = drawdown_rows(equity, inputs["start_value"])
+    return metrics
+
+
+EXPERIMENTS = {
+    "bootstrap": _bootstrap,
+    "trades": _trades,
+    "shuffle": _shuffle,
+    "costs": _costs,
+}
+
+
+def _run_chunk(job):
+    experiment, count, seed = job
+    return experiment, EXPERIMENTS[experiment](np.random.default_rng(seed), count, _worker_inputs)
+
+
+def observed_metrics(inputs):
+    # {(experiment, metric): value} for the actual run, computed the way each
+    # experiment computes its resamples: bar metrics from the equity curve,
+    # trade metrics from the recorded trade sequence
+    bars = {
+        "sharpe": sharpe_rows(inputs["returns"][None, :], inputs["periods_per_year"])[0],
+        "max_drawdown": drawdown_rows(inputs["equity"][None, :], inputs["start_value"])[0],
+        "return_pct": (inputs["equity"][-1] / inputs["start_value"] - 1.0) * 100.0,
+    }
+    observed = {("bootstrap", metric): value for metric, value in bars.items()}
+    if inputs["trades"] is not None:
+        trades = {
+            metric: values[0]
+            for metric, values in _trade_metrics(inputs["trades"]["pnl"][None, :], inputs["start_value"]).items()
+        }
+        for experiment in ("trades", "shuffle", "costs"):
+            observed.update({(experiment, metric): value for metric, value in trades.items()})
+        observed[("costs", "sharpe")] = bars["sharpe"]
+        observed[("costs", "max_drawdown")] = bars["max_drawdown"]
+    return {key: float(value) for key, value in observed.items()}
+
+
+def analyze(result, resamples=10_000, timeframe="days", block_size=None, slippage=(0.0, 0.001),
+            commission=0.001, commission_range=None, confidence=0.95, processes=None, seed=0):
+    # result: a backtest summary with "equity" (and "trade_list" for the trade
+    # experiments). timeframe is one of vector_backtest.PERIOD_CODES or "bars".
+    # slippage and commission_range are the uniform ranges the costs experiment
+    # draws from (commission_range defaults to half to twice the run's
+    # commission). processes=1 runs in this process. Returns a DataFrame indexed
+    # by (experiment, metric) with the observed value and the interval.
+    equity, bar_periods, periods_per_year = period_equity(result["equity"], timeframe)
+    if len(equity) < 2:
+        raise ValueError(f"Need at least two {timeframe} of equity to resample")
+    start_value = float(result["start_value"])
+    returns = equity / np.concatenate([[start_value], equity[:-1]]) - 1.0
+    trades = trade_inputs(result, bar_periods)
+    inputs = {
+        "equity": equity,
+        "returns": returns,
+        "start_value": start_value,
+        "periods_per_year": periods_per_year,
+        "block_size": block_size or max(1, round(len(returns) ** (1 / 3))),
+        "trades": trades,
+        "slippage": slippage,
+        "commission_range": commission_range or (commission * 0.5, commission * 2.0),
+    }
+
+    experiments = ["bootstrap"] + (["trades", "shuffle", "costs"] if trades is not None else [])
+    chunks = []
+    for experiment in experiments:
+        width = len(equity) if experiment in ("bootstrap", "costs") else len(trades["pnl"])
+        chunk = max(1, min(resamples, CHUNK_ELEMENTS // width))
+        chunks += [(experiment, min(chunk, resamples - done)) for done in range(0, resamples, chunk)]
+    # One independent stream per chunk, so results do not depend on the process count
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(experiment, count, chunk_seed) for (experiment, count), chunk_seed in zip(chunks, seeds)]
+
+    if processes == 1:
+        _attach(inputs)
+        outputs = [_run_chunk(job) for job in jobs]
+    else:
+        processes = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=processes, initializer=_attach, initargs=(inputs,)) as pool:
+            outputs = list(pool.map(_run_chunk, jobs))
+
+    samples = {}
+    for experiment, metrics in outputs:
+        for metric, values in metrics.items():
+            samples.setdefault((experiment, metric), []).append(values)
+
+    observed = observed_metrics(inputs)
+    tail = (1.0 - confidence) / 2 * 100.0
+    rows = []
+    for (experiment, metric), parts in samples.items():
+        values = np.concatenate(parts)
+        # Undefined values (no losing trade, flat equity) are left out of the interval
+        finite = values[np.isfinite(values)]
+        low, median, high = np.percentile(finite, [tail, 50.0, 100.0 - tail]) if len(finite) else (np.nan,) * 3
+        rows.append({
+            "experiment": experiment, "metric": metric, "observed": observed.get((experiment, metric), np.nan),
+            "mean": finite.mean() if len(finite) else np.nan, "low": low, "median": median, "high": high,
+            "resamples": len(values), "undefined": len(values) - len(finite),
+        })
+    return pd.DataFrame(rows).set_index(["experiment", "metric"])
+
+
+def print_report(report, confidence=0.95):
+    print(f"\n=== Robustness ({confidence:.0%} intervals) ===")
+    with pd.option_context("display.float_format", "{:.3f}".format, "display.width", 120):
+        print(report[["observed", "low", "median", "high", "resamples"]].to_string())
+
+
+def run_from_args(args):
+    # Entry point for `cli.py robustness` (see cli.add_robustness_arguments)
+    from backtest import run_cached
+    from data_fetcher import get_historical_data
+
+    start_ts = int(datetime.datetime.strptime(args.start, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int(datetime.datetime.strptime(args.end, "%Y-%m-%d").timestamp() * 1000)
+    historical_data = get_historical_data(args.symbols.split(","), args.interval, start_ts, end_ts)
+    if not historical_data:
+        print("Historical data could not be fetched.")
+        return
+    summary = run_cached(args.engine, historical_data)
+    report = analyze(summary, resamples=args.resamples, timeframe=args.timeframe, block_size=args.block_size,
+                     slippage=(0.0, args.max_slippage), confidence=args.confidence,
+                     processes=args.processes, seed=args.seed)
+    print_report(report, args.confidence)
+
+
+if __name__ == "__main__":
+    from cli import add_robustness_arguments
+
+    parser = argparse.ArgumentParser(description="Bootstrap and Monte Carlo robustness of an AdvancedStrategy backtest")
+    add_robustness_arguments(parser)
+    run_from_args(parser.parse_args())
@@ -3,21 +3,33 @@
 import backtrader as bt
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import accuracy_score
-from joblib import dump, load
+from collections import deque
+from feature_buffer import FeatureBuffer
+from portfolio_sizing import PortfolioSizer
 
 class AdvancedStrategy(bt.Strategy):
     params = (
         ("short_window", 10),
         ("long_window", 20),
         ("atr_period", 14),
+        ("adx_entry", 20),
+        ("adx_exit", 25),
+        ("rsi_lower", 10),
+        ("rsi_upper", 90),
+        ("risk_per_trade", 0.01),  # Risk 1% of portfolio
+        ("sizing", "atr"),  # "atr": per-symbol ATR risk sizing; "portfolio": PortfolioSizer targets
+        ("sizing_window", 96),  # Bars of returns behind the portfolio volatilities
+        ("sizing_method", "inverse_vol"),  # or "erc"
     )
 
     def __init__(self):
         self.symbols = [data._name for data in self.datas]
+        self.portfolio_sizer = None
+        if self.params.sizing == "portfolio":
+            self.portfolio_sizer = PortfolioSizer(self.symbols, window=self.params.sizing_window,
+                                                   method=self.params.sizing_method)
+        elif self.params.sizing != "atr":
+            raise ValueError(f"Unknown sizing mode: {self.params.sizing}")
         self.indicators = {}
         for data in self.datas:
             symbol = data._name
@@ -35,8 +47,17 @@ class AdvancedStrategy(bt.Strategy):
             ind['buy_price'] = None
             ind['stop_loss_price'] = None
 
+    def notify_trade(self, trade):
+        if self.portfolio_sizer is not None and trade.isclosed:
+            self.portfolio_sizer.record_trade(trade.data._name, trade.pnlcomm)
+
     def next(self):
-        for data in self.datas:
+        target_sizes = None
+        if self.portfolio_sizer is not None:
+            # One vectorised update and sizing pass for the whole universe per bar
+            self.portfolio_sizer.update([data.close[0] for data in self.datas])
+            target_sizes = self.portfolio_sizer.target_sizes(self.broker.getvalue())
+        for i, data in enumerate(self.datas):
             symbol = data._name
             pos = self.getposition(data).size
             price = data.close[0]
@@ -72,18 +93,21 @@ class AdvancedStrategy(bt.Strategy):
                 if (
                     ema_short > ema_long and
                     macd_line > macd_signal and
-                    adx > 20 and
-                    10 < rsi < 90 and
+                    adx > self.params.adx_entry and
+                    self.params.rsi_lower < rsi < self.params.rsi_upper and
                     stochastic_k > stochastic_d and
                     price > bollinger_mid and
                     price > ichimoku_span_a and
                     price > ichimoku_span_b
                 ):
                     # Risk management: position sizing based on ATR
-                    risk_per_trade = 0.01  # Risk 1% of portfolio
+                    risk_per_trade = self.params.risk_per_trade
                     cash = self.broker.get_cash()
                     if atr > 0:
-                        position_size = (cash * risk_per_trade) / (atr * 2)
+                        if target_sizes is not None:
+                            position_size = min(target_sizes[i], cash / price)
+                        else:
+                            position_size = (cash * risk_per_trade) / (atr * 2)
                         if position_size > 0:
                             self.buy(data=data, size=position_size)
                             ind['buy_price'] = price
@@ -102,7 +126,7 @@ class AdvancedStrategy(bt.Strategy):
                 elif (
                     ema_short < ema_long and
                     macd_line < macd_signal and
-                    adx < 25 and
+                    adx < self.params.adx_exit and
                     stochastic_k < stochastic_d and
                     price < bollinger_mid
                 ):
@@ -113,20 +137,47 @@ class MLStrategy(bt.Strategy):
     params = (
         ("lookback", 14),
         ("n_estimators", 100),
+        ("train_window", 2000),  # Most recent rows used for each fit
+        ("retrain_every", 96),  # Bars between scheduled retrains
+        ("drift_window", 50),  # Recent predictions checked for drift
+        ("drift_threshold", 0.45),  # Retrain early if hit rate falls below this
+        ("n_jobs", None),
+        ("model_dir", None),  # Pretrained models from ml_pipeline.py; disables in-loop training
+        ("model_version", None),  # None loads the latest saved version
     )
 
     def __init__(self):
+        # scikit-learn is only imported when an ML strategy is actually built
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+
         self.symbols = [data._name for data in self.datas]
         self.models = {}
         self.scalers = {}
         self.feature_data = {}
-        self.min_data_points = self.params.lookback + 50  # Increase to ensure enough data for training
+        self.last_trained = {}
+        self.last_prediction = {}
+        self.hits = {}
+        self.min_data_points = 50  # Complete rows needed before the first fit
+        self.pretrained = self.params.model_dir is not None
+        lookback = self.params.lookback
+        capacity = self.params.train_window + 1
+        if self.pretrained:
+            self.load_pretrained()
+            lookback = self.pretrained_lookback
+            capacity = 1
 
         for data in self.datas:
             symbol = data._name
-            self.feature_data[symbol] = pd.DataFrame()
-            self.models[symbol] = RandomForestClassifier(n_estimators=self.params.n_estimators)
-            self.scalers[symbol] = StandardScaler()
+            self.feature_data[symbol] = FeatureBuffer(lookback, capacity)
+            if not self.pretrained:
+                self.models[symbol] = RandomForestClassifier(
+                    n_estimators=self.params.n_estimators, n_jobs=self.params.n_jobs
+                )
+                self.scalers[symbol] = StandardScaler()
+            self.last_trained[symbol] = None
+            self.last_prediction[symbol] = None
+            self.hits[symbol] = deque(maxlen=self.params.drift_window)
 
             # Initialize indicators for feature calculation
             data.ema_short = bt.indicators.EMA(data.close, period=12)
@@ -137,73 +188,114 @@ class MLStrategy(bt.Strategy):
             data.stochastic = bt.indicators.Stochastic(data)
             data.bollinger = bt.indicators.BollingerBands(data.close)
 
+    def load_pretrained(self):
+        from ml_pipeline import load_models
+
+        artifact, manifest = load_models(self.params.model_dir, self.params.model_version)
+        self.pretrained_lookback = manifest["lookback"]
+        self.shared_model = artifact.get("shared")
+        self.models = artifact.get("models", {})
+        missing = [symbol for symbol in self.symbols if symbol not in artifact["scalers"]]
+        if missing:
+            print(f"No pretrained model for {', '.join(missing)}; these symbols will not trade.")
+        # Scaler parameters stacked per symbol, so scaling a bar is one array operation
+        self.model_symbols = [symbol for symbol in self.symbols if symbol not in missing]
+        self.model_slots = {symbol: i for i, symbol in enumerate(self.model_symbols)}
+        scalers = [artifact["scalers"][symbol] for symbol in self.model_symbols]
+        self.scaler_mean = np.array([scaler.mean_ for scaler in scalers])
+        self.scaler_scale = np.array([scaler.scale_ for scaler in scalers])
+        print(f"Loaded models version {manifest['version']} for {len(self.model_symbols)} symbols")
+
+    def predict_batch(self, symbols):
+        # One scaled (symbols, features) matrix per bar; a shared model predicts it in one call
+        rows = np.vstack([self.feature_data[symbol].latest(1) for symbol in symbols])
+        slots = [self.model_slots[symbol] for symbol in symbols]
+        X = (rows - self.scaler_mean[slots]) / self.scaler_scale[slots]
+        if self.shared_model is not None:
+            return self.shared_model.predict(X)
+        return [self.models[symbol].predict(X[i:i + 1])[0] for i, symbol in enumerate(symbols)]
+
+    def needs_training(self, symbol, buffer):
+        last_trained = self.last_trained[symbol]
+        if last_trained is None:
+            return True
+        if buffer.count - last_trained >= self.params.retrain_every:
+            return True
+        hits = self.hits[symbol]
+        return len(hits) == hits.maxlen and sum(hits) / len(hits) < self.params.drift_threshold
+
+    def train(self, symbol, buffer):
+        rows = buffer.latest(min(buffer.complete, self.params.train_window + 1))
+        # Target: next close higher than this close; the latest row has no target yet
+        X = rows[:-1]
+        y = (rows[1:, 0] > rows[:-1, 0]).astype(int)
+        X_scaled = self.scalers[symbol].fit_transform(X)
+        self.models[symbol].fit(X_scaled, y)
+        self.last_trained[symbol] = buffer.count
+        self.hits[symbol].clear()
+
     def next(self):
+        ready = []
         for data in self.datas:
             symbol = data._name
-            pos = self.getposition(data).size
-            current_date = data.datetime.datetime(0)
 
-            # Prepare features
-            features = {
-                'close': data.close[0],
-                'open': data.open[0],
-                'high': data.high[0],
-                'low': data.low[0],
-                'volume': data.volume[0],
-                'ema_short': data.ema_short[0],
-                'ema_long': data.ema_long[0],
-                'macd': data.macd.macd[0],
-                'macd_signal': data.macd.signal[0],
-                'rsi': data.rsi[0],
-                'adx': data.adx[0],
-                'stochastic_k': data.stochastic.percK[0],
-                'stochastic_d': data.stochastic.percD[0],
-                'bollinger_mid': data.bollinger.mid[0],
-                'bollinger_upper': data.bollinger.top[0],
-                'bollinger_lower': data.bollinger.bot[0],
-            }
-
-            # Append to feature data
-            self.feature_data[symbol] = self.feature_data[symbol].append(features, ignore_index=True)
+            # Append features in FeatureBuffer's BASE_FEATURES order
+            buffer = self.feature_data[symbol]
+            buffer.append((
+                data.close[0],
+                data.open[0],
+                data.high[0],
+                data.low[0],
+                data.volume[0],
+                data.ema_short[0],
+                data.ema_long[0],
+                data.macd.macd[0],
+                data.macd.signal[0],
+                data.rsi[0],
+                data.adx[0],
+                data.stochastic.percK[0],
+                data.stochastic.percD[0],
+                data.bollinger.mid[0],
+                data.bollinger.top[0],
+                data.bollinger.bot[0],
+            ))
+
+            # Score the previous prediction for drift detection
+            previous = self.last_prediction[symbol]
+            if previous is not None:
+                self.hits[symbol].append(previous == int(data.close[0] > data.close[-1]))
+
+            if self.pretrained:
+                if buffer.complete and symbol in self.model_slots:
+                    ready.append(data)
+                continue
 
             # Ensure enough data points to train
-            if len(self.feature_data[symbol]) > self.min_data_points:
-                df = self.feature_data[symbol].copy()
-
-                # Create lagged features
-                for i in range(1, self.params.lookback + 1):
-                    df[f'close_lag_{i}'] = df['close'].shift(i)
-                    df[f'rsi_lag_{i}'] = df['rsi'].shift(i)
-
-                # Drop rows with NaN values
-                df.dropna(inplace=True)
-
-                # Define target variable
-                df['target'] = (df['close'].shift(-1) > df['close']).astype(int)
-
-                # Avoid look-ahead bias by excluding the last row
-                X = df.drop(['target'], axis=1)[:-1]
-                y = df['target'][:-1]
-
-                # Scale features
-                X_scaled = self.scalers[symbol].fit_transform(X)
-
-                # Train the model using Time Series Split
-                tscv = TimeSeriesSplit(n_splits=5)
-                for train_index, test_index in tscv.split(X_scaled):
-                    X_train, X_test = X_scaled[train_index], X_scaled[test_index]
-                    y_train, y_test = y.iloc[train_index], y.iloc[test_index]
-                    self.models[symbol].fit(X_train, y_train)
-
-                # Make prediction on the latest data point
-                last_features = X.iloc[-1].values.reshape(1, -1)
-                last_features_scaled = self.scalers[symbol].transform(last_features)
-                prediction = self.models[symbol].predict(last_features_scaled)
-
-                # Trading logic
-                if pos == 0 and prediction == 1:
-                    self.buy(data=data)
-                    print(f"Buy order executed for {symbol} on {current_date}")
-                elif pos != 0 and prediction == 0:
-                    self.close(data=data)
-                    print(f"Sell order executed for {symbol} on {current_date}")
+            if buffer.complete <= self.min_data_points:
+                continue
+            if self.needs_training(symbol, buffer):
+                self.train(symbol, buffer)
+
+            # Inference only on the latest data point
+            last_features_scaled = self.scalers[symbol].transform(buffer.latest(1))
+            prediction = self.models[symbol].predict(last_features_scaled)[0]
+            self.trade(data, prediction)
+
+        if ready:
+            predictions = self.predict_batch([data._name for data in ready])
+            for data, prediction in zip(ready, predictions):
+                self.trade(data, prediction)
+
+    def trade(self, data, prediction):
+        symbol = data._name
+        pos = self.getposition(data).size
+        current_date = data.datetime.datetime(0)
+        self.last_prediction[symbol] = prediction
+
+        # Trading logic
+        if pos == 0 and prediction == 1:
+            self.buy(data=data)
+            print(f"Buy order executed for {symbol} on {current_date}")
+        elif pos != 0 and prediction == 0:
+            self.close(data=data)
+            print(f"Sell order executed for {symbol} on {current_date}")
@@ -0,0 +1,86 @@
+# streaming_indicators.py
+# O(1)-state indicators for the live loop, updated once per closed kline. They
+# reproduce pandas_ta's pure-pandas results: ta.ema (SMA-seeded, adjust=False)
+# and ta.rsi (Wilder RMA via ewm(alpha=1/length, adjust=True)).
+import math
+
+
+class StreamingEMA:
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = math.nan
+
+    def update(self, price):
+        self.count += 1
+        if self.count < self.length:
+            self.seed_sum += price
+        elif self.count == self.length:
+            self.value = (self.seed_sum + price) / self.length
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+
+class StreamingRSI:
+    def __init__(self, length=14):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.prev_close = None
+        self.count = 0  # price changes seen
+        # Numerator/denominator of the adjusted exponential averages
+        self.gain_num = self.loss_num = self.weight = 0.0
+        self.value = math.nan
+
+    def update(self, price):
+        if self.prev_close is not None:
+            change = price - self.prev_close
+            self.gain_num = max(change, 0.0) + self.decay * self.gain_num
+            self.loss_num = max(-change, 0.0) + self.decay * self.loss_num
+            self.weight = 1.0 + self.decay * self.weight
+            self.count += 1
+            if self.count >= self.length:
+                gain = self.gain_num / self.weight
+                loss = self.loss_num / self.weight
+                self.value = 100.0 * gain / (gain + loss) if gain + loss else math.nan
+        self.prev_close = price
+        return self.value
+
+
+class LiveSignalEngine:
+    # Incremental equivalent of main.apply_technicals + main.generate_signals:
+    # keeps the latest Signal and its change (the Position column) per closed kline
+
+    def __init__(self, short_window, long_window, rsi_length=14):
+        self.ema_short = StreamingEMA(short_window)
+        self.ema_long = StreamingEMA(long_window)
+        self.rsi = StreamingRSI(rsi_length)
+        self.signal = 0
+        self.position = math.nan
+        self.last_close = None
+        self.last_open_time = None
+        self.bars = 0
+
+    def seed(self, closes, open_times=None):
+        for i, close in enumerate(closes):
+            self.update(close, open_times[i] if open_times is not None else None)
+
+    def update(self, close, open_time=None):
+        ema_short = self.ema_short.update(close)
+        ema_long = self.ema_long.update(close)
+        rsi = self.rsi.update(close)
+        signal = 0
+        if ema_short > ema_long and rsi < 30:
+            signal = 1
+        elif ema_short < ema_long and rsi > 70:
+            signal = -1
+        if self.bars:
+            self.position = signal - self.signal
+        self.signal = signal
+        self.last_close = close
+        self.bars += 1
+        if open_time is not None:
+            self.last_open_time = open_time
+        return self.signal, self.position
@@ -0,0 +1,36 @@
+# tests/conftest.py
+# The modules are flat at the repository root; put it on the path for pytest
+import bisect
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class KlineClient:
+    # In-process stand-in for Client.get_klines over raw kline rows (paged like
+    # Binance, which serves at most page_cap rows); every request's (symbol,
+    # startTime, endTime) is recorded
+
+    def __init__(self, klines_by_symbol, page_cap=1000):
+        self.klines = klines_by_symbol
+        self.page_cap = page_cap
+        self.open_times = {symbol: [k[0] for k in rows] for symbol, rows in klines_by_symbol.items()}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get_klines(self, symbol, interval, limit=500, startTime=0, endTime=2 ** 62):
+        with self.lock:
+            self.requests.append((symbol, startTime, endTime))
+        times = self.open_times[symbol]
+        lo = bisect.bisect_left(times, startTime)
+        hi = min(bisect.bisect_right(times, endTime), lo + min(limit, self.page_cap))
+        return self.klines[symbol][lo:hi]
+
+
+@pytest.fixture
+def kline_client():
+    return KlineClient
@@ -0,0 +1,27 @@
+# tests/test_account_cache.py
+from account_cache import ENDPOINT_WEIGHTS, CountingClient
+from metrics import Registry
+
+
+class FakeClient:
+    def get_klines(self, **kwargs):
+        return []
+
+    def create_order(self, **kwargs):
+        return {}
+
+
+def test_weight_is_counted_per_endpoint():
+    registry = Registry()
+    client = CountingClient(FakeClient(), registry=registry)
+    for _ in range(3):
+        client.get_klines(symbol="BTCUSDT")
+    client.create_order(symbol="BTCUSDT")
+
+    expected = {"get_klines": 3 * ENDPOINT_WEIGHTS["get_klines"], "create_order": ENDPOINT_WEIGHTS["create_order"]}
+    assert client.endpoint_weight == expected
+    assert client.total_weight == sum(expected.values())
+    assert client.start_cycle() == (4, sum(expected.values()))
+    for endpoint, weight in expected.items():
+        assert registry.counters[("rest_request_weight_total", (("endpoint", endpoint),))] == weight
+    assert 'rest_request_weight_total{endpoint="get_klines"} 6' in registry.render()
@@ -0,0 +1,20 @@
+# tests/test_benchmark_history.py
+from benchmarks.run import previous_results
+
+SMALL = {"bars": 2000, "symbols": 2, "interval": "15m"}
+LARGE = {"bars": 20000, "symbols": 5, "interval": "15m"}
+
+
+def entry(params, **results):
+    return {"params": params, "results": {name: {"seconds": [value, "s"]} for name, value in results.items()}}
+
+
+def test_previous_results_only_compare_matching_params():
+    history = [
+        entry(LARGE, backtest=10.0, download=4.0),
+        entry(LARGE, backtest=9.0),  # an --only run
+        entry(SMALL, backtest=1.0, download=0.5),
+    ]
+    assert previous_results(history, LARGE) == {"backtest": {"seconds": [9.0, "s"]}, "download": {"seconds": [4.0, "s"]}}
+    assert previous_results(history, SMALL)["backtest"] == {"seconds": [1.0, "s"]}
+    assert previous_results(history, dict(SMALL, interval="1h")) == {}
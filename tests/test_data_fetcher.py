@@ -0,0 +1,42 @@
+# tests/test_data_fetcher.py
+import numpy as np
+import pytest
+
+import data_fetcher
+from benchmarks.synthetic import DEFAULT_START_TS, generate_klines
+
+BAR = 15 * 60_000
+T0 = DEFAULT_START_TS
+SYMBOLS = ["AAAUSDT", "BBBUSDT"]
+
+
+@pytest.fixture
+def client(monkeypatch, kline_client):
+    client = kline_client({symbol: generate_klines(symbol, 400, "15m") for symbol in SYMBOLS})
+    monkeypatch.setattr(data_fetcher, "client", client)
+    return client
+
+
+def fetch(tmp_path, start, end):
+    return data_fetcher.get_historical_data(
+        SYMBOLS, "15m", T0 + start * BAR, T0 + end * BAR, cache_dir=str(tmp_path), base_interval=None
+    )
+
+
+def test_only_uncovered_ranges_are_downloaded(tmp_path, client):
+    first = fetch(tmp_path, 0, 99)
+    assert {symbol for symbol, _, _ in client.requests} == set(SYMBOLS)
+    assert all(start == T0 for _, start, _ in client.requests)
+
+    client.requests.clear()
+    second = fetch(tmp_path, 50, 199)
+    # Only the part after the first range hits the network
+    assert sorted(client.requests) == [(symbol, T0 + 99 * BAR + 1, T0 + 199 * BAR) for symbol in SYMBOLS]
+    for symbol in SYMBOLS:
+        expected = np.array([float(k[4]) for k in client.klines[symbol][50:200]])
+        np.testing.assert_array_equal(second[symbol]["Close"].to_numpy(), expected)
+        assert first[symbol].index[-1] == second[symbol].index[49]
+
+    client.requests.clear()
+    fetch(tmp_path, 10, 150)
+    assert client.requests == []
@@ -0,0 +1,50 @@
+# tests/test_downloader.py
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import DEFAULT_START_TS, generate_klines
+from downloader import KlineDownloader, WeightRateLimiter
+from kline_store import kline_dtype, rows_to_records
+
+BAR = 15 * 60_000
+T0 = DEFAULT_START_TS
+SYMBOLS = ["AAAUSDT", "BBBUSDT", "CCCUSDT"]
+
+
+def test_split_covers_the_range_in_page_sized_chunks():
+    downloader = KlineDownloader(None, page_limit=100)
+    chunks = downloader.split("15m", T0, T0 + 250 * BAR)
+    assert chunks == [(T0, T0 + 100 * BAR - 1), (T0 + 100 * BAR, T0 + 200 * BAR - 1), (T0 + 200 * BAR, T0 + 250 * BAR)]
+
+
+def test_concurrent_download_stitches_every_range_in_order(kline_client):
+    # The server caps pages below the requested limit, so chunks take several requests
+    client = kline_client({symbol: generate_klines(symbol, 1000, "15m") for symbol in SYMBOLS}, page_cap=70)
+    downloader = KlineDownloader(client, max_workers=4, page_limit=200)
+    ranges = {symbol: (symbol, "15m", T0 + 10 * BAR, T0 + 909 * BAR) for symbol in SYMBOLS}
+    results = downloader.download(ranges)
+    for symbol in SYMBOLS:
+        assert results[symbol] == client.klines[symbol][10:910]
+    assert downloader.pages == len(client.requests)
+
+
+def test_rate_limiter_waits_for_refill():
+    limiter = WeightRateLimiter(max_weight_per_minute=600, safety=1.0)  # 10 weight per second
+    started = time.monotonic()
+    limiter.acquire(600)
+    assert time.monotonic() - started < 0.05
+    limiter.acquire(3)
+    assert time.monotonic() - started >= 0.25
+    assert limiter.used == 603
+
+
+def test_pages_are_parsed_into_typed_records(kline_client):
+    client = kline_client({symbol: generate_klines(symbol, 500, "15m") for symbol in SYMBOLS}, page_cap=70)
+    dtype = kline_dtype("f4", extras=True)
+    downloader = KlineDownloader(client, page_limit=200, dtype=dtype)
+    results = downloader.download({symbol: (symbol, "15m", T0, T0 + 499 * BAR) for symbol in SYMBOLS})
+    for symbol in SYMBOLS:
+        assert results[symbol].dtype == dtype
+        np.testing.assert_array_equal(results[symbol], rows_to_records(client.klines[symbol], dtype))
+    assert downloader.rows == 3 * 500
@@ -0,0 +1,108 @@
+# tests/test_kline_store.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import DEFAULT_START_TS, generate_klines
+from kline_store import KlineStore, dtype_suffix, kline_dtype, merge_ranges, records_to_frame, rows_to_records
+
+MINUTE = 60_000
+T0 = DEFAULT_START_TS
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineStore(str(tmp_path))
+
+
+def records(count, start=0, seed=0):
+    # `count` 1m records opening `start` minutes after T0
+    return rows_to_records(generate_klines("BTCUSDT", count, "1m", start_ts=T0 + start * MINUTE, seed=seed))
+
+
+def test_merge_ranges_joins_overlapping_and_touching():
+    assert merge_ranges([[10, 19], [0, 4], [5, 9], [30, 40], [35, 50]]) == [[0, 19], [30, 50]]
+
+
+def test_missing_without_coverage_is_the_whole_range(store):
+    assert store.missing("BTCUSDT", "1m", T0, T0 + 10 * MINUTE - 1) == [[T0, T0 + 10 * MINUTE - 1]]
+
+
+def test_missing_returns_only_the_gaps(store):
+    store.write("BTCUSDT", "1m", records(10), [[T0, T0 + 10 * MINUTE - 1]])
+    store.write("BTCUSDT", "1m", records(10, start=20), [[T0 + 20 * MINUTE, T0 + 30 * MINUTE - 1]])
+    assert store.coverage("BTCUSDT", "1m") == [[T0, T0 + 10 * MINUTE - 1], [T0 + 20 * MINUTE, T0 + 30 * MINUTE - 1]]
+    assert store.missing("BTCUSDT", "1m", T0, T0 + 40 * MINUTE - 1) == [
+        [T0 + 10 * MINUTE, T0 + 20 * MINUTE - 1],
+        [T0 + 30 * MINUTE, T0 + 40 * MINUTE - 1],
+    ]
+    assert store.missing("BTCUSDT", "1m", T0 + 2 * MINUTE, T0 + 8 * MINUTE) == []
+
+
+def test_missing_skips_gaps_without_a_candle_open(store):
+    # Coverage ends mid-candle; the uncovered milliseconds before the next open hold no candle
+    store.write("BTCUSDT", "1m", records(10), [[T0, T0 + 9 * MINUTE + 1]])
+    assert store.missing("BTCUSDT", "1m", T0, T0 + 10 * MINUTE - 1) == []
+    assert store.missing("BTCUSDT", "1m", T0, T0 + 10 * MINUTE) == [[T0 + 9 * MINUTE + 2, T0 + 10 * MINUTE]]
+
+
+def test_write_merges_and_newer_rows_win(store):
+    store.write("BTCUSDT", "1m", records(10), [[T0, T0 + 10 * MINUTE - 1]])
+    newer = records(10, start=5, seed=1)
+    store.write("BTCUSDT", "1m", newer, [[T0 + 5 * MINUTE, T0 + 15 * MINUTE - 1]])
+    stored = store.read("BTCUSDT", "1m", T0, T0 + 15 * MINUTE - 1)
+    np.testing.assert_array_equal(stored["open_time"], T0 + np.arange(15) * MINUTE)
+    np.testing.assert_array_equal(stored[:5], records(10)[:5])
+    np.testing.assert_array_equal(stored[5:], newer)
+    assert store.coverage("BTCUSDT", "1m") == [[T0, T0 + 15 * MINUTE - 1]]
+
+
+def test_view_is_an_inclusive_slice(store):
+    store.write("BTCUSDT", "1m", records(10), [[T0, T0 + 10 * MINUTE - 1]])
+    view = store.view("BTCUSDT", "1m", T0 + 2 * MINUTE, T0 + 4 * MINUTE)
+    assert isinstance(view, np.memmap)
+    np.testing.assert_array_equal(view["open_time"], T0 + np.arange(2, 5) * MINUTE)
+
+
+def test_rows_to_records_parses_every_field():
+    rows = generate_klines("BTCUSDT", 50, "1m")
+    parsed = rows_to_records(rows, kline_dtype("f8", extras=True))
+    assert parsed["open_time"].tolist() == [k[0] for k in rows]
+    for field, column in (("open", 1), ("close", 4), ("volume", 5), ("quote_volume", 7), ("taker_quote_volume", 10)):
+        np.testing.assert_array_equal(parsed[field], [float(k[column]) for k in rows])
+    assert parsed["trades"].tolist() == [k[8] for k in rows]
+
+
+def test_float32_records_give_a_float32_frame():
+    dtype = kline_dtype("f4")
+    assert dtype_suffix(dtype) == "_f4" and dtype_suffix(kline_dtype("f4", extras=True)) == "_f4x"
+    frame = records_to_frame(rows_to_records(generate_klines("BTCUSDT", 10, "1m"), dtype))
+    assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert (frame.dtypes == np.float32).all()
+    assert frame.index[1] - frame.index[0] == pd.Timedelta(minutes=1)
+
+
+def test_each_record_layout_has_its_own_files(tmp_path):
+    default, compact = KlineStore(str(tmp_path)), KlineStore(str(tmp_path), kline_dtype("f4"))
+    default.write("BTCUSDT", "1m", records(10), [[T0, T0 + 10 * MINUTE - 1]])
+    assert compact.coverage("BTCUSDT", "1m") == []
+    assert len(compact.load("BTCUSDT", "1m")) == 0
+
+
+def test_append_in_place_keeps_earlier_rows(store):
+    first, second = records(50), records(30, start=50, seed=1)
+    store.write("BTCUSDT", "1m", first, [[T0, T0 + 50 * MINUTE - 1]])
+    assert store._append("BTCUSDT", "1m", second)
+    np.testing.assert_array_equal(store.load("BTCUSDT", "1m"), np.concatenate([first, second]))
+    np.testing.assert_array_equal(np.load(store._path("BTCUSDT", "1m", "npy")), np.concatenate([first, second]))
+
+
+def test_append_rejects_overlaps_and_write_merges_them(store):
+    first = records(50)
+    store.write("BTCUSDT", "1m", first, [[T0, T0 + 50 * MINUTE - 1]])
+    overlap = records(20, start=40, seed=1)
+    assert not store._append("BTCUSDT", "1m", overlap)
+    assert not store._append("BTCUSDT", "1m", overlap[::-1])
+    np.testing.assert_array_equal(store.load("BTCUSDT", "1m"), first)  # rejected appends leave the file alone
+    store.write("BTCUSDT", "1m", overlap, [[T0 + 40 * MINUTE, T0 + 60 * MINUTE - 1]])
+    np.testing.assert_array_equal(store.load("BTCUSDT", "1m"), np.concatenate([first[:40], overlap]))
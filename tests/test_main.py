@@ -0,0 +1,16 @@
+# tests/test_main.py
+import types
+
+import main
+from streaming_indicators import LiveSignalEngine
+
+NOW = 1_700_000_000.0
+
+
+def test_next_start_ts_falls_back_to_lookback(monkeypatch):
+    monkeypatch.setattr(main, "clock", types.SimpleNamespace(time=lambda: NOW))
+    monkeypatch.setattr(main, "interval", "1m")
+    engine = LiveSignalEngine(5, 20)  # seeding returned no klines
+    assert main.next_start_ts(engine) == int(NOW * 1000) - main.lookback * 60_000
+    engine.update(100.0, 1_699_999_940_000)
+    assert main.next_start_ts(engine) == 1_700_000_000_000
@@ -0,0 +1,57 @@
+# tests/test_ml_pipeline.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_frames
+from ml_pipeline import LATEST_FILE, load_models, save_models, train_models, training_rows
+
+SYMBOLS = ["AAAUSDT", "BBBUSDT"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    return generate_frames(SYMBOLS, 400, "15m")
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["per_symbol", "shared"])
+def trained(request, data):
+    return train_models(data, lookback=3, n_estimators=5, shared=request.param, n_jobs=1)
+
+
+def predictions(artifact, data):
+    out = {}
+    for symbol, df in data.items():
+        X, _ = training_rows(df, 3)
+        model = artifact["shared"] if "shared" in artifact else artifact["models"][symbol]
+        out[symbol] = model.predict_proba(artifact["scalers"][symbol].transform(X))
+    return out
+
+
+def test_training_rows_are_complete_with_next_bar_targets(data):
+    df = data[SYMBOLS[0]]
+    X, y = training_rows(df, 3)
+    assert not np.isnan(X).any()
+    # The first feature is the close; find each row's bar to check its target
+    close = df["Close"].to_numpy()
+    bars = [int(np.flatnonzero(close == row_close)[0]) for row_close in X[:, 0]]
+    assert bars == list(range(bars[0], bars[0] + len(bars)))
+    assert y.tolist() == [int(close[i + 1] > close[i]) for i in bars]
+
+
+def test_save_and_load_round_trip(tmp_path, data, trained):
+    artifact, manifest = trained
+    first = save_models(artifact, manifest, str(tmp_path))
+    second = save_models(artifact, manifest, str(tmp_path))
+    assert first != second  # same second and data: a suffixed version, not an overwrite
+    assert (tmp_path / LATEST_FILE).read_text() == second
+
+    loaded, loaded_manifest = load_models(str(tmp_path))
+    assert loaded_manifest["version"] == second
+    assert loaded_manifest["features"] == manifest["features"]
+    assert load_models(str(tmp_path), version=first)[1]["version"] == first
+    for model in [loaded.get("shared")] + list(loaded.get("models", {}).values()):
+        if model is not None:
+            assert model.n_jobs == 1
+    expected, actual = predictions(artifact, data), predictions(loaded, data)
+    for symbol in SYMBOLS:
+        np.testing.assert_array_equal(actual[symbol], expected[symbol])
@@ -0,0 +1,42 @@
+# tests/test_mmap_feed.py
+# Backtrader on memory-mapped kline records against the same bars as DataFrames
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import run_backtrader
+from benchmarks.synthetic import DEFAULT_START_TS, generate_klines
+from kline_store import KlineStore, records_to_frame, rows_to_records
+
+SYMBOLS = ["AAAUSDT", "BBBUSDT"]
+BARS = 2000
+BLOCK_SIZE = 300  # bars are copied out of the mapping in several blocks
+
+
+def test_memmap_feed_matches_pandas_feed(tmp_path, monkeypatch):
+    from mmap_feed import MemmapData
+
+    make_feed = backtest.make_feed
+    monkeypatch.setattr(backtest, "make_feed", lambda symbol, data: (
+        make_feed(symbol, data) if isinstance(data, pd.DataFrame)
+        else MemmapData(records=data, name=symbol, block_size=BLOCK_SIZE)
+    ))
+    store = KlineStore(str(tmp_path))
+    end_ts = DEFAULT_START_TS + BARS * 15 * 60_000 - 1
+    for symbol in SYMBOLS:
+        store.write(symbol, "15m", rows_to_records(generate_klines(symbol, BARS, "15m")), [[DEFAULT_START_TS, end_ts]])
+    views = {symbol: store.view(symbol, "15m", DEFAULT_START_TS, end_ts) for symbol in SYMBOLS}
+    frames = {symbol: records_to_frame(records) for symbol, records in views.items()}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        streamed = run_backtrader(views, preload=False, exactbars=1)
+        preloaded = run_backtrader(frames)
+
+    assert streamed["final_value"] == pytest.approx(preloaded["final_value"], rel=1e-12)
+    assert streamed["max_drawdown"] == pytest.approx(preloaded["max_drawdown"], rel=1e-12)
+    assert streamed["trades"] == preloaded["trades"]
+    assert streamed["trades"][SYMBOLS[0]]["total_trades"] > 0
+    pd.testing.assert_series_equal(streamed["equity"], preloaded["equity"], check_freq=False)
@@ -0,0 +1,110 @@
+# tests/test_paper_exchange.py
+import numpy as np
+import pytest
+
+import main
+
+from benchmarks.synthetic import DEFAULT_START_TS
+from kline_store import KLINE_DTYPE
+from paper_exchange import FeeModel, PaperExchange, run_paper
+
+MINUTE = 60_000
+T0 = DEFAULT_START_TS
+
+
+class ManualClock:
+    # Moves only when the test says so
+    def __init__(self, now_ms):
+        self.now = now_ms
+
+    def now_ms(self):
+        return self.now
+
+    def time(self):
+        return self.now / 1000.0
+
+    def sleep(self, seconds):
+        self.now += int(seconds * 1000)
+
+
+def candles(*ohlc):
+    records = np.zeros(len(ohlc), dtype=KLINE_DTYPE)
+    records["open_time"] = T0 + np.arange(len(ohlc)) * MINUTE
+    for field, values in zip(("open", "high", "low", "close"), np.array(ohlc).T):
+        records[field] = values
+    records["volume"] = 1.0
+    return records
+
+
+@pytest.fixture
+def paper():
+    # A flat first minute to trade in, then BTC rallies through 102 and ETH
+    # drops through 98; up candles dip first, down candles rally first
+    klines = {
+        "BTCUSDT": candles((100, 100, 100, 100), (100, 103, 99, 102)),
+        "ETHUSDT": candles((100, 100, 100, 100), (100, 101, 97.5, 97.8)),
+    }
+    return PaperExchange(klines, balances={"USDT": 1000.0}, clock=ManualClock(T0 + 1),
+                         fees=FeeModel(maker=0.001, taker=0.002))
+
+
+def balance(paper, asset):
+    free, locked = paper.balances.get(asset, [0.0, 0.0])
+    return pytest.approx(free), pytest.approx(locked)
+
+
+def buy_with_oco(paper, symbol):
+    # As main.execute_trade: market buy, then a sell OCO at +2% / -2% (limit 1% under the stop)
+    order = paper.create_order(symbol=symbol, side="BUY", type="MARKET", quantity="2")
+    assert order["status"] == "FILLED" and float(order["fills"][0]["price"]) == 100.0
+    oco = paper.create_oco_order(symbol=symbol, side="SELL", quantity="2", price="102", stopPrice="98",
+                                 stopLimitPrice="97.02")
+    stop_leg, limit_leg = (order["orderId"] for order in oco["orders"])
+    assert balance(paper, symbol[:3]) == (0.0, 2.0)
+    return stop_leg, limit_leg
+
+
+def test_take_profit_leg_fills_and_releases_the_lock(paper):
+    stop_leg, limit_leg = buy_with_oco(paper, "BTCUSDT")
+    paper.clock.sleep(120)  # through the whole second candle
+    assert paper.get_order("BTCUSDT", limit_leg)["status"] == "FILLED"
+    assert paper.get_order("BTCUSDT", stop_leg)["status"] == "EXPIRED"
+    assert paper.get_open_orders("BTCUSDT") == []
+    assert balance(paper, "BTC") == (0.0, 0.0)
+    # Taker fee on the market buy, maker fee on the take-profit at its limit price
+    assert balance(paper, "USDT") == (1000.0 - 200 * 1.002 + 204 * 0.999, 0.0)
+    assert [(fill["reason"], fill["price"]) for fill in paper.trades] == [("market", 100.0), ("take_profit", 102.0)]
+
+
+def test_stop_leg_fills_and_releases_the_lock(paper):
+    stop_leg, limit_leg = buy_with_oco(paper, "ETHUSDT")
+    paper.clock.sleep(80)  # past the rally to 101, which triggers nothing
+    assert paper.get_order("ETHUSDT", stop_leg)["status"] == "NEW"
+    assert balance(paper, "ETH") == (0.0, 2.0)
+    paper.clock.sleep(40)
+    assert paper.get_order("ETHUSDT", stop_leg)["status"] == "FILLED"
+    assert paper.get_order("ETHUSDT", limit_leg)["status"] == "EXPIRED"
+    assert balance(paper, "ETH") == (0.0, 0.0)
+    # The stop fills where it triggered, above its limit, as a taker
+    assert balance(paper, "USDT") == (1000.0 - 200 * 1.002 + 195 * 0.998, 0.0)
+    assert [(fill["reason"], fill["price"]) for fill in paper.trades] == [("market", 100.0), ("stop_loss", 97.5)]
+
+
+def test_locked_funds_cannot_be_sold_twice(paper):
+    buy_with_oco(paper, "BTCUSDT")
+    with pytest.raises(Exception) as error:
+        paper.create_order(symbol="BTCUSDT", side="SELL", type="MARKET", quantity="2")
+    assert error.value.code == -2010
+
+
+@pytest.mark.parametrize("poll_seconds, cycles", [(60, 10), (30, 20), (45, 14)])
+def test_paper_polls_cover_the_replay_at_the_loop_period(monkeypatch, poll_seconds, cycles):
+    for name in ("client", "state", "clock", "symbols", "interval", "metrics_path", "lookback"):
+        monkeypatch.setattr(main, name, getattr(main, name))
+    monkeypatch.setattr(main, "lookback", 5)
+    monkeypatch.setattr(main, "poll_seconds", poll_seconds)
+    polls = []
+    monkeypatch.setattr(main, "main", lambda cycles=None: polls.append(cycles))
+    # 15 candles; the clock starts at the 6th, so 10 minutes are left to poll
+    run_paper({"BTCUSDT": candles(*[(100, 100, 100, 100)] * 15)}, poll=True)
+    assert polls == [cycles]
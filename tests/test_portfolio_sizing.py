@@ -0,0 +1,29 @@
+# tests/test_portfolio_sizing.py
+import pytest
+
+from portfolio_sizing import PortfolioSizer
+
+SYMBOLS = ["WINUSDT", "LOSEUSDT", "MIXUSDT", "NEWUSDT"]
+
+
+@pytest.fixture
+def sizer():
+    sizer = PortfolioSizer(SYMBOLS, kelly_multiplier=0.5, min_trades=4, default_fraction=0.3)
+    for _ in range(4):
+        sizer.record_trade("WINUSDT", 10.0)
+        sizer.record_trade("LOSEUSDT", -10.0)
+    for pnl in (20.0, 20.0, -10.0, -10.0):
+        sizer.record_trade("MIXUSDT", pnl)
+    return sizer
+
+
+def test_kelly_all_wins_and_all_losses(sizer):
+    kelly = dict(zip(SYMBOLS, sizer.kelly()))
+    # All wins: win_prob 1 with an unbounded win/loss ratio, times the multiplier
+    assert kelly["WINUSDT"] == pytest.approx(0.5)
+    assert kelly["LOSEUSDT"] == 0.0
+    # p = 0.5, ratio 2: 0.5 - 0.5 / 2 = 0.25, halved
+    assert kelly["MIXUSDT"] == pytest.approx(0.125)
+    # Too few trades: the default fraction
+    assert kelly["NEWUSDT"] == pytest.approx(0.3)
+
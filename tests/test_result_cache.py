@@ -0,0 +1,67 @@
+# tests/test_result_cache.py
+import importlib
+import os
+import sys
+
+import pytest
+
+from backtest import run_cached
+from benchmarks.synthetic import generate_frames
+from result_cache import ResultCache
+
+STRATEGY_SOURCE = '''
+from strategies import AdvancedStrategy
+
+
+class CachedStrategy(AdvancedStrategy):
+    pass
+'''
+
+
+@pytest.fixture
+def data():
+    return generate_frames(["AAAUSDT", "BBBUSDT"], 1500, "15m")
+
+
+def test_same_inputs_hit_and_changed_inputs_miss(tmp_path, data):
+    cache = ResultCache(str(tmp_path))
+    first = run_cached("vector", data, cache=cache)
+    second = run_cached("vector", data, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second["final_value"] == first["final_value"]
+
+    run_cached("vector", data, commission=0.002, cache=cache)
+    run_cached("vector", generate_frames(["AAAUSDT", "BBBUSDT"], 1500, "15m", seed=1), cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_strategy_code_change_is_a_miss(tmp_path, monkeypatch):
+    # The vector engine only runs AdvancedStrategy itself, so this uses backtrader
+    data = generate_frames(["AAAUSDT"], 300, "15m")
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "cached_strategy", raising=False)
+    module_path = tmp_path / "cached_strategy.py"
+    module_path.write_text(STRATEGY_SOURCE)
+    module = importlib.import_module("cached_strategy")
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    run_cached("backtrader", data, strategy=module.CachedStrategy, cache=cache)
+    run_cached("backtrader", data, strategy=module.CachedStrategy, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    module_path.write_text(STRATEGY_SOURCE + "\n    def stop(self):\n        pass\n")
+    module = importlib.reload(module)
+    run_cached("backtrader", data, strategy=module.CachedStrategy, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, b"x" * 1000)
+        os.utime(cache._path(key), (1_000_000 + i, 1_000_000 + i))
+    assert cache.get("a") is not None  # now the most recently used
+    cache.max_bytes = 2 * os.path.getsize(cache._path("a"))
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a.pkl", "c.pkl"]
@@ -0,0 +1,32 @@
+# tests/test_robustness.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_frames
+from robustness import analyze
+from vector_backtest import run_vector_backtest
+
+
+@pytest.fixture(scope="module")
+def result():
+    return run_vector_backtest(generate_frames(["AAAUSDT", "BBBUSDT"], 8000, "15m"), commission=0.001)
+
+
+def costs_sharpe(result, commission):
+    # One costs resample at a fixed commission and no slippage
+    report = analyze(result, resamples=1, slippage=(0.0, 0.0), commission_range=(commission, commission), processes=1)
+    return report.loc[("costs", "sharpe"), "median"]
+
+
+def test_costs_sharpe_does_not_rise_with_commission(result):
+    sharpes = [costs_sharpe(result, commission) for commission in np.linspace(0.0, 0.02, 21)]
+    solvent = [sharpe for sharpe in sharpes if np.isfinite(sharpe)]
+    assert len(solvent) >= 2
+    assert all(later <= earlier + 1e-9 for earlier, later in zip(solvent, solvent[1:]))
+    # Ruin is undefined, never a Sharpe again at a higher commission
+    assert all(np.isnan(sharpes[i:]).all() for i, sharpe in enumerate(sharpes) if np.isnan(sharpe))
+
+
+def test_costs_sharpe_matches_observed_at_the_run_commission(result):
+    observed = analyze(result, resamples=1, processes=1).loc[("costs", "sharpe"), "observed"]
+    assert costs_sharpe(result, 0.001) == pytest.approx(observed)
@@ -0,0 +1,55 @@
+# tests/test_streaming_indicators.py
+# Streaming EMA/RSI, fed one close at a time, against pandas_ta. Without
+# pandas_ta the reference is the same computation in plain pandas.
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_indicators import StreamingEMA, StreamingRSI
+
+try:
+    import pandas_ta as ta
+except ImportError:
+    ta = None
+
+
+def reference_ema(close, length):
+    if ta is not None:
+        return ta.ema(close, length=length)
+    # SMA of the first `length` closes, then ewm(span=length, adjust=False)
+    seeded = close.copy()
+    seeded.iloc[:length - 1] = np.nan
+    seeded.iloc[length - 1] = close.iloc[:length].mean()
+    return seeded.ewm(span=length, adjust=False).mean()
+
+
+def reference_rsi(close, length):
+    if ta is not None:
+        return ta.rsi(close, length=length)
+    # Wilder's RMA: ewm(alpha=1/length) with `length` changes before the first value
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1.0 / length, min_periods=length).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1.0 / length, min_periods=length).mean()
+    return 100.0 * gain / (gain + loss)
+
+
+@pytest.fixture(scope="module")
+def close():
+    rng = np.random.default_rng(0)
+    return pd.Series(100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, 2000))))
+
+
+def stream(indicator, close):
+    return np.array([indicator.update(price) for price in close])
+
+
+@pytest.mark.parametrize("length", [5, 20, 50])
+def test_ema_matches_pandas_ta(close, length):
+    expected = reference_ema(close, length).to_numpy()
+    np.testing.assert_allclose(stream(StreamingEMA(length), close), expected, rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("length", [2, 14, 30])
+def test_rsi_matches_pandas_ta(close, length):
+    expected = reference_rsi(close, length).to_numpy()
+    np.testing.assert_allclose(stream(StreamingRSI(length), close), expected, rtol=1e-9, equal_nan=True)
@@ -0,0 +1,110 @@
+# tests/test_tick_replay.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import DEFAULT_START_TS, generate_agg_trades
+from tick_replay import BarResampler, _TickBroker, resample_store, run_tick_backtest
+from tick_store import TRADE_DTYPE, TickStore
+
+MINUTE = 60_000
+T0 = DEFAULT_START_TS
+
+
+def ticks(times, prices):
+    records = np.zeros(len(times), dtype=TRADE_DTYPE)
+    records["agg_id"] = np.arange(len(times))
+    records["time"] = times
+    records["price"] = prices
+    records["qty"] = 1.0
+    return records
+
+
+@pytest.fixture(scope="module")
+def trades():
+    return generate_agg_trades("BTCUSDT", 20_000)
+
+
+def test_chunked_resampling_matches_pandas(trades):
+    frame = pd.DataFrame({"price": trades["price"], "qty": trades["qty"]},
+                         index=pd.to_datetime(trades["time"], unit="ms"))
+    expected = frame["price"].resample("1min").ohlc().join(frame["qty"].resample("1min").sum()).dropna()
+    resampler = BarResampler("1m")
+    # Uneven chunks, so chunk boundaries fall inside bars
+    bounds = [0, 1, 777, 5000, 5001, 13_333, len(trades)]
+    bars = np.concatenate([resampler.update(trades[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+                          + [resampler.flush()])
+    np.testing.assert_array_equal(pd.to_datetime(bars["open_time"], unit="ms"), expected.index)
+    for field, column in (("open", "open"), ("high", "high"), ("low", "low"), ("close", "close")):
+        np.testing.assert_array_equal(bars[field], expected[column].to_numpy())
+    np.testing.assert_allclose(bars["volume"], expected["qty"].to_numpy())
+
+
+def test_bucket_boundary_is_open_time_plus_interval():
+    resampler = BarResampler("1m")
+    completed = resampler.update(ticks([T0, T0 + MINUTE - 1, T0 + MINUTE], [1.0, 2.0, 3.0]))
+    assert completed["open_time"].tolist() == [T0]
+    assert completed["close"].tolist() == [2.0]  # the trade 1 ms before the boundary closes the bar
+    last = resampler.flush()
+    assert last["open_time"].tolist() == [T0 + MINUTE] and last["open"].tolist() == [3.0]
+    # Minutes without trades produce no bar
+    assert BarResampler("1m").update(ticks([T0, T0 + 3 * MINUTE, T0 + 3 * MINUTE + 1], [1.0, 2.0, 2.0]))[
+        "open_time"].tolist() == [T0]
+
+
+def broker_after_entry(take_profit=None, stop_loss=None, atr_stop=90.0):
+    # A filled 1-unit long entered at 100 with no commission
+    broker = _TickBroker(10_000.0, 0.0, take_profit, stop_loss)
+    broker.pending = ("buy", 1.0, atr_stop)
+    broker.on_ticks(np.array([T0]), np.array([100.0]))
+    assert broker.size == 1.0
+    return broker
+
+
+def test_market_order_fills_at_the_next_trade():
+    broker = _TickBroker(10_000.0, 0.001, None, None)
+    broker.pending = ("buy", 2.0, 90.0)
+    broker.on_ticks(np.array([T0, T0 + 1]), np.array([101.0, 50.0]))
+    # Filled at 101, then stopped at the 50 trade (through the 90 stop)
+    assert broker.trades[0][2:4] == (101.0, 50.0)
+    assert broker.trades[0][6] == "stop"
+    assert broker.balance == pytest.approx(10_000.0 - 2 * 101.0 * 1.001 + 2 * 50.0 * 0.999)
+
+
+def test_stop_fills_at_the_trade_that_gaps_through_it():
+    broker = broker_after_entry(atr_stop=95.0)
+    broker.on_ticks(np.array([T0 + 1, T0 + 2, T0 + 3]), np.array([96.0, 93.0, 80.0]))
+    assert broker.trades[-1][1] == T0 + 2 and broker.trades[-1][3] == 93.0 and broker.trades[-1][6] == "stop"
+
+
+def test_take_profit_fills_at_its_limit_price():
+    broker = broker_after_entry(take_profit=0.02, stop_loss=0.02)
+    assert (broker.stop, broker.limit) == pytest.approx((98.0, 102.0))
+    broker.on_ticks(np.array([T0 + 1, T0 + 2]), np.array([101.9, 105.0]))
+    assert broker.trades[-1][1] == T0 + 2 and broker.trades[-1][3] == pytest.approx(102.0)
+    assert broker.trades[-1][6] == "take_profit" and broker.size == 0.0
+    broker.on_ticks(np.array([T0 + 3]), np.array([50.0]))  # flat: nothing more happens
+    assert len(broker.trades) == 1
+
+
+def test_tick_backtest_runs_from_the_store(tmp_path, trades):
+    store = TickStore(str(tmp_path))
+    store.append("BTCUSDT", trades)
+    result = run_tick_backtest(store, "BTCUSDT", "1m", chunk_size=3000)
+    assert result["ticks"] == len(trades)
+    assert result["bars"] == len(resample_store(store, "BTCUSDT", "1m"))
+    assert result["final_value"] == pytest.approx(run_tick_backtest(store, "BTCUSDT", "1m")["final_value"])
+
+
+def test_tick_store_appends_only_new_ids_and_drops_uncommitted_bytes(tmp_path, trades):
+    store = TickStore(str(tmp_path))
+    assert store.append("BTCUSDT", trades[:1000]) == 1000
+    # An interrupted write leaves bytes past the committed count
+    with open(store._path("BTCUSDT", "trades"), "ab") as f:
+        f.write(b"\xff" * 100)
+    assert store.append("BTCUSDT", trades[500:2000]) == 1000  # overlap is skipped
+    np.testing.assert_array_equal(store.load("BTCUSDT"), trades[:2000])
+    start, end = int(trades["time"][100]), int(trades["time"][1500])
+    chunks = list(store.chunks("BTCUSDT", start, end, chunk_size=400))
+    assert [len(c) for c in chunks] == [400, 400, 400, 201]
+    np.testing.assert_array_equal(np.concatenate(chunks), trades[100:1501])
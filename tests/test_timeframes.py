@@ -0,0 +1,81 @@
+# tests/test_timeframes.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import DEFAULT_START_TS, generate_klines
+from kline_store import KlineStore, kline_dtype, records_to_frame, rows_to_records
+from timeframes import TimeframeStore, can_derive, resample_records
+
+MINUTE = 60_000
+T0 = DEFAULT_START_TS
+
+
+@pytest.fixture(scope="module")
+def base():
+    # Two days of 1m candles with extras, starting mid-hour
+    rows = generate_klines("BTCUSDT", 2 * 24 * 60, "1m", start_ts=T0 + 37 * MINUTE)
+    return rows_to_records(rows, kline_dtype(extras=True))
+
+
+@pytest.fixture
+def timeframes(tmp_path):
+    return TimeframeStore(KlineStore(str(tmp_path), kline_dtype(extras=True)))
+
+
+def pandas_resample(records, rule):
+    frame = records_to_frame(records)
+    how = {column: "sum" for column in frame.columns}
+    how.update(Open="first", High="max", Low="min", Close="last")
+    return frame.resample(rule, label="left", closed="left").agg(how).dropna()
+
+
+@pytest.mark.parametrize("interval, rule", [("15m", "15min"), ("1h", "1h"), ("1d", "1D")])
+def test_resample_matches_pandas(base, interval, rule):
+    bars = records_to_frame(resample_records(base, interval))
+    expected = pandas_resample(base, rule)
+    pd.testing.assert_index_equal(bars.index, expected.index)
+    for column in expected.columns:
+        np.testing.assert_allclose(bars[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float))
+
+
+def test_can_derive():
+    assert can_derive("15m") and can_derive("1d")
+    assert not can_derive("1m") and not can_derive("1w") and not can_derive("7m")
+
+
+def test_incremental_extend_matches_a_full_resample(timeframes, base):
+    # Base candles arrive in uneven batches that split buckets
+    bounds = [0, 5, 61, 700, 701, 2000, len(base)]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        batch = base[lo:hi]
+        timeframes.extend("BTCUSDT", batch, [[int(batch["open_time"][0]), int(batch["open_time"][-1]) + MINUTE - 1]],
+                          intervals=("15m", "1h"))
+    end = int(base["open_time"][-1])
+    for interval in ("15m", "1h"):
+        interval_ms = timeframes._interval_ms(interval)
+        expected = resample_records(base, interval)
+        # Only buckets whose base candles are all stored are derived: not the
+        # first (the data starts mid-hour) or the one still in progress
+        opens = expected["open_time"]
+        complete = expected[(opens >= base["open_time"][0]) & (opens + interval_ms <= end + MINUTE)]
+        np.testing.assert_array_equal(timeframes.view("BTCUSDT", interval, T0, end), complete)
+        np.testing.assert_array_equal(timeframes.derived.load("BTCUSDT", interval), complete)
+
+
+def test_read_adds_the_bucket_in_progress(timeframes, base):
+    part = base[:100]  # ends 17 minutes into an hour
+    timeframes.extend("BTCUSDT", part, [[int(part["open_time"][0]), int(part["open_time"][-1]) + MINUTE - 1]],
+                      intervals=())
+    end = int(part["open_time"][-1])
+    complete = timeframes.view("BTCUSDT", "1h", T0, end)
+    assert complete["open_time"].tolist() == [T0 + 60 * MINUTE]
+    bars = timeframes.read("BTCUSDT", "1h", T0, end)
+    expected = resample_records(part, "1h")[1:]
+    np.testing.assert_array_equal(bars, expected)
+    assert bars["volume"][-1] == pytest.approx(part["volume"][-17:].sum())
+    # A newer, still-open candle passed as tail joins the last bar
+    tail = base[100:101]
+    bars = timeframes.read("BTCUSDT", "1h", T0, end + MINUTE, tail)
+    assert bars["close"][-1] == tail["close"][0]
+    assert bars["volume"][-1] == pytest.approx(base["volume"][83:101].sum())
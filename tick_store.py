@@ -0,0 +1,142 @@
+# tick_store.py
+# Append-only on-disk store of Binance aggregated trades. Each symbol is one flat
+# binary file of TRADE_DTYPE records plus a small JSON file with the committed
+# record count and last trade id; reads are memory-mapped and handed out in
+# fixed-size chunks, so tens of millions of trades never sit in memory at once.
+import bisect
+import json
+import os
+
+import numpy as np
+
+from downloader import WeightRateLimiter
+
+AGG_TRADES_WEIGHT = 4  # Request weight of GET /api/v3/aggTrades
+AGG_TRADES_LIMIT = 1000
+HOUR_MS = 60 * 60_000  # aggTrades accepts at most one hour between startTime and endTime
+
+TRADE_DTYPE = np.dtype([
+    ("agg_id", "<i8"),
+    ("time", "<i8"),
+    ("price", "<f8"),
+    ("qty", "<f8"),
+    ("buyer_maker", "?"),
+])
+
+
+def agg_trades_to_records(trades):
+    # aggTrades JSON objects -> TRADE_DTYPE records
+    records = np.empty(len(trades), dtype=TRADE_DTYPE)
+    if len(trades):
+        records["agg_id"] = [t["a"] for t in trades]
+        records["time"] = [t["T"] for t in trades]
+        records["price"] = [t["p"] for t in trades]
+        records["qty"] = [t["q"] for t in trades]
+        records["buyer_maker"] = [t["m"] for t in trades]
+    return records
+
+
+class TickStore:
+    def __init__(self, root="tick_cache"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol, ext):
+        return os.path.join(self.root, f"{symbol}.{ext}")
+
+    def meta(self, symbol):
+        path = self._path(symbol, "json")
+        if not os.path.exists(path):
+            return {"count": 0, "last_id": None, "first_time": None, "last_time": None}
+        with open(path) as f:
+            return json.load(f)
+
+    def append(self, symbol, records):
+        # Records must continue the stored id sequence. Bytes past the committed
+        # count (a write interrupted before its metadata) are dropped first.
+        meta = self.meta(symbol)
+        if meta["last_id"] is not None:
+            records = records[records["agg_id"] > meta["last_id"]]
+        if not len(records):
+            return 0
+        path = self._path(symbol, "trades")
+        with open(path, "ab") as f:
+            f.truncate(meta["count"] * TRADE_DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(records, dtype=TRADE_DTYPE).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        meta = {
+            "count": meta["count"] + len(records),
+            "last_id": int(records["agg_id"][-1]),
+            "first_time": meta["first_time"] if meta["first_time"] is not None else int(records["time"][0]),
+            "last_time": int(records["time"][-1]),
+        }
+        meta_path = self._path(symbol, "json")
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+        return len(records)
+
+    def load(self, symbol):
+        count = self.meta(symbol)["count"]
+        if not count:
+            return np.empty(0, dtype=TRADE_DTYPE)
+        return np.memmap(self._path(symbol, "trades"), dtype=TRADE_DTYPE, mode="r", shape=(count,))
+
+    def chunks(self, symbol, start_ts=None, end_ts=None, chunk_size=1_000_000):
+        # Trades with start_ts <= time <= end_ts, as in-memory arrays of at most
+        # chunk_size records; only the current chunk is resident
+        trades = self.load(symbol)
+        times = trades["time"]
+        lo = 0 if start_ts is None else bisect.bisect_left(times, start_ts)
+        hi = len(trades) if end_ts is None else bisect.bisect_right(times, end_ts, lo)
+        for start in range(lo, hi, chunk_size):
+            yield np.array(trades[start:min(start + chunk_size, hi)])
+
+
+def download_agg_trades(client, store, symbol, start_ts, end_ts, limiter=None, flush_pages=100):
+    # Fill the store up to end_ts, resuming after the last stored trade id.
+    # Pages are paged by fromId once the first trade is known; the very first
+    # trade is located with one-hour startTime/endTime windows.
+    limiter = limiter or WeightRateLimiter()
+    meta = store.meta(symbol)
+    from_id = meta["last_id"] + 1 if meta["last_id"] is not None else None
+    window_start = start_ts
+    pending = []
+    stored = 0
+
+    def flush():
+        nonlocal stored
+        if pending:
+            stored += store.append(symbol, agg_trades_to_records([t for page in pending for t in page]))
+            pending.clear()
+
+    while True:
+        limiter.acquire(AGG_TRADES_WEIGHT)
+        if from_id is None:
+            if window_start > end_ts:
+                break
+            window_end = min(window_start + HOUR_MS - 1, end_ts)
+            page = client.get_aggregate_trades(
+                symbol=symbol, startTime=window_start, endTime=window_end, limit=AGG_TRADES_LIMIT
+            )
+            if not page:
+                window_start = window_end + 1
+                continue
+        else:
+            page = client.get_aggregate_trades(symbol=symbol, fromId=from_id, limit=AGG_TRADES_LIMIT)
+            if not page:
+                break
+        in_range = [t for t in page if t["T"] <= end_ts]
+        if in_range:
+            pending.append(in_range)
+        if len(in_range) < len(page) or (from_id is not None and len(page) < AGG_TRADES_LIMIT):
+            break
+        from_id = page[-1]["a"] + 1
+        if len(pending) >= flush_pages:
+            flush()
+    flush()
+    return stored
@@ -0,0 +1,129 @@
+# timeframes.py
+# Higher timeframes derived from one base (1m) kline series per symbol. Derived
+# bars live in their own KlineStore under <root>/derived and are only built for
+# buckets whose base candles are fully covered, so each new batch of 1m candles
+# aggregates just the buckets it completes instead of resampling the history.
+import os
+
+import numpy as np
+
+from kline_store import INTERVAL_MS, KlineStore, interval_to_ms
+
+BASE_INTERVAL = "1m"
+DERIVED_INTERVALS = ("5m", "15m", "1h", "4h", "1d")
+SUM_FIELDS = ("volume", "quote_volume", "trades", "taker_base_volume", "taker_quote_volume")
+
+
+def resample_records(records, interval):
+    # Sorted kline records -> records of a longer interval with the same dtype.
+    # Bars open on multiples of the interval since the epoch, as Binance's do up
+    # to 1d; buckets without any candle produce no bar.
+    if not len(records):
+        return np.empty(0, dtype=records.dtype)
+    interval_ms = interval_to_ms(interval)
+    open_times = records["open_time"] // interval_ms * interval_ms
+    starts = np.flatnonzero(np.concatenate([[True], open_times[1:] != open_times[:-1]]))
+    ends = np.concatenate([starts[1:] - 1, [len(records) - 1]])
+    bars = np.empty(len(starts), dtype=records.dtype)
+    bars["open_time"] = open_times[starts]
+    bars["open"] = records["open"][starts]
+    bars["high"] = np.maximum.reduceat(records["high"], starts)
+    bars["low"] = np.minimum.reduceat(records["low"], starts)
+    bars["close"] = records["close"][ends]
+    for field in SUM_FIELDS:
+        if field in records.dtype.names:
+            # Accumulate float32 columns in float64 and trade counts in uint64
+            accumulator = np.float64 if records.dtype[field].kind == "f" else np.uint64
+            bars[field] = np.add.reduceat(records[field], starts, dtype=accumulator)
+    return bars
+
+
+def can_derive(interval, base_interval=BASE_INTERVAL):
+    interval_ms = INTERVAL_MS.get(interval)
+    base_ms = interval_to_ms(base_interval)
+    return (
+        interval_ms is not None and interval_ms > base_ms
+        and interval_ms % base_ms == 0 and INTERVAL_MS["1d"] % interval_ms == 0
+    )
+
+
+class TimeframeStore:
+
+    def __init__(self, store, base_interval=BASE_INTERVAL):
+        self.store = store
+        self.base_interval = base_interval
+        self.base_ms = interval_to_ms(base_interval)
+        self.derived = KlineStore(os.path.join(store.root, "derived"), store.dtype)
+
+    def _interval_ms(self, interval):
+        if not can_derive(interval, self.base_interval):
+            raise ValueError(f"Cannot derive {interval} bars from {self.base_interval} candles")
+        return interval_to_ms(interval)
+
+    def base_range(self, interval, start_ts, end_ts):
+        # Base candle open times needed for every interval bar opening in [start_ts, end_ts]
+        interval_ms = self._interval_ms(interval)
+        first = -(-start_ts // interval_ms) * interval_ms
+        return first, end_ts // interval_ms * interval_ms + interval_ms - self.base_ms
+
+    def complete_buckets(self, symbol, interval, start_ts, end_ts):
+        # Inclusive [first, last] bar open times in [start_ts, end_ts] whose base
+        # candles are all covered by the store
+        interval_ms = self._interval_ms(interval)
+        buckets = []
+        for start, end in self.store.coverage(symbol, self.base_interval):
+            first = -(-max(start, start_ts) // interval_ms) * interval_ms
+            last = min((end - interval_ms + self.base_ms) // interval_ms, end_ts // interval_ms) * interval_ms
+            if first <= last:
+                buckets.append([first, last])
+        return buckets
+
+    def sync(self, symbol, interval, start_ts, end_ts):
+        # Aggregate the complete buckets in range that have not been derived yet;
+        # returns the number of bars written
+        interval_ms = self._interval_ms(interval)
+        parts, covered = [], []
+        for first, last in self.complete_buckets(symbol, interval, start_ts, end_ts):
+            for gap_start, gap_end in self.derived.missing(symbol, interval, first, last + interval_ms - 1):
+                gap_first = -(-gap_start // interval_ms) * interval_ms
+                gap_last = gap_end // interval_ms * interval_ms
+                base = self.store.view(symbol, self.base_interval, gap_first, gap_last + interval_ms - 1)
+                parts.append(resample_records(base, interval))
+                covered.append([gap_first, gap_last + interval_ms - 1])
+        if not covered:
+            return 0
+        bars = np.concatenate(parts)
+        self.derived.write(symbol, interval, bars, covered)
+        return len(bars)
+
+    def extend(self, symbol, records, covered, intervals=DERIVED_INTERVALS):
+        # Write new base candles and derive the buckets they complete
+        self.store.write(symbol, self.base_interval, records, covered)
+        start_ts = min(start for start, _ in covered)
+        end_ts = max(end for _, end in covered)
+        for interval in intervals:
+            interval_ms = self._interval_ms(interval)
+            self.sync(symbol, interval, start_ts // interval_ms * interval_ms, end_ts)
+
+    def view(self, symbol, interval, start_ts, end_ts):
+        # Memory-mapped complete bars; buckets still waiting for base candles are left out
+        self.sync(symbol, interval, start_ts, end_ts)
+        return self.derived.view(symbol, interval, start_ts, end_ts)
+
+    def read(self, symbol, interval, start_ts, end_ts, tail=None):
+        # Complete bars from the derived store, followed by bars built on the fly
+        # from base candles in buckets that are not complete yet (e.g. the current
+        # hour). tail holds base candles that are newer than the store, such as
+        # the still-open one from the last fetch.
+        interval_ms = self._interval_ms(interval)
+        records = np.array(self.view(symbol, interval, start_ts, end_ts))
+        after = records["open_time"][-1] + interval_ms if len(records) else -(-start_ts // interval_ms) * interval_ms
+        last_base = end_ts // interval_ms * interval_ms + interval_ms - self.base_ms
+        if after > last_base:
+            return records
+        base = self.store.read(symbol, self.base_interval, after, last_base)
+        if tail is not None and len(tail):
+            tail = tail[(tail["open_time"] >= after) & (tail["open_time"] <= last_base)]
+            if len(tail):
+                base = np.concatenate([base[base["open_time"] < tail["open_time"][0]], tail])
+        return np.concatenate([records, resample_records(base, interval)])
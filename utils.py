@@ -11,3 +11,20 @@ def calculate_risk_parity_weights(volatilities):
     total_inv_vol = sum(inv_vol.values())
     weights = {k: v/total_inv_vol for k, v in inv_vol.items()}
     return weights
+
+def kelly_fractions(win_prob, win_loss_ratio):
+    # Array version of calculate_kelly_position_size; undefined ratios give 0
+    win_prob = np.asarray(win_prob, dtype=float)
+    win_loss_ratio = np.asarray(win_loss_ratio, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kelly = win_prob - (1 - win_prob) / win_loss_ratio
+    return np.clip(np.nan_to_num(kelly, nan=0.0, neginf=0.0), 0, 1)
+
+def inverse_volatility_weights(volatilities):
+    # Array version of calculate_risk_parity_weights; zero/NaN volatilities get no weight
+    volatilities = np.asarray(volatilities, dtype=float)
+    inv_vol = np.zeros_like(volatilities)
+    usable = np.isfinite(volatilities) & (volatilities > 0)
+    inv_vol[usable] = 1 / volatilities[usable]
+    total = inv_vol.sum()
+    return inv_vol / total if total > 0 else inv_vol
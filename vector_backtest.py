@@ -0,0 +1,222 @@
+# vector_backtest.py
+# Array-based engine for AdvancedStrategy. Indicators are computed once per symbol
+# with NumPy/pandas, entry/exit conditions become boolean masks, and a single loop
+# over bars replays backtrader's broker: market orders created at a bar's close
+# are cash-checked against that close and filled at the next bar's open.
+import math
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+DEFAULT_PARAMS = {
+    "short_window": 10,
+    "long_window": 20,
+    "atr_period": 14,
+    "adx_entry": 20,
+    "adx_exit": 25,
+    "rsi_lower": 10,
+    "rsi_upper": 90,
+    "risk_per_trade": 0.01,
+}
+
+TIMEFRAME_FACTORS = {"days": 252, "weeks": 52, "months": 12, "years": 1}
+PERIOD_CODES = {"days": "D", "weeks": "W", "months": "M", "years": "Y"}
+
+
+def compute_indicators(df, params):
+    high = df["High"].to_numpy(dtype=float)
+    low = df["Low"].to_numpy(dtype=float)
+    close = df["Close"].to_numpy(dtype=float)
+    macd_line, macd_signal = indicators.macd(close)
+    stochastic_k, stochastic_d = indicators.stochastic(high, low, close)
+    span_a, span_b = indicators.ichimoku(high, low)
+    return {
+        "ema_short": indicators.ema(close, params["short_window"]),
+        "ema_long": indicators.ema(close, params["long_window"]),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "adx": indicators.adx(high, low, close),
+        "rsi": indicators.rsi(close),
+        "atr": indicators.atr(high, low, close, params["atr_period"]),
+        "bollinger_mid": indicators.bollinger(close)[0],
+        "stochastic_k": stochastic_k,
+        "stochastic_d": stochastic_d,
+        "ichimoku_span_a": span_a,
+        "ichimoku_span_b": span_b,
+    }
+
+
+def signal_masks(close, ind, params):
+    # Same criteria as AdvancedStrategy.next, evaluated for every bar at once
+    entry = (
+        (ind["ema_short"] > ind["ema_long"]) &
+        (ind["macd"] > ind["macd_signal"]) &
+        (ind["adx"] > params["adx_entry"]) &
+        (ind["rsi"] > params["rsi_lower"]) & (ind["rsi"] < params["rsi_upper"]) &
+        (ind["stochastic_k"] > ind["stochastic_d"]) &
+        (close > ind["bollinger_mid"]) &
+        (close > ind["ichimoku_span_a"]) &
+        (close > ind["ichimoku_span_b"])
+    )
+    exit_ = (
+        (ind["ema_short"] < ind["ema_long"]) &
+        (ind["macd"] < ind["macd_signal"]) &
+        (ind["adx"] < params["adx_exit"]) &
+        (ind["stochastic_k"] < ind["stochastic_d"]) &
+        (close < ind["bollinger_mid"])
+    )
+    return entry, exit_
+
+
+def sharpe_ratio(values, index, start_value, timeframe="years", riskfreerate=0.01, annualize=False):
+    # Mirrors bt.analyzers.SharpeRatio on top of TimeReturn for the given timeframe
+    period_ends = pd.Series(values, index=index).groupby(index.to_period(PERIOD_CODES[timeframe])).last()
+    ends = period_ends.to_numpy()
+    returns = ends / np.concatenate([[start_value], ends[:-1]]) - 1.0
+    if not len(returns):
+        return None
+    factor = TIMEFRAME_FACTORS[timeframe]
+    rate = pow(1.0 + riskfreerate, 1.0 / factor) - 1.0
+    excess = returns - rate
+    deviation = math.sqrt(((excess - excess.mean()) ** 2).mean())
+    if deviation == 0:
+        return None
+    ratio = excess.mean() / deviation
+    return math.sqrt(factor) * ratio if annualize else ratio
+
+
+def max_drawdown(values, start_value):
+    peaks = np.maximum.accumulate(np.concatenate([[start_value], values]))[1:]
+    return float(((peaks - values) / peaks).max() * 100.0) if len(values) else 0.0
+
+
+def trade_stats(pnls):
+    pnls = np.asarray(pnls, dtype=float)
+    won = pnls[pnls >= 0.0]
+    lost = pnls[pnls < 0.0]
+    return {
+        "total_trades": len(pnls),
+        "profitable_trades": len(won),
+        "losing_trades": len(lost),
+        "gross_profit": float(won.sum()),
+        "gross_loss": float(lost.sum()),
+        "avg_profit": float(won.mean()) if len(won) else 0.0,
+        "avg_loss": float(lost.mean()) if len(lost) else 0.0,
+    }
+
+
+def run_vector_backtest(historical_data, params=None, cash=10000.0, commission=0.001,
+                        sharpe_timeframe="years", annualize=False):
+    # The Sharpe defaults match bt.analyzers.SharpeRatio; shorter timeframes give a
+    # usable ratio for runs that span less than two calendar years
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    symbols = list(historical_data)
+    # Feeds are aligned on their common timestamps, as backtrader would step them together
+    index = historical_data[symbols[0]].index
+    for symbol in symbols[1:]:
+        index = index.intersection(historical_data[symbol].index)
+    frames = {symbol: historical_data[symbol].loc[index] for symbol in symbols}
+    n_bars = len(index)
+
+    opens, closes, atrs, entries, exits, valid = [], [], [], [], [], []
+    start = 0
+    for symbol in symbols:
+        df = frames[symbol]
+        close = df["Close"].to_numpy(dtype=float)
+        ind = compute_indicators(df, params)
+        entry, exit_ = signal_masks(close, ind, params)
+        # AdvancedStrategy skips a symbol whenever one of these is NaN
+        checked = [ind[name] for name in ind if name not in ("atr", "bollinger_mid")]
+        ready = ~np.isnan(np.vstack(checked)).any(axis=0)
+        start = max(start, int(np.argmax(ready)) if ready.any() else n_bars)
+        valid.append(ready.tolist())
+        opens.append(df["Open"].to_numpy(dtype=float).tolist())
+        closes.append(close.tolist())
+        atrs.append(ind["atr"].tolist())
+        entries.append(entry.tolist())
+        exits.append(exit_.tolist())
+
+    n_symbols = len(symbols)
+    size = [0.0] * n_symbols
+    entry_price = [0.0] * n_symbols
+    entry_comm = [0.0] * n_symbols
+    stop_loss = [None] * n_symbols
+    open_trade = [None] * n_symbols
+    pnls = [[] for _ in symbols]
+    trades = []
+    pending = []  # (symbol index, size), size < 0 closes the position
+    values = np.empty(n_bars)
+    balance = cash
+    risk_per_trade = params["risk_per_trade"]
+
+    for t in range(n_bars):
+        if pending:
+            # Submission check at the creating bar's close, then fill at this open
+            check_cash = balance
+            accepted = []
+            for i, order_size in pending:
+                created = closes[i][t - 1]
+                if order_size > 0:
+                    check_cash -= order_size * created * (1.0 + commission)
+                else:
+                    check_cash += -order_size * created * (1.0 - commission)
+                if check_cash >= 0.0:
+                    accepted.append((i, order_size))
+            pending = []
+            for i, order_size in accepted:
+                price = opens[i][t]
+                if order_size > 0:
+                    cost = order_size * price
+                    comm = cost * commission
+                    if balance - cost - comm < 0.0:
+                        continue
+                    balance -= cost + comm
+                    size[i] = order_size
+                    entry_price[i] = price
+                    entry_comm[i] = comm
+                    open_trade[i] = len(trades)
+                    trades.append([symbols[i], index[t], None, price, None, order_size, None])
+                else:
+                    qty = size[i]
+                    comm = qty * price * commission
+                    balance += qty * price - comm
+                    pnl = qty * (price - entry_price[i]) - entry_comm[i] - comm
+                    pnls[i].append(pnl)
+                    trade = trades[open_trade[i]]
+                    trade[2], trade[4], trade[6] = index[t], price, pnl
+                    size[i] = 0.0
+
+        if t >= start:
+            for i in range(n_symbols):
+                if not valid[i][t]:
+                    continue
+                price = closes[i][t]
+                if size[i] == 0.0:
+                    if entries[i][t]:
+                        atr = atrs[i][t]
+                        if atr > 0:
+                            position_size = (balance * risk_per_trade) / (atr * 2)
+                            if position_size > 0:
+                                pending.append((i, position_size))
+                                stop_loss[i] = price - atr * 2
+                elif stop_loss[i] and price <= stop_loss[i]:
+                    pending.append((i, -size[i]))
+                elif exits[i][t]:
+                    pending.append((i, -size[i]))
+
+        values[t] = balance + sum(size[i] * closes[i][t] for i in range(n_symbols) if size[i])
+
+    return {
+        "engine": "vector",
+        "start_value": cash,
+        "final_value": float(values[-1]) if n_bars else cash,
+        "sharpe": sharpe_ratio(values, index, cash, sharpe_timeframe, annualize=annualize),
+        "max_drawdown": max_drawdown(values, cash),
+        "trades": {symbol: trade_stats(pnls[i]) for i, symbol in enumerate(symbols)},
+        "equity": pd.Series(values, index=index, name="Value"),
+        "trade_list": pd.DataFrame(
+            trades, columns=["Symbol", "Entry_time", "Exit_time", "Entry_price", "Exit_price", "Size", "PnL"]
+        ),
+    }